@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ClienteConfig(AppConfig):
     name = 'apps.capacitacion'
+
+    def ready(self):
+        from apps.capacitacion import signals  # noqa
@@ -0,0 +1,65 @@
+"""
+Claves e invalidación de lo que los certificados guardan en la caché, y la verificación pública por correlativo.
+No dibuja ni importa reportlab: lo cargan las señales al iniciar la aplicación y la vista de verificación.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.capacitacion.models import CertEmitido, Modulo
+from apps.common.constants import ESTADO_CERT_EMITIDO, TIPO_CERT_EMITIDO_MODULO
+
+
+def clave_contexto(capacitacion_id, modulo_id=None):
+    if modulo_id is None:
+        return 'certificados-contexto-curso-{}'.format(capacitacion_id)
+    return 'certificados-contexto-modulo-{}'.format(modulo_id)
+
+
+def invalidar_contexto_certificados(capacitaciones_ids, modulos_ids=()):
+    """
+    Descarta de la caché el contexto del curso y de todos los módulos de las capacitaciones indicadas, más el de
+    `modulos_ids` (módulos recién eliminados). Se descarta ya y otra vez al confirmar la transacción, para que
+    una lectura concurrente no vuelva a guardar los datos anteriores.
+    """
+    capacitaciones_ids = [c for c in capacitaciones_ids if c]
+    if not capacitaciones_ids and not modulos_ids:
+        return
+    modulos_ids = set(modulos_ids) | set(
+        Modulo.objects.filter(capacitacion_id__in=capacitaciones_ids).values_list('id', flat=True))
+    claves = [clave_contexto(c) for c in capacitaciones_ids] + [clave_contexto(None, m) for m in modulos_ids]
+    cache.delete_many(claves)
+    transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def clave_cache_verificacion(correlativo):
+    return 'certificado-verificacion-{}'.format(correlativo)
+
+
+def verificacion_certificado(correlativo):
+    """
+    Datos públicos del certificado emitido con `correlativo`, o None si no existe. Se leen de la caché (ver
+    CERTIFICADO_VERIFICACION_CACHE) y solo si no están se consultan, con una sola consulta por el índice único
+    del correlativo. Que un correlativo no existe se recuerda solo un minuto, por si se emite enseguida.
+    """
+    clave = clave_cache_verificacion(correlativo)
+    datos = cache.get(clave)
+    if datos is None:
+        emitido = CertEmitido.objects.select_related('persona', 'modulo', 'modulo__capacitacion').filter(
+            correlativo=correlativo).first()
+        datos = {}
+        if emitido:
+            capacitacion = emitido.modulo.capacitacion
+            datos = {
+                'correlativo': emitido.correlativo,
+                'vigente': emitido.estado == ESTADO_CERT_EMITIDO,
+                'estado': emitido.get_estado_display(),
+                'nombre_completo': emitido.persona.nombre_completo,
+                'cargo': emitido.get_cargo_display(),
+                'capacitacion': capacitacion.nombre,
+                'modulo': emitido.modulo.nombre if emitido.tipo == TIPO_CERT_EMITIDO_MODULO else '',
+                'fecha_inicio': capacitacion.fecha_inicio,
+                'fecha_fin': capacitacion.fecha_fin,
+            }
+        cache.set(clave, datos, settings.CERTIFICADO_VERIFICACION_CACHE if datos else 60)
+    return datos or None
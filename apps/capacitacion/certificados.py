@@ -0,0 +1,445 @@
+"""
+Certificados listos para dibujar (`CertificadoSpec`), sus huellas, el archivo de PDF ya dibujados, los lotes
+masivos y los enlaces de descarga. No importa reportlab, qrcode, PIL ni PyPDF2: lo que dibuja o arma un PDF está
+en apps.capacitacion.dibujo y se pide a través de apps.capacitacion.procesos.
+"""
+import hashlib
+import logging
+import os
+import subprocess
+import zipfile
+from dataclasses import dataclass
+from datetime import date
+from io import BytesIO
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min
+from django.urls import reverse
+
+from apps.capacitacion.cache_certificados import clave_contexto
+from apps.capacitacion.models import (ArchivoCertificado, Capacitacion, CertEmitido, DetalleAsistencia,
+                                      LoteCertificados, Modulo)
+from apps.capacitacion.procesos import ejecutar_dibujo
+from apps.capacitacion.services import padron_certificados
+from apps.common.constants import (ABREVIATURA_GRADO, CARGO_CERT_EMITIDO_ASISTENTE, ESTADO_CERT_EMITIDO,
+                                   TIPO_CERT_EMITIDO_MODULO, TIPO_CERT_EMITIDO_UNICO, EMISION_CERTIFICADO_UNICO,
+                                   EMISION_CERTIFICADO_MODULOS, EMISION_CERTIFICADO_UNICO_Y_MODULOS)
+from apps.persona.models import Persona
+
+logger = logging.getLogger(__name__)
+
+MESES = ('', 'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto', 'septiembre', 'octubre',
+         'noviembre', 'diciembre')
+
+
+@dataclass(frozen=True)
+class FirmaCertificado:
+    firma_hash: str
+    lineas: tuple
+
+
+@dataclass(frozen=True)
+class PlantillaCertificado:
+    """
+    Contenido común a todos los certificados de un curso o de un módulo. `clave` identifica sus capas fijas
+    dentro del documento y su lote guardado, y `temarios` son pares (título, temas).
+    """
+    clave: str
+    capacitacion_id: int
+    modulo_id: int
+    fecha_emision: date
+    firmas: tuple
+    temarios: tuple
+
+
+@dataclass(frozen=True)
+class CertificadoSpec:
+    """
+    Certificado listo para dibujar: todo lo consultado y redactado de antemano, sin referencias a modelos.
+    """
+    plantilla: PlantillaCertificado
+    persona_id: int
+    cargo: str
+    nombre_completo: str
+    texto: str
+    correlativo: str
+
+
+def fecha_larga(fecha):
+    return '{} de {} de {}'.format(fecha.day, MESES[fecha.month], fecha.year)
+
+
+def _firmas(capacitacion, con_grado=False):
+    firmas = []
+    # En el orden en que se asignaron: cambiarlo movería las firmas y la huella de los certificados
+    responsables = capacitacion.responsablefirma_set.select_related('firmante__persona').defer(
+        'firmante__firma').order_by('id')
+    for f in responsables:
+        if con_grado:
+            grado = dict(ABREVIATURA_GRADO).get(f.firmante.persona.grado_academico, '')
+            lineas = ('{} {}'.format(grado, str(f.firmante).upper()).title(), f.get_tipo_firma_display(),
+                      f.firmante.ambito.upper())
+        else:
+            lineas = (str(f.firmante).upper(), f.get_tipo_firma_display(), '')
+        firmas.append(FirmaCertificado(f.firmante.firma_hash, lineas))
+    return tuple(firmas)
+
+
+def _temas(temas):
+    return tuple(t.strip() for t in (temas or '').split('\n'))
+
+
+@dataclass(frozen=True)
+class ContextoCertificados:
+    """
+    Datos de un curso o módulo que comparten todos sus certificados: la plantilla y lo necesario para redactar
+    el texto de cada participante. Se guarda en caché (ver `contexto_curso`), así que no referencia modelos.
+    """
+    plantilla: PlantillaCertificado
+    evento: str
+    nombre: str
+    canal: str
+    inicio: date
+    fin: date
+    horas: int
+
+    def texto(self, fila):
+        if fila.es_equipo:
+            participacion = 'participó en calidad de {} en el {} de {}'.format(fila.get_cargo_display(),
+                                                                               self.evento, self.nombre)
+        else:
+            participacion = 'aprobó satisfactoriamente el {} de {}'.format(self.evento, self.nombre)
+        return '{}, desarrollado de forma {} del {} al {} con un total de {} horas académicas.'.format(
+            participacion, self.canal, fecha_larga(self.inicio), fecha_larga(self.fin), self.horas)
+
+    def certificados(self, filas):
+        return tuple(
+            CertificadoSpec(plantilla=self.plantilla, persona_id=f.persona_id, cargo=f.cargo,
+                            nombre_completo=f.persona.nombre_completo, correlativo=f.correlativo or '',
+                            texto=self.texto(f))
+            for f in filas
+        )
+
+
+def _canal(canal_reunion):
+    return 'presencial' if 'PRESENCIAL' in (canal_reunion or '').upper() else 'virtual'
+
+
+def _contexto_en_cache(clave, construir):
+    contexto = cache.get(clave)
+    if contexto is None:
+        contexto = construir()
+        cache.set(clave, contexto, settings.CERTIFICADO_CONTEXTO_CACHE)
+    return contexto
+
+
+def contexto_curso(capacitacion):
+    """
+    Contexto de los certificados únicos de la capacitación, desde la caché mientras no cambie (ver
+    `invalidar_contexto_certificados`).
+    """
+    def construir():
+        modulos = list(capacitacion.modulo_set.order_by('id').values_list('temas', 'horas_academicas'))
+        temarios = [_temas(temas) for temas, _ in modulos]
+        if len(temarios) == 1:
+            temarios = [('Temario', temarios[0])]
+        else:
+            temarios = [('Temario del Módulo {}'.format(i), t) for i, t in enumerate(temarios, 1)]
+        plantilla = PlantillaCertificado(clave='curso-{}'.format(capacitacion.pk), capacitacion_id=capacitacion.pk,
+                                         modulo_id=None, fecha_emision=capacitacion.fecha_culminado,
+                                         firmas=_firmas(capacitacion), temarios=tuple(temarios))
+        return ContextoCertificados(plantilla=plantilla, evento='Curso', nombre=capacitacion.nombre,
+                                    canal=_canal(capacitacion.canal_reunion), inicio=capacitacion.fecha_inicio,
+                                    fin=capacitacion.fecha_fin, horas=sum(horas for _, horas in modulos))
+    return _contexto_en_cache(clave_contexto(capacitacion.pk), construir)
+
+
+def contexto_modulo(capacitacion, modulo):
+    """
+    Igual que `contexto_curso` para los certificados del módulo, fechados con su primera y última asistencia.
+    """
+    def construir():
+        fechas = DetalleAsistencia.objects.filter(acta_asistencia__modulo=modulo).aggregate(inicio=Min('fecha'),
+                                                                                              fin=Max('fecha'))
+        plantilla = PlantillaCertificado(clave='modulo-{}'.format(modulo.pk), capacitacion_id=capacitacion.pk,
+                                         modulo_id=modulo.pk, fecha_emision=fechas['fin'],
+                                         firmas=_firmas(capacitacion, con_grado=True),
+                                         temarios=(('Temario', _temas(modulo.temas)),))
+        return ContextoCertificados(plantilla=plantilla, evento='Módulo', nombre=modulo.nombre,
+                                    canal=_canal(capacitacion.canal_reunion), inicio=fechas['inicio'],
+                                    fin=fechas['fin'], horas=modulo.horas_academicas)
+    return _contexto_en_cache(clave_contexto(capacitacion.pk, modulo.pk), construir)
+
+
+def _filas(capacitacion, tipo, modulo=None, persona=None, cargo=None):
+    filas = padron_certificados(capacitacion, tipo, modulo)
+    if persona is not None:
+        filas = filas.filter(persona=persona, cargo=cargo or CARGO_CERT_EMITIDO_ASISTENTE)
+    return list(filas)
+
+
+def certificados_curso(capacitacion, persona=None, cargo=None):
+    """
+    Certificados únicos de la capacitación según su padrón, o solo el de `persona` con `cargo` (asistente si
+    no se indica).
+    """
+    filas = _filas(capacitacion, TIPO_CERT_EMITIDO_UNICO, persona=persona, cargo=cargo)
+    return contexto_curso(capacitacion).certificados(filas) if filas else ()
+
+
+def certificados_modulo(capacitacion, modulo, persona=None, cargo=None):
+    """
+    Igual que `certificados_curso` para los certificados del módulo.
+    """
+    filas = _filas(capacitacion, TIPO_CERT_EMITIDO_MODULO, modulo, persona, cargo)
+    return contexto_modulo(capacitacion, modulo).certificados(filas) if filas else ()
+
+
+# Subir cuando cambie el dibujo de los certificados: invalida las huellas (ETag) ya entregadas
+VERSION_DIBUJO = 3
+
+
+def huella_certificados(certificados):
+    """
+    Huella de los datos y del perfil de salida con que se dibujan `certificados`. Como el PDF se genera en modo
+    invariante, dos PDF con la misma huella son idénticos byte a byte.
+    """
+    perfil = (VERSION_DIBUJO, settings.CERTIFICADO_PDF_COMPRESION, settings.CERTIFICADO_IMAGEN_PPP,
+              settings.CERTIFICADO_JPEG_CALIDAD, settings.CERTIFICADO_VERIFICACION_URL)
+    return hashlib.sha256(repr((perfil, tuple(certificados))).encode()).hexdigest()
+
+
+def nombre_archivo(certificados):
+    if len(certificados) == 1 and certificados[0].correlativo:
+        return 'Certificado-{}.pdf'.format(certificados[0].correlativo)
+    if certificados:
+        return 'Certificados-{}.pdf'.format(certificados[0].plantilla.clave)
+    return 'Certificado.pdf'
+
+
+def generar_pdf(certificados, destino=None, titulo=''):
+    """
+    Dibuja `certificados` en un PDF escrito sobre `destino`, cualquier objeto con `write` (respuesta HTTP,
+    archivo, entrada de un ZIP). Sin destino devuelve el contenido del PDF. Con CERTIFICADO_PROCESOS se dibuja
+    en los procesos de dibujo (ver apps.capacitacion.procesos).
+    """
+    contenido = generar_pdfs([(certificados, titulo)])[0]
+    if destino is None:
+        return contenido
+    destino.write(contenido)
+
+
+def generar_pdfs(trabajos):
+    """
+    PDF de cada par (certificados, título) de `trabajos`; con procesos de dibujo, en paralelo.
+    """
+    return ejecutar_dibujo([('dibujar_pdf', (tuple(certificados), None, titulo))
+                            for certificados, titulo in trabajos])
+
+
+def generar_lote(certificados, titulo=''):
+    """
+    PDF masivo de `certificados` (todos de la misma plantilla) que solo dibuja los nuevos o cambiados: los demás
+    se copian, por huella, del último lote guardado de la plantilla. Guarda el resultado como nuevo lote.
+    """
+    if not certificados:
+        return generar_pdf(certificados, titulo=titulo)
+    plantilla = certificados[0].plantilla
+    huellas = [huella_certificados((c,)) for c in certificados]
+    lote = LoteCertificados.objects.filter(clave=plantilla.clave).first()
+    if lote and lote.paginas == {h: 2 * i for i, h in enumerate(huellas)}:
+        return bytes(lote.pdf)
+
+    anteriores = lote.paginas if lote else {}
+    nuevos = tuple(c for c, h in zip(certificados, huellas) if h not in anteriores)
+    if len(nuevos) == len(certificados):
+        contenido = generar_pdf(certificados, titulo=titulo)
+    else:
+        contenido = ejecutar_dibujo([('componer_lote', (bytes(lote.pdf), [anteriores.get(h) for h in huellas],
+                                                        nuevos, titulo))])[0]
+
+    try:
+        with transaction.atomic():
+            LoteCertificados.objects.update_or_create(clave=plantilla.clave, defaults={
+                'capacitacion_id': plantilla.capacitacion_id, 'pdf': contenido,
+                'paginas': {h: 2 * i for i, h in enumerate(huellas)},
+            })
+    except IntegrityError:
+        # Otra descarga simultánea creó el lote de la plantilla; el suyo sirve igual para la próxima vez
+        pass
+    return contenido
+
+
+def pdf_certificado(certificado):
+    """
+    PDF individual de `certificado` desde el archivo de certificados; si aún no está se dibuja y se archiva.
+    """
+    return pdfs_certificados((certificado,))[0]
+
+
+def pdfs_certificados(certificados):
+    """
+    Como `pdf_certificado` para varios certificados, con una sola consulta al archivo.
+    """
+    huellas = [huella_certificados((c,)) for c in certificados]
+    archivados = {h: bytes(pdf) for h, pdf in
+                  ArchivoCertificado.objects.filter(huella__in=huellas).values_list('huella', 'pdf')}
+    pendientes = list({h: (c, h) for c, h in zip(certificados, huellas) if h not in archivados}.values())
+    archivados.update(zip((h for _, h in pendientes), _archivar(pendientes)))
+    return [archivados[h] for h in huellas]
+
+
+def _archivar(certificados_huellas):
+    pdfs = generar_pdfs([((c,), nombre_archivo((c,))) for c, _ in certificados_huellas])
+    # Si otro proceso archivó la misma huella mientras tanto, su PDF es idéntico
+    ArchivoCertificado.objects.bulk_create([
+        ArchivoCertificado(huella=huella, capacitacion_id=c.plantilla.capacitacion_id, pdf=pdf)
+        for (c, huella), pdf in zip(certificados_huellas, pdfs)
+    ], batch_size=100, ignore_conflicts=True)
+    return pdfs
+
+
+SAL_ENLACE = 'capacitacion.certificados.enlace'
+
+
+def firmar_enlace(certificado):
+    """
+    Token firmado que identifica a `certificado` (capacitación, módulo, persona y cargo) para descargarlo sin
+    iniciar sesión; caduca a los CERTIFICADO_ENLACE_DIAS días (ver `certificado_de_enlace`).
+    """
+    plantilla = certificado.plantilla
+    return signing.dumps([plantilla.capacitacion_id, plantilla.modulo_id, certificado.persona_id, certificado.cargo],
+                         salt=SAL_ENLACE)
+
+
+def certificado_de_enlace(token):
+    """
+    Certificados que identifica `token`, vacío si ya no existe. Lanza signing.SignatureExpired si el enlace
+    caducó y signing.BadSignature si no es válido.
+    """
+    capacitacion_id, modulo_id, persona_id, cargo = signing.loads(
+        token, salt=SAL_ENLACE, max_age=settings.CERTIFICADO_ENLACE_DIAS * 24 * 60 * 60)
+    capacitacion = Capacitacion.objects.filter(pk=capacitacion_id).first()
+    persona = Persona.objects.filter(pk=persona_id).first()
+    if not capacitacion or not persona:
+        return ()
+    if modulo_id is None:
+        return certificados_curso(capacitacion, persona=persona, cargo=cargo)
+    modulo = Modulo.objects.filter(pk=modulo_id, capacitacion=capacitacion).first()
+    return certificados_modulo(capacitacion, modulo, persona=persona, cargo=cargo) if modulo else ()
+
+
+def url_verificacion(correlativo):
+    """
+    Dirección pública de verificación del certificado, la que lleva su código QR. Requiere
+    CERTIFICADO_VERIFICACION_URL.
+    """
+    if not settings.CERTIFICADO_VERIFICACION_URL:
+        raise ImproperlyConfigured('CERTIFICADO_VERIFICACION_URL no está configurado')
+    return settings.CERTIFICADO_VERIFICACION_URL.rstrip('/') + reverse('capacitacion:verificar_certificado',
+                                                                        args=[correlativo])
+
+
+def certificados_persona(persona):
+    """
+    Certificados emitidos a `persona` en todas sus capacitaciones, de la más antigua a la más reciente y, en cada
+    una, el del curso antes que los de sus módulos.
+    """
+    emitidos = sorted(
+        CertEmitido.objects.filter(persona=persona, estado=ESTADO_CERT_EMITIDO).values_list(
+            'modulo__capacitacion__fecha_inicio', 'modulo__capacitacion_id', 'tipo', 'modulo_id', 'cargo'),
+        key=lambda e: (e[0] or date.min, e[1], e[2] != TIPO_CERT_EMITIDO_UNICO, e[3], e[4]))
+    capacitaciones = Capacitacion.objects.in_bulk({e[1] for e in emitidos})
+    modulos = Modulo.objects.in_bulk({e[3] for e in emitidos if e[2] == TIPO_CERT_EMITIDO_MODULO})
+    certificados = []
+    for _, capacitacion_id, tipo, modulo_id, cargo in emitidos:
+        capacitacion = capacitaciones[capacitacion_id]
+        if tipo == TIPO_CERT_EMITIDO_UNICO:
+            certificados.extend(certificados_curso(capacitacion, persona=persona, cargo=cargo))
+        else:
+            certificados.extend(certificados_modulo(capacitacion, modulos[modulo_id], persona=persona, cargo=cargo))
+    return tuple(certificados)
+
+
+def portafolio_pdf(certificados, titulo=''):
+    """
+    Une en un PDF los PDF individuales de `certificados` (ver `pdfs_certificados`) sin volver a dibujarlos.
+    """
+    return ejecutar_dibujo([('unir_pdfs', (pdfs_certificados(certificados), titulo))])[0]
+
+
+def portafolio_zip(certificados, destino=None):
+    """
+    ZIP con el PDF individual de cada uno de `certificados`, escrito sobre `destino` como en `generar_pdf`. Las
+    entradas llevan fecha fija para que el ZIP de los mismos certificados sea siempre igual.
+    """
+    salida = BytesIO() if destino is None else destino
+    # Los PDF ya vienen comprimidos: se guardan tal cual
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_STORED) as archivo:
+        for certificado, contenido in zip(certificados, pdfs_certificados(certificados)):
+            nombre = nombre_archivo((certificado,)) if certificado.correlativo else 'Certificado-{}-{}.pdf'.format(
+                certificado.plantilla.clave, certificado.cargo)
+            archivo.writestr(zipfile.ZipInfo(nombre), contenido)
+    if destino is None:
+        return salida.getvalue()
+
+
+def certificados_capacitacion(capacitacion):
+    """
+    Certificados de la capacitación agrupados por plantilla: el único y/o uno por módulo según el tipo de emisión.
+    """
+    grupos = []
+    if capacitacion.tipo_emision_certificado in (EMISION_CERTIFICADO_UNICO, EMISION_CERTIFICADO_UNICO_Y_MODULOS):
+        grupos.append(certificados_curso(capacitacion))
+    if capacitacion.tipo_emision_certificado in (EMISION_CERTIFICADO_MODULOS, EMISION_CERTIFICADO_UNICO_Y_MODULOS):
+        grupos.extend(certificados_modulo(capacitacion, m) for m in capacitacion.modulo_set.order_by('id'))
+    return [g for g in grupos if g]
+
+
+def prerenderizar_certificados(capacitacion):
+    """
+    Deja listos el PDF masivo de cada plantilla y el PDF individual de cada certificado de la capacitación, y
+    descarta los individuales que ya no corresponden a ningún certificado vigente. Al terminar la capacitación
+    deja de estar pendiente (ver `programar_prerender`). Devuelve cuántos dibujó.
+    """
+    pendientes = []
+    huellas = set()
+    for certificados in certificados_capacitacion(capacitacion):
+        generar_lote(certificados, nombre_archivo(certificados))
+        for c in certificados:
+            huella = huella_certificados((c,))
+            huellas.add(huella)
+            pendientes.append((c, huella))
+    archivadas = set(ArchivoCertificado.objects.filter(huella__in=huellas).values_list('huella', flat=True))
+    pendientes = [(c, h) for c, h in pendientes if h not in archivadas]
+    _archivar(pendientes)
+    ArchivoCertificado.objects.filter(capacitacion=capacitacion).exclude(huella__in=huellas).delete()
+    Capacitacion.objects.filter(pk=capacitacion.pk).update(certificados_pendientes=False)
+    return len(pendientes)
+
+
+def programar_prerender(capacitacion_id):
+    """
+    Marca la capacitación como pendiente de dibujar y, cuando confirme la transacción en curso, lanza el comando
+    `prerenderizar_certificados` en un proceso aparte: no le quita CPU ni GIL a las peticiones del proceso web y
+    termina aunque este se recicle. Debe llamarse después de escribir el estado y el historial, para que su
+    `on_commit` corra después del resumen (fecha de culminación) y de la invalidación del contexto. Si el proceso
+    no llega a terminar, la capacitación sigue pendiente y la retoma la siguiente ejecución del comando.
+    """
+    Capacitacion.objects.filter(pk=capacitacion_id).update(certificados_pendientes=True)
+    transaction.on_commit(lambda: _lanzar_prerender(capacitacion_id))
+
+
+def _lanzar_prerender(capacitacion_id):
+    comando = [settings.CERTIFICADO_PRERENDER_PYTHON, os.path.join(settings.BASE_DIR, 'manage.py'),
+               'prerenderizar_certificados', str(capacitacion_id)]
+    try:
+        # Sesión propia: el proceso no muere con el worker que lo lanzó
+        subprocess.Popen(comando, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, start_new_session=True)
+    except OSError:
+        logger.exception('No se pudo lanzar el prerender de los certificados de la capacitación %s',
+                         capacitacion_id)
@@ -0,0 +1,358 @@
+"""
+Dibujo de los certificados con reportlab, qrcode, PIL y PyPDF2. Solo lo importan los procesos que dibujan: los
+procesos de dibujo (ver apps.capacitacion.procesos) o, sin ellos, el proceso que pide el PDF, la primera vez que
+lo necesita. El resto (especificaciones, huellas, lotes y archivo) está en apps.capacitacion.certificados; al
+cambiar el dibujo hay que subir allí VERSION_DIBUJO.
+"""
+import os
+from datetime import date
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from PIL import Image
+from PyPDF2 import PdfFileReader, PdfFileWriter
+from reportlab import rl_config
+from reportlab.graphics.barcode import code128
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_RIGHT
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+from apps.capacitacion.certificados import CertificadoSpec, PlantillaCertificado, fecha_larga, url_verificacion
+from apps.common.constants import CARGO_CERT_EMITIDO_ASISTENTE
+from apps.persona.models import Firmante
+
+# ASCII85 solo sirve para transportar el PDF como texto y agranda un 25 % los flujos binarios
+rl_config.useA85 = 0
+
+
+class ImagenCompartida(ImageReader):
+    """
+    ImageReader decodificado una sola vez que puede compartirse entre certificados e hilos: los JPEG se entregan
+    desde una copia propia del contenido en lugar del mismo archivo abierto.
+    """
+
+    def __init__(self, contenido):
+        self._contenido = bytes(contenido)
+        super().__init__(BytesIO(self._contenido))
+        self.getRGBData()
+
+    def _jpeg_fh(self):
+        return BytesIO(self._contenido)
+
+
+def optimizar_imagen(contenido, ancho, alto):
+    """
+    Remuestrea la imagen a CERTIFICADO_IMAGEN_PPP para un recuadro de `ancho` x `alto` puntos y la recodifica como
+    JPEG, aplanando la transparencia sobre blanco (el fondo del certificado). Se queda con la original si ya pesa
+    menos o si no hay resolución configurada.
+    """
+    ppp = settings.CERTIFICADO_IMAGEN_PPP
+    if not ppp:
+        return contenido
+    imagen = Image.open(BytesIO(contenido))
+    if imagen.mode in ('RGBA', 'LA', 'PA') or 'transparency' in imagen.info:
+        imagen = imagen.convert('RGBA')
+        fondo = Image.new('RGB', imagen.size, 'white')
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        imagen = fondo
+    elif imagen.mode not in ('RGB', 'L'):
+        imagen = imagen.convert('RGB')
+    # Cada eje por separado: la imagen se estira al recuadro al dibujarla y nunca se amplía
+    tamano = (min(imagen.width, round(ancho * ppp / 72)), min(imagen.height, round(alto * ppp / 72)))
+    if tamano != imagen.size:
+        imagen = imagen.resize(tamano, Image.LANCZOS)
+    salida = BytesIO()
+    imagen.save(salida, 'JPEG', quality=settings.CERTIFICADO_JPEG_CALIDAD, optimize=True)
+    return salida.getvalue() if salida.tell() < len(contenido) else contenido
+
+
+# Nombre en static/img y recuadro (x, y, ancho, alto) de cada logo del anverso
+LOGOS = (
+    ('unasam_logo_oficial.jpg', 100, 645, 90, 90),
+    ('ogcu_logo_oficial.jpg', 360, 645, 117, 85),
+)
+
+
+@lru_cache(maxsize=None)
+def logo(nombre, ancho, alto):
+    with open(os.path.join(settings.STATIC_ROOT, 'img', nombre), 'rb') as archivo:
+        return ImagenCompartida(optimizar_imagen(archivo.read(), ancho, alto))
+
+
+def dibujar_logos(canvas):
+    for nombre, x, y, ancho, alto in LOGOS:
+        canvas.drawImage(logo(nombre, ancho, alto), x, y, ancho, alto)
+
+
+TAMANO_FIRMA = (110, 80)
+
+
+@lru_cache(maxsize=64)
+def imagen_firma(firma_hash):
+    """
+    ImageReader de la firma con hash `firma_hash`, optimizado para TAMANO_FIRMA y decodificado una sola vez por
+    proceso.
+    """
+    firma = Firmante.objects.filter(firma_hash=firma_hash).values_list('firma', flat=True).first()
+    return ImagenCompartida(optimizar_imagen(bytes(firma), *TAMANO_FIRMA)) if firma else None
+
+
+def dibujar_firma(canvas, firma_hash, x, y):
+    imagen = imagen_firma(firma_hash) if firma_hash else None
+    if imagen:
+        ancho, alto = TAMANO_FIRMA
+        canvas.drawImage(imagen, x, y, width=ancho, height=alto, mask='auto')
+
+
+@lru_cache(maxsize=256)
+def imagen_qr(contenido):
+    """
+    ImageReader del código QR para `contenido`, generado en memoria y reutilizado entre certificados e hilos.
+    """
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(contenido)
+    qr.make(fit=True)
+    buffer = BytesIO()
+    qr.make_image(fill_color='black', back_color='white').save(buffer, 'PNG')
+    return ImagenCompartida(buffer.getvalue())
+
+
+def dibujar_qr(canvas, contenido, x=270, y=-45, width=60):
+    canvas.drawImage(imagen_qr(contenido), x, y, width=width, preserveAspectRatio=True, mask='auto')
+
+
+# Caja de las capas fijas: cubre A4 y carta, el contenido fuera de ella se recortaría
+CAJA_CAPA_FIJA = (0, 0, 612, 842)
+
+
+def capa_fija(canvas, nombre, dibujar):
+    """
+    Dibuja el contenido fijo de una página (`dibujar()`) una sola vez por documento como form XObject y en las
+    páginas siguientes solo lo referencia, así un PDF masivo no repite logos, textos ni temarios por certificado.
+    """
+    if not canvas.hasForm(nombre):
+        canvas.beginForm(nombre, *CAJA_CAPA_FIJA)
+        dibujar()
+        canvas.endForm()
+    canvas.doForm(nombre)
+
+
+_ESTILOS_BASE = getSampleStyleSheet()
+
+
+def _estilo(nombre, base='Normal', **atributos):
+    return ParagraphStyle(nombre, parent=_ESTILOS_BASE[base], **atributos)
+
+
+class EstilosCertificadoMixin:
+    """
+    Estilos de párrafo y de tabla de los certificados. Se construyen una sola vez al importar el módulo y se
+    comparten entre todas las vistas e hilos, por eso no deben modificarse.
+    """
+    style = _estilo('certificado_texto', 'BodyText', fontSize=10, alignment=TA_CENTER)
+    style1 = _estilo('certificado_nota', fontSize=6)
+    style2 = _estilo('certificado_subtitulo', fontSize=16, alignment=TA_CENTER)
+    style3 = _estilo('certificado_destacado', fontSize=13, alignment=TA_CENTER)
+    style4 = _estilo('certificado_cuerpo', fontSize=12, alignment=TA_JUSTIFY, leading=26)
+    style5 = _estilo('certificado_encabezado', fontSize=16, alignment=TA_CENTER)
+    style_fullname = _estilo('certificado_nombre', fontSize=13, alignment=TA_CENTER)
+    style_right = _estilo('certificado_fecha', fontSize=12.5, alignment=TA_RIGHT)
+    style_certificado = _estilo('certificado_titulo', fontSize=18, alignment=TA_CENTER)
+
+    table_style_temario = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.black, None, (2, 2, 1)),
+        ('BOX', (0, 0), (-1, -1), 0.25, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ('FONTSIZE', (0, 1), (0, -1), 10),
+    ])
+    table_style_firma = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ])
+    table_style_pie = TableStyle([('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('FONTSIZE', (0, 0), (-1, -1), 12)])
+
+
+class DibujoCertificados(EstilosCertificadoMixin):
+    """
+    Dibuja certificados (`CertificadoSpec`) sobre un canvas: anverso con los datos del participante sobre la
+    capa fija de su plantilla y reverso con el correlativo sobre el temario.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+
+    def dibujar(self, certificados):
+        self.canvas.setPageCompression(int(settings.CERTIFICADO_PDF_COMPRESION))
+        self.canvas.setPageSize(letter)
+        self.canvas.setFont('Helvetica', 13)
+        for certificado in certificados:
+            self.anverso(certificado)
+            self.canvas.showPage()
+            self.reverso(certificado)
+            self.canvas.showPage()
+
+    def anverso(self, certificado):
+        plantilla = certificado.plantilla
+        capa_fija(self.canvas, 'anverso-{}'.format(plantilla.clave), lambda: self.anverso_fijo(plantilla))
+
+        nombre_completo = Paragraph('<b>{}</b>'.format(certificado.nombre_completo.upper()),
+                                    style=self.style_fullname)
+        w, h = nombre_completo.wrap(440, 0)
+        nombre_completo.drawOn(self.canvas, 85, 475 - h)
+
+        parrafo1 = Paragraph(certificado.texto, style=self.style4)
+        w, h = parrafo1.wrap(440, 0)
+        parrafo1.drawOn(self.canvas, 85, 440 - h)
+
+        # Sin dominio configurado el QR solo llevaría una ruta relativa, que un teléfono no puede abrir
+        if certificado.correlativo and settings.CERTIFICADO_VERIFICACION_URL:
+            dibujar_qr(self.canvas, url_verificacion(certificado.correlativo))
+
+    def reverso(self, certificado):
+        plantilla = certificado.plantilla
+        codigo_barra = code128.Code128(barWidth=1.2, barHeight=25)
+        codigo_barra.value = certificado.correlativo
+        codigo_barra.drawOn(self.canvas, x=215, y=730)
+        self.canvas.drawString(278, 715, certificado.correlativo)
+        capa_fija(self.canvas, 'temario-{}'.format(plantilla.clave), lambda: self.temario(plantilla))
+
+    def anverso_fijo(self, plantilla):
+        dibujar_logos(self.canvas)
+
+        titulo = Paragraph('<b>CERTIFICADO</b>', style=self.style_certificado)
+        w, h = titulo.wrap(440, 0)
+        titulo.drawOn(self.canvas, 85, 600 - h)
+
+        otorgado = Paragraph('La Oficina General de Calidad Universitaria de la Universidad Nacional Santiago '
+                             'Antúnez de Mayolo certifica que:', style=self.style4)
+        w, h = otorgado.wrap(440, 0)
+        otorgado.drawOn(self.canvas, 85, 535 - h)
+
+        fecha_lugar = Paragraph('Huaraz, {}'.format(fecha_larga(plantilla.fecha_emision)), style=self.style_right)
+        w, h = fecha_lugar.wrap(440, 0)
+        fecha_lugar.drawOn(self.canvas, 85, 350 - h)
+
+        cx = 0
+        for firma in plantilla.firmas:
+            # Firma centrada sobre la celda de 230 del nombre del firmante
+            if len(plantilla.firmas) == 2:
+                x_firma, x_tabla, paso = 125, 65, 250
+            else:
+                x_firma, x_tabla, paso = 110, 37, 150
+            dibujar_firma(self.canvas, firma.firma_hash, x_firma + cx, 210)
+            data4 = [['__________________________________']] + [[linea] for linea in firma.lineas]
+            tt = Table(data=data4, rowHeights=14, repeatCols=1, colWidths=230)
+            tt.setStyle(self.table_style_firma)
+            w, h = tt.wrap(0, 0)
+            tt.drawOn(self.canvas, x_tabla + cx, 170)
+            cx += paso
+
+        data6 = [
+            [Paragraph('VICERRECTORADO ACADÉMICO', style=self.style)],
+            [Paragraph('Consejo de Capacitación, Especialización y Actualización Docente', style=self.style)],
+            [Paragraph('CCEAD UNASAM', style=self.style)],
+            [],
+        ]
+        ta = Table(data=data6, rowHeights=15, repeatCols=1, colWidths=610)
+        ta.setStyle(self.table_style_pie)
+        w, h = ta.wrap(0, 0)
+        ta.drawOn(self.canvas, 1, 25)
+
+    def temario(self, plantilla):
+        if len(plantilla.temarios) == 1:
+            titulo, temas = plantilla.temarios[0]
+            data1 = [[Paragraph('<b>{}</b>'.format(titulo), style=self.style)]] + [[t] for t in temas]
+            tbl = Table(data=data1, rowHeights=30, repeatCols=1, colWidths=[439])
+            tbl.setStyle(self.table_style_temario)
+            w, h = tbl.wrap(0, 0)
+            tbl.drawOn(self.canvas, 87, 680 - h)
+            return
+
+        cxx = 0
+        for titulo, temas in plantilla.temarios:
+            data1 = [[Paragraph('<b>{}</b>'.format(titulo), style=self.style)]]
+            trow = 20
+            espace = 0
+            for tema in temas:
+                if len(tema) >= 90:
+                    # Los temas largos se parten en dos líneas en el último espacio antes del carácter 90
+                    trow = 30
+                    espace = 30
+                    pos_te = tema[:90].rfind(' ')
+                    tema = '{}\n  {}'.format(tema[:pos_te], tema[pos_te:])
+                data1.append([tema])
+            tbl = Table(data=data1, rowHeights=trow, repeatCols=1, colWidths=[439])
+            tbl.setStyle(self.table_style_temario)
+            w, h = tbl.wrap(0, 0)
+            tbl.drawOn(self.canvas, 87, (680 - h) - cxx + espace)
+            cxx += 50 + (len(temas) * 20)
+
+
+def dibujar_pdf(certificados, destino=None, titulo=''):
+    salida = BytesIO() if destino is None else destino
+    canvas = Canvas(salida, invariant=1)
+    canvas._doc.setTitle(titulo)
+    DibujoCertificados(canvas).dibujar(certificados)
+    canvas.save()
+    if destino is None:
+        return salida.getvalue()
+
+
+def calentar_dibujo():
+    """
+    Deja cargado en el proceso lo que cuesta la primera vez: módulos de reportlab y qrcode, fuentes, estilos y
+    logos, dibujando un certificado de prueba que no consulta la base.
+    """
+    plantilla = PlantillaCertificado(clave='calentar', capacitacion_id=0, modulo_id=None, fecha_emision=date.today(),
+                                     firmas=(), temarios=(('Temario', ('',)),))
+    dibujar_pdf((CertificadoSpec(plantilla=plantilla, persona_id=0, cargo=CARGO_CERT_EMITIDO_ASISTENTE,
+                                 nombre_completo='', texto='', correlativo='00000-0000'),))
+
+
+def componer_lote(pdf_anterior, paginas, nuevos, titulo=''):
+    """
+    PDF masivo armado con los certificados de `pdf_anterior` que empiezan en las páginas de `paginas` y, donde
+    `paginas` tiene None, con los de `nuevos` (en orden), que se dibujan. Las páginas tomadas de un mismo
+    documento siguen compartiendo logos, firmas y capas fijas.
+    """
+    lector_anterior = PdfFileReader(BytesIO(pdf_anterior), strict=False)
+    lector_nuevos = PdfFileReader(BytesIO(dibujar_pdf(nuevos)), strict=False)
+    pdf = PdfFileWriter()
+    pagina_nueva = 0
+    for pagina in paginas:
+        if pagina is None:
+            lector, pagina = lector_nuevos, pagina_nueva
+            pagina_nueva += 2
+        else:
+            lector = lector_anterior
+        pdf.addPage(lector.getPage(pagina))
+        pdf.addPage(lector.getPage(pagina + 1))
+    pdf.addMetadata({'/Title': titulo})
+    salida = BytesIO()
+    pdf.write(salida)
+    return salida.getvalue()
+
+
+def unir_pdfs(contenidos, titulo=''):
+    """
+    Une en un PDF, sin volver a dibujarlos, los PDF de `contenidos`.
+    """
+    pdf = PdfFileWriter()
+    for contenido in contenidos:
+        lector = PdfFileReader(BytesIO(contenido), strict=False)
+        for pagina in range(lector.getNumPages()):
+            pdf.addPage(lector.getPage(pagina))
+    pdf.addMetadata({'/Title': titulo})
+    salida = BytesIO()
+    pdf.write(salida)
+    return salida.getvalue()
@@ -0,0 +1,237 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime
+from io import BytesIO
+
+import reportlab
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from PIL import Image, ImageDraw
+
+from apps.capacitacion.cache_certificados import invalidar_contexto_certificados
+from apps.capacitacion.dibujo import imagen_firma
+from apps.capacitacion.models import (ActaAsistencia, ArchivoCertificado, Capacitacion, DetalleAsistencia,
+                                      HistorialRevision, LoteCertificados, Modulo, NotaParticipante,
+                                      ResponsableFirma)
+from apps.capacitacion.services import actualizar_padron, actualizar_resumen
+from apps.capacitacion.views import (GeneraCertificadoPdf, GeneraCertificadoPdfPorModulo,
+                                     GenerarMultipleCertificadosPdfView, GenerarMultipleCertificadosPorModPdfView,
+                                     RevisarCapacitacionView)
+from apps.common.constants import (AMBITO_UNASAM, EMISION_CERTIFICADO_UNICO_Y_MODULOS, ESTADO_ASISTENCIA_PRESENTE,
+                                   ESTADO_PROYECTO_CULMINADO, SEXO_MASCULINO, TIPO_FIRMA_CHOICES)
+from apps.persona.models import Firmante, Persona
+
+USUARIO_BENCHMARK = 'benchmark-cert'
+
+
+def _firma_sintetica(semilla):
+    imagen = Image.new('RGB', (600, 300), 'white')
+    dibujo = ImageDraw.Draw(imagen)
+    puntos = [(40 + i * 26, 150 + ((i * 37 + semilla * 53) % 120) - 60) for i in range(21)]
+    dibujo.line(puntos, fill='navy', width=6)
+    salida = BytesIO()
+    imagen.save(salida, 'PNG')
+    return salida.getvalue()
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Command(BaseCommand):
+    help = ('Mide la descarga de certificados de cursos sintéticos a través de las vistas: padrón, contexto, lote, '
+            'archivo y dibujo. Informa ms, bytes y consultas por certificado y el pico de memoria de cada escenario, '
+            'y guarda los resultados en JSON para comparar entre commits. Los datos se crean en una transacción que '
+            'se revierte al terminar, por eso se dibuja en este proceso aunque haya CERTIFICADO_PROCESOS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participantes', nargs='+', type=int, default=[10, 100],
+                            help='Cantidades de participantes a medir')
+        parser.add_argument('--modulos', type=int, default=3, help='Módulos del curso (temarios del reverso)')
+        parser.add_argument('--temas', type=int, default=8, help='Temas por módulo')
+        parser.add_argument('--firmantes', type=int, default=3, choices=[2, 3])
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--salida', default='benchmark-certificados.json', help='Archivo JSON de resultados')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior con el que comparar')
+
+    def handle(self, *args, **options):
+        # Los procesos de dibujo no ven los datos de una transacción sin confirmar
+        with override_settings(CERTIFICADO_PROCESOS=0), transaction.atomic():
+            try:
+                resultados = self.medir(options)
+            finally:
+                transaction.set_rollback(True)
+                imagen_firma.cache_clear()
+
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'reportlab': reportlab.Version,
+            'perfil': {
+                'compresion': settings.CERTIFICADO_PDF_COMPRESION,
+                'imagen_ppp': settings.CERTIFICADO_IMAGEN_PPP,
+                'jpeg_calidad': settings.CERTIFICADO_JPEG_CALIDAD,
+            },
+            'parametros': {k: options[k] for k in ('participantes', 'modulos', 'temas', 'firmantes', 'repeticiones')},
+            'resultados': resultados,
+        }
+        with open(options['salida'], 'w') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS('Resultados guardados en {}'.format(options['salida'])))
+        if options['comparar']:
+            self.comparar(resultados, options['comparar'])
+
+    def curso(self, numero, participantes, usuario, options):
+        """
+        Capacitación culminada como la deja RevisarCapacitacionView: módulos con acta, notas y asistencia,
+        firmantes, certificados emitidos, resumen y padrón.
+        """
+        capacitacion = Capacitacion.objects.create(
+            nombre='Curso de Capacitación Sintética {} para Medición de Certificados'.format(numero),
+            fecha_inicio=date(2022, 3, 1), fecha_fin=date(2022, 4, 30), canal_reunion='Virtual',
+            tipo_emision_certificado=EMISION_CERTIFICADO_UNICO_Y_MODULOS, estado=ESTADO_PROYECTO_CULMINADO)
+        modulos = [
+            Modulo.objects.create(capacitacion=capacitacion, nombre='Módulo {}'.format(m), horas_academicas=10,
+                                  temas='\n'.join('Tema {}.{}: contenido del tema de capacitación número {}'.format(
+                                      m, t, t) for t in range(1, options['temas'] + 1)))
+            for m in range(1, options['modulos'] + 1)
+        ]
+        personas = Persona.objects.bulk_create([
+            Persona(numero_documento='B{}-{}'.format(numero, i), sexo=SEXO_MASCULINO,
+                    nombres='Participante {}'.format(i), apellido_paterno='Apellido{}'.format(i),
+                    apellido_materno='Benchmark')
+            for i in range(participantes)
+        ])
+        for i in range(options['firmantes']):
+            persona = Persona.objects.create(numero_documento='BF{}-{}'.format(numero, i), sexo=SEXO_MASCULINO,
+                                             nombres='Firmante {}'.format(i), apellido_paterno='Benchmark',
+                                             apellido_materno='Certificados')
+            firmante = Firmante.objects.create(persona=persona, ambito=AMBITO_UNASAM, firma=_firma_sintetica(i))
+            ResponsableFirma.objects.create(capacitacion=capacitacion, firmante=firmante,
+                                            tipo_firma=TIPO_FIRMA_CHOICES[i][0])
+        actas = []
+        for modulo in modulos:
+            acta = ActaAsistencia.objects.create(modulo=modulo)
+            NotaParticipante.objects.bulk_create([NotaParticipante(acta_asistencia=acta, persona=p,
+                                                                   resultado='APROBADO') for p in personas])
+            DetalleAsistencia.objects.bulk_create([
+                DetalleAsistencia(acta_asistencia=acta, persona=p, fecha=fecha, estado=ESTADO_ASISTENCIA_PRESENTE)
+                for p in personas for fecha in (date(2022, 3, 1), date(2022, 4, 30))
+            ])
+            actas.append(acta)
+        HistorialRevision.objects.create(capacitacion=capacitacion, estado=ESTADO_PROYECTO_CULMINADO)
+
+        vista = RevisarCapacitacionView()
+        vista.request = self.peticion(usuario)
+        vista.insert_emision_cert(capacitacion, capacitacion.tipo_emision_certificado, modulos, actas)
+        # El resumen y el padrón se aplican al confirmar, y esta transacción no se confirma
+        actualizar_resumen([capacitacion.id])
+        actualizar_padron([capacitacion.id])
+        return capacitacion, modulos[0], personas
+
+    def peticion(self, usuario):
+        peticion = RequestFactory().get('/')
+        peticion.user = usuario
+        return peticion
+
+    def escenarios(self, capacitacion, modulo, personas):
+        # Cada escenario "en frío" descarta lo guardado antes de cada repetición; el siguiente lo reutiliza
+        def sin_lotes():
+            LoteCertificados.objects.filter(capacitacion=capacitacion).delete()
+            invalidar_contexto_certificados([capacitacion.id])
+
+        def sin_archivo():
+            ArchivoCertificado.objects.filter(capacitacion=capacitacion).delete()
+            invalidar_contexto_certificados([capacitacion.id])
+
+        curso_masivo = [(GenerarMultipleCertificadosPdfView, {'id': capacitacion.id})]
+        curso_individual = [(GeneraCertificadoPdf, {'id_capacitacion': capacitacion.id, 'id_persona': p.id})
+                            for p in personas]
+        modulo_masivo = [(GenerarMultipleCertificadosPorModPdfView, {'id': capacitacion.id, 'id_modulo': modulo.id})]
+        modulo_individual = [(GeneraCertificadoPdfPorModulo, {'id_capacitacion': capacitacion.id,
+                                                              'id_modulo': modulo.id, 'id_persona': p.id})
+                             for p in personas]
+        return (
+            ('curso', 'masivo', sin_lotes, curso_masivo),
+            ('curso', 'masivo_lote', None, curso_masivo),
+            ('curso', 'individual', sin_archivo, curso_individual),
+            ('curso', 'individual_archivo', None, curso_individual),
+            ('modulo', 'masivo', sin_lotes, modulo_masivo),
+            ('modulo', 'masivo_lote', None, modulo_masivo),
+            ('modulo', 'individual', sin_archivo, modulo_individual),
+            ('modulo', 'individual_archivo', None, modulo_individual),
+        )
+
+    def descargar(self, usuario, peticiones):
+        respuestas = [vista.as_view()(self.peticion(usuario), **kwargs) for vista, kwargs in peticiones]
+        for respuesta in respuestas:
+            if respuesta.status_code != 200:
+                raise RuntimeError('La descarga respondió {}'.format(respuesta.status_code))
+        return respuestas
+
+    def medir(self, options):
+        usuario = get_user_model().objects.create(username=USUARIO_BENCHMARK)
+        resultados = []
+        for numero, participantes in enumerate(options['participantes']):
+            capacitacion, modulo, personas = self.curso(numero, participantes, usuario, options)
+            for plantilla, escenario, preparar, peticiones in self.escenarios(capacitacion, modulo, personas):
+                segundos = []
+                for _ in range(options['repeticiones']):
+                    if preparar:
+                        preparar()
+                    with CaptureQueriesContext(connection) as consultas:
+                        inicio = time.perf_counter()
+                        respuestas = self.descargar(usuario, peticiones)
+                        segundos.append(time.perf_counter() - inicio)
+                # El pico de memoria se mide en una pasada aparte: tracemalloc hace más lento lo que mide
+                if preparar:
+                    preparar()
+                tracemalloc.start()
+                self.descargar(usuario, peticiones)
+                pico = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                resultado = {
+                    'plantilla': plantilla,
+                    'escenario': escenario,
+                    'participantes': participantes,
+                    'segundos': [round(s, 4) for s in segundos],
+                    'ms_por_certificado': round(statistics.median(segundos) * 1000 / participantes, 2),
+                    'bytes_por_certificado': round(sum(len(r.content) for r in respuestas) / participantes),
+                    'consultas_por_certificado': round(len(consultas) / participantes, 2),
+                    'memoria_pico_kb': round(pico / 1024),
+                }
+                resultados.append(resultado)
+                self.stdout.write('{plantilla} {escenario} x{participantes}: {ms_por_certificado} ms/certificado, '
+                                  '{bytes_por_certificado} bytes/certificado, {consultas_por_certificado} '
+                                  'consultas/certificado, pico de memoria {memoria_pico_kb} KB'.format(**resultado))
+        return resultados
+
+    def comparar(self, resultados, ruta):
+        with open(ruta) as archivo:
+            anterior = json.load(archivo)
+        previos = {(r['plantilla'], r['escenario'], r['participantes']): r for r in anterior['resultados']}
+        self.stdout.write('Comparación con {} (commit {}):'.format(ruta, anterior.get('commit') or '?'))
+        for r in resultados:
+            previo = previos.get((r['plantilla'], r['escenario'], r['participantes']))
+            if not previo:
+                continue
+            self.stdout.write('{} {} x{}: {:+.1f} % ms/certificado, {:+.1f} % bytes/certificado, {:+.2f} '
+                              'consultas/certificado, {:+.1f} % memoria'.format(
+                                  r['plantilla'], r['escenario'], r['participantes'],
+                                  (r['ms_por_certificado'] / previo['ms_por_certificado'] - 1) * 100,
+                                  (r['bytes_por_certificado'] / previo['bytes_por_certificado'] - 1) * 100,
+                                  r['consultas_por_certificado'] - previo.get('consultas_por_certificado', 0),
+                                  (r['memoria_pico_kb'] / previo['memoria_pico_kb'] - 1) * 100))
@@ -0,0 +1,38 @@
+import traceback
+
+from django.core.management.base import BaseCommand
+
+from apps.capacitacion.certificados import prerenderizar_certificados
+from apps.capacitacion.models import Capacitacion
+from apps.common.constants import ESTADO_PROYECTO_CULMINADO
+
+
+class Command(BaseCommand):
+    help = ('Dibuja por adelantado los certificados (PDF masivos e individuales) de las capacitaciones. Al darlas '
+            'por culminadas se lanza solo, en un proceso aparte; sin argumentos retoma las que quedaron pendientes '
+            '(p. ej. si ese proceso no terminó), por eso conviene programarlo también en cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int,
+                            help='Ids de capacitación; si se omite se usan las pendientes de dibujar')
+        parser.add_argument('--culminadas', action='store_true', help='Todas las capacitaciones culminadas')
+
+    def handle(self, *args, **options):
+        capacitaciones = Capacitacion.objects.order_by('id')
+        if options['ids']:
+            capacitaciones = capacitaciones.filter(id__in=options['ids'])
+        elif options['culminadas']:
+            capacitaciones = capacitaciones.filter(estado=ESTADO_PROYECTO_CULMINADO)
+        else:
+            capacitaciones = capacitaciones.filter(certificados_pendientes=True)
+        total = 0
+        for capacitacion in capacitaciones:
+            try:
+                dibujados = prerenderizar_certificados(capacitacion)
+            except Exception:
+                # La capacitación sigue pendiente para la próxima ejecución
+                self.stderr.write('{}:\n{}'.format(capacitacion.nombre, traceback.format_exc()))
+                continue
+            total += dibujados
+            self.stdout.write('{}: {} certificado(s) dibujado(s)'.format(capacitacion.nombre, dibujados))
+        self.stdout.write(self.style.SUCCESS('{} certificado(s) dibujado(s) en total'.format(total)))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.capacitacion.models import Capacitacion
+from apps.capacitacion.services import actualizar_padron, actualizar_resumen
+
+
+class Command(BaseCommand):
+    help = ('Recalcula los campos de resumen (módulos, actas, horas, firmantes, fecha de culminación) y el padrón '
+            'de certificados de las capacitaciones')
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Ids de capacitación; si se omite se recalculan todas')
+
+    def handle(self, *args, **options):
+        ids = options['ids'] or list(Capacitacion.objects.values_list('id', flat=True))
+        total = actualizar_resumen(ids)
+        actualizar_padron(ids)
+        self.stdout.write(self.style.SUCCESS('Resumen y padrón recalculados para {} capacitación(es)'.format(total)))
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.capacitacion.certificados import certificados_curso, certificados_modulo, generar_pdf
+from apps.capacitacion.models import Capacitacion, Modulo, PadronCertificado
+from apps.common.constants import TIPO_CERT_EMITIDO_UNICO
+
+
+class Command(BaseCommand):
+    help = ('Genera los certificados de las capacitaciones con el perfil de salida configurado e informa el '
+            'promedio de bytes por certificado, en el PDF masivo y en los PDF individuales que se envían por correo')
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Ids de capacitación; si se omite se usan todas')
+
+    def handle(self, *args, **options):
+        grupos = PadronCertificado.objects.filter(elegible=True).values_list(
+            'capacitacion_id', 'tipo', 'modulo_id').distinct().order_by('capacitacion_id', 'tipo', 'modulo_id')
+        if options['ids']:
+            grupos = grupos.filter(capacitacion_id__in=options['ids'])
+        grupos = list(grupos)
+        capacitaciones = Capacitacion.objects.in_bulk({c for c, _, _ in grupos})
+        modulos = Modulo.objects.in_bulk({m for _, _, m in grupos})
+
+        self.stdout.write('Perfil: compresión {}, imágenes a {} ppp, calidad JPEG {}'.format(
+            'sí' if settings.CERTIFICADO_PDF_COMPRESION else 'no', settings.CERTIFICADO_IMAGEN_PPP or 'original',
+            settings.CERTIFICADO_JPEG_CALIDAD))
+        cantidad = bytes_masivo = bytes_individual = 0
+        for capacitacion_id, tipo, modulo_id in grupos:
+            capacitacion = capacitaciones[capacitacion_id]
+            if tipo == TIPO_CERT_EMITIDO_UNICO:
+                certificados = certificados_curso(capacitacion)
+                nombre = capacitacion.nombre
+            else:
+                certificados = certificados_modulo(capacitacion, modulos[modulo_id])
+                nombre = '{} / {}'.format(capacitacion.nombre, modulos[modulo_id].nombre)
+            if not certificados:
+                continue
+            masivo = len(generar_pdf(certificados))
+            individual = sum(len(generar_pdf([c])) for c in certificados)
+            cantidad += len(certificados)
+            bytes_masivo += masivo
+            bytes_individual += individual
+            self.stdout.write('{}: {} certificado(s), {:.1f} KB/certificado en el PDF masivo, {:.1f} KB/certificado '
+                              'por correo'.format(nombre, len(certificados), masivo / len(certificados) / 1024,
+                                                  individual / len(certificados) / 1024))
+        if cantidad:
+            self.stdout.write(self.style.SUCCESS(
+                'Promedio de {} certificado(s): {:.1f} KB en el PDF masivo, {:.1f} KB por correo'.format(
+                    cantidad, bytes_masivo / cantidad / 1024, bytes_individual / cantidad / 1024)))
+        else:
+            self.stdout.write('No hay certificados elegibles')
@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-19 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0004_auto_20220702_1829'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='capacitacion',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='capacitacion_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='capacitacion',
+            index=models.Index(fields=['creado_por', '-fecha_creacion'], name='capacitacion_creador_fecha_idx'),
+        ),
+    ]
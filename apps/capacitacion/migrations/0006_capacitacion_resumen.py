@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-19 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0005_capacitacion_indices_bandeja'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capacitacion',
+            name='fecha_culminado',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='capacitacion',
+            name='num_actas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='capacitacion',
+            name='num_modulos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='capacitacion',
+            name='tiene_firmantes',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='capacitacion',
+            name='total_horas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE capacitacion_capacitacion c SET
+                    num_modulos = (SELECT count(*) FROM capacitacion_modulo m WHERE m.capacitacion_id = c.id),
+                    num_actas = (SELECT count(*) FROM capacitacion_actaasistencia a
+                                 INNER JOIN capacitacion_modulo m ON m.id = a.modulo_id
+                                 WHERE m.capacitacion_id = c.id),
+                    total_horas = coalesce((SELECT sum(m.horas_academicas) FROM capacitacion_modulo m
+                                            WHERE m.capacitacion_id = c.id), 0),
+                    tiene_firmantes = EXISTS(SELECT 1 FROM capacitacion_responsablefirma r
+                                             WHERE r.capacitacion_id = c.id),
+                    fecha_culminado = (SELECT h.fecha_creacion FROM capacitacion_historialrevision h
+                                       WHERE h.capacitacion_id = c.id AND h.estado = 'culminado'
+                                       ORDER BY h.id DESC LIMIT 1);
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 3.2 on 2026-10-19 10:59
+
+from django.db import migrations, models
+
+# El trigger `trg_correlativo_cert` (ver apps/sql/README.md) sobreescribía el correlativo en cada INSERT; desde
+# ahora lo asigna la aplicación con CorrelativoCertificado.
+ELIMINAR_TRIGGER = """
+    DROP TRIGGER IF EXISTS trg_correlativo_cert ON capacitacion_certemitido;
+    DROP FUNCTION IF EXISTS genera_correlativo_cert();
+"""
+
+# Cada contador anual continúa desde el mayor número ya emitido para ese año. Los certificados sin
+# correlativo, o con uno repetido, reciben uno nuevo del año en que se emitieron.
+INICIALIZAR_CONTADORES = """
+    INSERT INTO capacitacion_correlativocertificado (prefijo, anio, ultimo)
+    SELECT '', split_part(correlativo, '-', 2)::smallint, max(split_part(correlativo, '-', 1)::integer)
+    FROM capacitacion_certemitido
+    WHERE correlativo ~ '^[0-9]+-[0-9]{4}$'
+    GROUP BY 2;
+
+    WITH pendientes AS (
+        SELECT c.id, date_part('year', coalesce(c.fecha_creacion, now()))::smallint AS anio
+        FROM capacitacion_certemitido c
+        WHERE coalesce(c.correlativo, '') = ''
+           OR EXISTS (SELECT 1 FROM capacitacion_certemitido o WHERE o.correlativo = c.correlativo AND o.id < c.id)
+    ), numerados AS (
+        SELECT id, anio, row_number() OVER (PARTITION BY anio ORDER BY id) AS n, count(*) OVER (PARTITION BY anio) AS total
+        FROM pendientes
+    ), contadores AS (
+        INSERT INTO capacitacion_correlativocertificado (prefijo, anio, ultimo)
+        SELECT DISTINCT '', anio, total FROM numerados
+        ON CONFLICT (prefijo, anio) DO UPDATE
+            SET ultimo = capacitacion_correlativocertificado.ultimo + EXCLUDED.ultimo
+        RETURNING anio, ultimo
+    )
+    UPDATE capacitacion_certemitido c
+    SET correlativo = lpad((k.ultimo - p.total + p.n)::text, 5, '0') || '-' || p.anio
+    FROM numerados p INNER JOIN contadores k ON k.anio = p.anio
+    WHERE c.id = p.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0006_capacitacion_resumen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorrelativoCertificado',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefijo', models.CharField(blank=True, default='', max_length=5)),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='correlativocertificado',
+            constraint=models.UniqueConstraint(fields=('prefijo', 'anio'), name='correlativo_cert_prefijo_anio_uniq'),
+        ),
+        migrations.RunSQL(sql=ELIMINAR_TRIGGER, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(sql=INICIALIZAR_CONTADORES, reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='certemitido',
+            name='correlativo',
+            field=models.CharField(max_length=15, unique=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0007_correlativo_certificado'),
+    ]
+
+    operations = [
+        # Antes de la restricción se conserva solo el primer certificado emitido de cada clave
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM capacitacion_certemitido a
+                USING capacitacion_certemitido b
+                WHERE a.modulo_id = b.modulo_id AND a.persona_id = b.persona_id AND a.cargo = b.cargo
+                  AND a.tipo = b.tipo AND a.id > b.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='certemitido',
+            constraint=models.UniqueConstraint(fields=('modulo', 'persona', 'cargo', 'tipo'), name='cert_emitido_uniq'),
+        ),
+    ]
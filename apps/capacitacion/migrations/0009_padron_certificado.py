@@ -0,0 +1,82 @@
+# Generated by Django 3.2 on 2026-10-19 11:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Copia del SQL de apps.capacitacion.services.actualizar_padron aplicada a todas las capacitaciones
+LLENAR_PADRON = """
+    WITH cursos AS (
+        SELECT c.id, c.tipo_emision_certificado AS emision,
+               (SELECT max(m.id) FROM capacitacion_modulo m WHERE m.capacitacion_id = c.id) AS ultimo_modulo
+        FROM capacitacion_capacitacion c
+        WHERE c.id = ANY(ARRAY(SELECT id FROM capacitacion_capacitacion))
+    ), notas AS (
+        SELECT m.capacitacion_id, m.id AS modulo_id, n.persona_id,
+               bool_and(coalesce(upper(n.resultado) = 'APROBADO', false)) AS aprobo
+        FROM capacitacion_notaparticipante n
+        INNER JOIN capacitacion_actaasistencia a ON a.id = n.acta_asistencia_id
+        INNER JOIN capacitacion_modulo m ON m.id = a.modulo_id
+        WHERE m.capacitacion_id = ANY(ARRAY(SELECT id FROM capacitacion_capacitacion))
+        GROUP BY m.capacitacion_id, m.id, n.persona_id
+    ), filas AS (
+        SELECT k.id AS capacitacion_id, k.ultimo_modulo AS modulo_id, n.persona_id,
+               'asistente' AS cargo, 'certificado_unico' AS tipo, bool_and(n.aprobo) AS elegible
+        FROM cursos k INNER JOIN notas n ON n.capacitacion_id = k.id
+        WHERE k.emision = ANY(ARRAY['certificado_unico', 'certificado_unico_y_modulos'])
+        GROUP BY k.id, k.ultimo_modulo, n.persona_id
+        UNION ALL
+        SELECT k.id, k.ultimo_modulo, e.persona_id, e.cargo, 'certificado_unico', true
+        FROM cursos k INNER JOIN capacitacion_equipoproyecto e ON e.capacitacion_id = k.id
+        WHERE k.emision = ANY(ARRAY['certificado_unico', 'certificado_unico_y_modulos']) AND k.ultimo_modulo IS NOT NULL
+        UNION ALL
+        SELECT n.capacitacion_id, n.modulo_id, n.persona_id, 'asistente', 'certificado_por_modulo', n.aprobo
+        FROM cursos k INNER JOIN notas n ON n.capacitacion_id = k.id
+        WHERE k.emision = ANY(ARRAY['certificado_por_modulo', 'certificado_unico_y_modulos'])
+        UNION ALL
+        SELECT k.id, m.id, e.persona_id, e.cargo, 'certificado_por_modulo', true
+        FROM cursos k
+        INNER JOIN capacitacion_modulo m ON m.capacitacion_id = k.id
+        INNER JOIN capacitacion_equipoproyecto e ON e.capacitacion_id = k.id
+        WHERE k.emision = ANY(ARRAY['certificado_por_modulo', 'certificado_unico_y_modulos'])
+    )
+    INSERT INTO capacitacion_padroncertificado (capacitacion_id, modulo_id, persona_id, cargo, tipo, elegible,
+                                                correlativo)
+    SELECT f.capacitacion_id, f.modulo_id, f.persona_id, f.cargo, f.tipo, f.elegible, ce.correlativo
+    FROM filas f
+    LEFT JOIN capacitacion_certemitido ce ON ce.modulo_id = f.modulo_id AND ce.persona_id = f.persona_id
+                                         AND ce.cargo = f.cargo AND ce.tipo = f.tipo
+    ON CONFLICT DO NOTHING
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0003_persona_busqueda'),
+        ('capacitacion', '0008_cert_emitido_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PadronCertificado',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cargo', models.CharField(choices=[('ponente', 'Ponente'), ('organizador', 'Organizador'), ('responsable', 'Responsable'), ('asistente', 'Asistente')], max_length=25)),
+                ('tipo', models.CharField(choices=[('certificado_unico', 'Certificado único'), ('certificado_por_modulo', 'Certificado por módulo')], max_length=45)),
+                ('elegible', models.BooleanField(default=False)),
+                ('correlativo', models.CharField(blank=True, max_length=15, null=True)),
+                ('capacitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='capacitacion.capacitacion')),
+                ('modulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='capacitacion.modulo')),
+                ('persona', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='persona.persona')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='padroncertificado',
+            index=models.Index(fields=['capacitacion', 'tipo'], name='padron_capacitacion_tipo_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='padroncertificado',
+            constraint=models.UniqueConstraint(fields=('modulo', 'persona', 'cargo', 'tipo'), name='padron_certificado_uniq'),
+        ),
+        migrations.RunSQL(sql=LLENAR_PADRON, reverse_sql=migrations.RunSQL.noop),
+    ]
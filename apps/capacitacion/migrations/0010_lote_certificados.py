@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-19 11:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0009_padron_certificado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteCertificados',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=50, unique=True)),
+                ('pdf', models.BinaryField()),
+                ('paginas', models.JSONField(default=dict)),
+                ('fecha_generado', models.DateTimeField(auto_now=True)),
+                ('capacitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='capacitacion.capacitacion')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-19 11:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0010_lote_certificados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoCertificado',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('huella', models.CharField(max_length=64, unique=True)),
+                ('pdf', models.BinaryField()),
+                ('fecha_generado', models.DateTimeField(auto_now_add=True)),
+                ('capacitacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='capacitacion.capacitacion')),
+            ],
+        ),
+    ]
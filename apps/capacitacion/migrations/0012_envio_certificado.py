@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-19 11:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0011_archivo_certificado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioCertificado',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True)),
+                ('message_id', models.CharField(blank=True, default='', max_length=255)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('cert_emitido', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='capacitacion.certemitido')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('capacitacion', '0012_envio_certificado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capacitacion',
+            name='certificados_pendientes',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
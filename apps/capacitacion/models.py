@@ -29,6 +29,54 @@ class Capacitacion(BaseModel):
     facultad = models.ForeignKey(Facultad, on_delete=models.PROTECT, blank=True, null=True)
     se_envio_correo = models.BooleanField(default=False)
     estado = models.CharField(max_length=25, choices=ESTADO_PROYECTO_CHOICES, default=ESTADO_PROYECTO_REGISTRADO)
+    # Resumen mantenido por apps.capacitacion.services.programar_resumen
+    num_modulos = models.PositiveIntegerField(default=0, editable=False)
+    num_actas = models.PositiveIntegerField(default=0, editable=False)
+    total_horas = models.PositiveIntegerField(default=0, editable=False)
+    tiene_firmantes = models.BooleanField(default=False, editable=False)
+    fecha_culminado = models.DateTimeField(editable=False, blank=True, null=True)
+    # Certificados por dibujar de antemano; lo marca programar_prerender y lo limpia prerenderizar_certificados
+    certificados_pendientes = models.BooleanField(default=False, editable=False)
+
+    CAMPOS_RESUMEN = ('num_modulos', 'num_actas', 'total_horas', 'tiene_firmantes', 'fecha_culminado')
+    # Campos de los que dependen el padrón de certificados y el texto de los certificados (ver signals.py)
+    CAMPOS_PADRON = ('tipo_emision_certificado',)
+    CAMPOS_CONTEXTO_CERTIFICADOS = ('nombre', 'canal_reunion', 'fecha_inicio', 'fecha_fin')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', '-fecha_creacion'], name='capacitacion_estado_fecha_idx'),
+            models.Index(fields=['creado_por', '-fecha_creacion'], name='capacitacion_creador_fecha_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # El resumen solo lo escribe services.actualizar_resumen (y los certificados pendientes, el prerender);
+        # una instancia cargada antes no debe pisarlos con valores viejos.
+        if self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [f.name for f in self._meta.concrete_fields if not f.primary_key and
+                                       f.name not in self.CAMPOS_RESUMEN + ('certificados_pendientes',)]
+        super().save(*args, **kwargs)
+        guardados = kwargs.get('update_fields')
+        self._valores_cargados = dict(getattr(self, '_valores_cargados', None) or {}, **{
+            f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields
+            if guardados is None or f.name in guardados})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._valores_cargados = dict(zip(field_names, values))
+        return instancia
+
+    def campos_modificados(self):
+        """
+        Nombres de los campos que cambiaron desde que la instancia se leyó (o guardó) por última vez; None si no
+        viene de la base.
+        """
+        cargados = getattr(self, '_valores_cargados', None)
+        if cargados is None:
+            return None
+        return {f.name for f in self._meta.concrete_fields
+                if f.attname in cargados and getattr(self, f.attname) != cargados[f.attname]}
 
 
 class EquipoProyecto(models.Model):
@@ -107,5 +155,82 @@ class CertEmitido(BaseModel):
     modulo = models.ForeignKey(Modulo, on_delete=models.PROTECT)
     persona = models.ForeignKey(Persona, on_delete=models.PROTECT)
     cargo = models.CharField(max_length=25, choices=CARGO_CERT_EMITIDO_CHOICES)
-    correlativo = models.CharField(max_length=15)
+    correlativo = models.CharField(max_length=15, unique=True)
     estado = models.CharField(max_length=25, choices=ESTADO_CERT_CHOICES, default=ESTADO_CERT_EMITIDO)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['modulo', 'persona', 'cargo', 'tipo'], name='cert_emitido_uniq'),
+        ]
+
+
+class CorrelativoCertificado(models.Model):
+    """
+    Último número de correlativo reservado por prefijo y año.
+    """
+    prefijo = models.CharField(max_length=5, blank=True, default='')
+    anio = models.PositiveSmallIntegerField()
+    ultimo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefijo', 'anio'], name='correlativo_cert_prefijo_anio_uniq'),
+        ]
+
+
+class PadronCertificado(models.Model):
+    """
+    Padrón de certificados por capacitación: quién recibe cada certificado (único o por módulo), si es
+    elegible y su correlativo. Lo reconstruye apps.capacitacion.services.actualizar_padron.
+    """
+    capacitacion = models.ForeignKey(Capacitacion, on_delete=models.CASCADE)
+    modulo = models.ForeignKey(Modulo, on_delete=models.CASCADE)
+    persona = models.ForeignKey(Persona, on_delete=models.CASCADE)
+    cargo = models.CharField(max_length=25, choices=CARGO_CERT_EMITIDO_CHOICES)
+    tipo = models.CharField(max_length=45, choices=TIPO_CERT_EMITIDO_CHOICES)
+    elegible = models.BooleanField(default=False)
+    correlativo = models.CharField(max_length=15, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['modulo', 'persona', 'cargo', 'tipo'], name='padron_certificado_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['capacitacion', 'tipo'], name='padron_capacitacion_tipo_idx'),
+        ]
+
+
+class LoteCertificados(models.Model):
+    """
+    Último PDF masivo generado para una plantilla de certificados (curso o módulo) y la página donde empieza
+    cada certificado según su huella, para reutilizar los que no cambiaron. Ver
+    apps.capacitacion.certificados.generar_lote.
+    """
+    clave = models.CharField(max_length=50, unique=True)
+    capacitacion = models.ForeignKey(Capacitacion, on_delete=models.CASCADE)
+    pdf = models.BinaryField()
+    paginas = models.JSONField(default=dict)
+    fecha_generado = models.DateTimeField(auto_now=True)
+
+
+class ArchivoCertificado(models.Model):
+    """
+    PDF individual ya dibujado de un certificado, identificado por su huella. Ver
+    apps.capacitacion.certificados.pdf_certificado.
+    """
+    huella = models.CharField(max_length=64, unique=True)
+    capacitacion = models.ForeignKey(Capacitacion, on_delete=models.CASCADE)
+    pdf = models.BinaryField()
+    fecha_generado = models.DateTimeField(auto_now_add=True)
+
+
+class EnvioCertificado(models.Model):
+    """
+    Envío por correo de cada certificado emitido: cuándo se entregó al servidor de correo, con qué Message-ID,
+    cuántos intentos lleva y el último error. Los envíos masivos omiten los que ya tienen fecha de envío.
+    """
+    cert_emitido = models.OneToOneField(CertEmitido, on_delete=models.CASCADE)
+    fecha_envio = models.DateTimeField(blank=True, null=True)
+    message_id = models.CharField(max_length=255, blank=True, default='')
+    intentos = models.PositiveIntegerField(default=0)
+    ultimo_error = models.TextField(blank=True, default='')
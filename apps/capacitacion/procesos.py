@@ -0,0 +1,74 @@
+"""
+Procesos de dibujo de certificados: grupo opcional (CERTIFICADO_PROCESOS) de procesos de larga duración que
+cargan una sola vez reportlab, qrcode, fuentes, estilos y logos, y dibujan los PDF que les encargan los procesos
+web. Estos nunca importan apps.capacitacion.dibujo: con el grupo activo no cargan nada de eso. Este módulo no
+importa modelos: los procesos lo cargan antes de configurar Django.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+_grupo = None
+_grupo_pid = None
+_candado = threading.Lock()
+
+
+def _iniciar_proceso():
+    import django
+    django.setup()
+    from apps.capacitacion.dibujo import calentar_dibujo
+    calentar_dibujo()
+
+
+def _listo():
+    return True
+
+
+def _ejecutar(funcion, argumentos):
+    from apps.capacitacion import dibujo
+    return getattr(dibujo, funcion)(*argumentos)
+
+
+def ejecutar_dibujo(trabajos):
+    """
+    Resultado de cada par (nombre de una función de apps.capacitacion.dibujo, argumentos) de `trabajos`: en
+    paralelo en los procesos de dibujo o, si CERTIFICADO_PROCESOS es 0, uno tras otro en este proceso. Las
+    funciones van por nombre para no importar el módulo de dibujo aquí.
+    """
+    grupo = grupo_dibujo()
+    if grupo is None:
+        return [_ejecutar(funcion, argumentos) for funcion, argumentos in trabajos]
+    futuros = [grupo.submit(_ejecutar, funcion, argumentos) for funcion, argumentos in trabajos]
+    return [f.result() for f in futuros]
+
+
+def grupo_dibujo():
+    """
+    Grupo de procesos de dibujo del proceso actual, o None si CERTIFICADO_PROCESOS es 0. Se crea una vez por
+    proceso (también en cada worker que haga fork del servidor) con procesos nuevos, que no heredan conexiones
+    a la base ni hilos. El grupo es por worker, no por servidor: cada uno suma CERTIFICADO_PROCESOS procesos
+    con su propio Django, conexión a la base y caché de firmas (ver settings).
+    """
+    global _grupo, _grupo_pid
+    if not settings.CERTIFICADO_PROCESOS:
+        return None
+    with _candado:
+        if _grupo is None or _grupo_pid != os.getpid():
+            _grupo = ProcessPoolExecutor(settings.CERTIFICADO_PROCESOS, initializer=_iniciar_proceso,
+                                         mp_context=multiprocessing.get_context('spawn'))
+            _grupo_pid = os.getpid()
+    return _grupo
+
+
+def iniciar_procesos_dibujo():
+    """
+    Arranca los procesos de dibujo junto con la aplicación (ver config/wsgi.py), para que la primera descarga no
+    espere a que carguen.
+    """
+    grupo = grupo_dibujo()
+    if grupo is not None:
+        for _ in range(settings.CERTIFICADO_PROCESOS):
+            grupo.submit(_listo)
@@ -0,0 +1,242 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import BoolAnd
+from django.db import IntegrityError, connection, transaction
+from django.db.models import BooleanField, Case, Count, Exists, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.capacitacion.models import (ActaAsistencia, Capacitacion, CertEmitido, CorrelativoCertificado,
+                                      HistorialRevision, Modulo, NotaParticipante, PadronCertificado,
+                                      ResponsableFirma)
+from apps.common.constants import (ESTADO_PROYECTO_CULMINADO, CARGO_CERT_EMITIDO_ASISTENTE, TIPO_CERT_EMITIDO_UNICO,
+                                   TIPO_CERT_EMITIDO_MODULO, EMISION_CERTIFICADO_UNICO, EMISION_CERTIFICADO_MODULOS,
+                                   EMISION_CERTIFICADO_UNICO_Y_MODULOS)
+from apps.persona.models import Persona
+
+logger = logging.getLogger(__name__)
+
+_pendientes = threading.local()
+
+# Reconstruye el padrón de las capacitaciones `ids`: asistentes con nota (elegibles si aprobaron todas sus
+# actas) y miembros del equipo (siempre elegibles), para el certificado único (en el último módulo) y/o por
+# módulo según el tipo de emisión, con el correlativo ya emitido si existe.
+SQL_PADRON = """
+    WITH cursos AS (
+        SELECT c.id, c.tipo_emision_certificado AS emision,
+               (SELECT max(m.id) FROM capacitacion_modulo m WHERE m.capacitacion_id = c.id) AS ultimo_modulo
+        FROM capacitacion_capacitacion c
+        WHERE c.id = ANY(%(ids)s)
+    ), notas AS (
+        SELECT m.capacitacion_id, m.id AS modulo_id, n.persona_id,
+               bool_and(coalesce(upper(n.resultado) = 'APROBADO', false)) AS aprobo
+        FROM capacitacion_notaparticipante n
+        INNER JOIN capacitacion_actaasistencia a ON a.id = n.acta_asistencia_id
+        INNER JOIN capacitacion_modulo m ON m.id = a.modulo_id
+        WHERE m.capacitacion_id = ANY(%(ids)s)
+        GROUP BY m.capacitacion_id, m.id, n.persona_id
+    ), filas AS (
+        SELECT k.id AS capacitacion_id, k.ultimo_modulo AS modulo_id, n.persona_id,
+               %(asistente)s AS cargo, %(unico)s AS tipo, bool_and(n.aprobo) AS elegible
+        FROM cursos k INNER JOIN notas n ON n.capacitacion_id = k.id
+        WHERE k.emision = ANY(%(emision_unico)s)
+        GROUP BY k.id, k.ultimo_modulo, n.persona_id
+        UNION ALL
+        SELECT k.id, k.ultimo_modulo, e.persona_id, e.cargo, %(unico)s, true
+        FROM cursos k INNER JOIN capacitacion_equipoproyecto e ON e.capacitacion_id = k.id
+        WHERE k.emision = ANY(%(emision_unico)s) AND k.ultimo_modulo IS NOT NULL
+        UNION ALL
+        SELECT n.capacitacion_id, n.modulo_id, n.persona_id, %(asistente)s, %(modulo)s, n.aprobo
+        FROM cursos k INNER JOIN notas n ON n.capacitacion_id = k.id
+        WHERE k.emision = ANY(%(emision_modulo)s)
+        UNION ALL
+        SELECT k.id, m.id, e.persona_id, e.cargo, %(modulo)s, true
+        FROM cursos k
+        INNER JOIN capacitacion_modulo m ON m.capacitacion_id = k.id
+        INNER JOIN capacitacion_equipoproyecto e ON e.capacitacion_id = k.id
+        WHERE k.emision = ANY(%(emision_modulo)s)
+    )
+    INSERT INTO capacitacion_padroncertificado (capacitacion_id, modulo_id, persona_id, cargo, tipo, elegible,
+                                                correlativo)
+    SELECT f.capacitacion_id, f.modulo_id, f.persona_id, f.cargo, f.tipo, f.elegible, ce.correlativo
+    FROM filas f
+    LEFT JOIN capacitacion_certemitido ce ON ce.modulo_id = f.modulo_id AND ce.persona_id = f.persona_id
+                                         AND ce.cargo = f.cargo AND ce.tipo = f.tipo
+    ON CONFLICT DO NOTHING
+"""
+
+
+def _agregado(queryset, campo_capacitacion, agregado):
+    return Coalesce(Subquery(queryset.filter(**{campo_capacitacion: OuterRef('pk')}).order_by().values(
+        campo_capacitacion).annotate(total=agregado).values('total')[:1]), Value(0))
+
+
+def actualizar_resumen(capacitaciones_ids=None):
+    """
+    Recalcula en una sola sentencia UPDATE los campos de resumen de las capacitaciones indicadas
+    (todas si no se indica ninguna).
+    """
+    capacitaciones = Capacitacion.objects.all()
+    if capacitaciones_ids is not None:
+        capacitaciones = capacitaciones.filter(id__in=capacitaciones_ids)
+    return capacitaciones.update(
+        num_modulos=_agregado(Modulo.objects, 'capacitacion', Count('id')),
+        num_actas=_agregado(ActaAsistencia.objects, 'modulo__capacitacion', Count('id')),
+        total_horas=_agregado(Modulo.objects, 'capacitacion', Sum('horas_academicas')),
+        tiene_firmantes=Exists(ResponsableFirma.objects.filter(capacitacion=OuterRef('pk'))),
+        fecha_culminado=Subquery(HistorialRevision.objects.filter(
+            capacitacion=OuterRef('pk'), estado=ESTADO_PROYECTO_CULMINADO).order_by('-id').values('fecha_creacion')[:1]),
+    )
+
+
+def actualizar_padron(capacitaciones_ids):
+    """
+    Reconstruye el padrón de certificados de las capacitaciones indicadas (un DELETE y un INSERT ... SELECT).
+    Las lecturas concurrentes siguen viendo el padrón anterior hasta que confirme la transacción.
+    """
+    capacitaciones_ids = list(capacitaciones_ids)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('DELETE FROM capacitacion_padroncertificado WHERE capacitacion_id = ANY(%s)',
+                       [capacitaciones_ids])
+        cursor.execute(SQL_PADRON, {
+            'ids': capacitaciones_ids,
+            'asistente': CARGO_CERT_EMITIDO_ASISTENTE,
+            'unico': TIPO_CERT_EMITIDO_UNICO,
+            'modulo': TIPO_CERT_EMITIDO_MODULO,
+            'emision_unico': [EMISION_CERTIFICADO_UNICO, EMISION_CERTIFICADO_UNICO_Y_MODULOS],
+            'emision_modulo': [EMISION_CERTIFICADO_MODULOS, EMISION_CERTIFICADO_UNICO_Y_MODULOS],
+        })
+
+
+def padron_certificados(capacitacion, tipo, modulo=None):
+    """
+    Certificados elegibles del padrón de la capacitación (asistentes primero, luego el equipo).
+    """
+    filas = PadronCertificado.objects.filter(capacitacion=capacitacion, tipo=tipo, elegible=True)
+    if modulo is not None:
+        filas = filas.filter(modulo=modulo)
+    return filas.select_related('persona', 'persona__facultad').annotate(
+        es_equipo=Case(When(cargo=CARGO_CERT_EMITIDO_ASISTENTE, then=Value(False)), default=Value(True),
+                       output_field=BooleanField())
+    ).order_by('es_equipo', 'persona__apellido_paterno', 'persona__apellido_materno', 'persona__nombres', 'id')
+
+
+def _aplicar_resumenes_pendientes():
+    pendientes = getattr(_pendientes, 'ids', None)
+    if pendientes:
+        _pendientes.ids = set()
+        actualizar_resumen(pendientes)
+        actualizar_padron(pendientes)
+
+
+def programar_resumen(capacitacion_id):
+    """
+    Marca la capacitación para recalcular su resumen y su padrón de certificados cuando confirme la
+    transacción en curso. Varios cambios en la misma transacción (p. ej. todos los módulos de un formset) se
+    resuelven con una sola actualización.
+    """
+    if not capacitacion_id:
+        return
+    if getattr(_pendientes, 'ids', None) is None:
+        _pendientes.ids = set()
+    _pendientes.ids.add(capacitacion_id)
+    transaction.on_commit(_aplicar_resumenes_pendientes)
+
+
+def reservar_correlativos(cantidad, prefijo='', anio=None):
+    """
+    Reserva un bloque contiguo de `cantidad` correlativos del prefijo y año indicados y los devuelve con el
+    formato `<prefijo><número de 5 dígitos>-<año>`.
+
+    La reserva es una sola sentencia `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` sobre la fila del
+    contador: dos emisiones simultáneas solo compiten por esa fila (nunca por la tabla) y el bloque queda
+    reservado hasta que confirme la transacción; si esta se revierte, los números vuelven a estar libres.
+
+    Lanza ValueError si el prefijo o el bloque no caben en CertEmitido.correlativo; la transacción que lo
+    reciba debe revertirse para liberar el bloque.
+    """
+    if cantidad <= 0:
+        return []
+    anio = anio or timezone.now().year
+    largo = CertEmitido._meta.get_field('correlativo').max_length
+    if len('{}{:05d}-{}'.format(prefijo, 0, anio)) > largo:
+        raise ValueError('El prefijo de correlativo "{}" es demasiado largo'.format(prefijo))
+    tabla = connection.ops.quote_name(CorrelativoCertificado._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {tabla} (prefijo, anio, ultimo) VALUES (%s, %s, %s) '
+            'ON CONFLICT (prefijo, anio) DO UPDATE SET ultimo = {tabla}.ultimo + EXCLUDED.ultimo '
+            'RETURNING ultimo'.format(tabla=tabla),
+            [prefijo, anio, cantidad]
+        )
+        ultimo = cursor.fetchone()[0]
+    if len('{}{:05d}-{}'.format(prefijo, ultimo, anio)) > largo:
+        raise ValueError('Se agotaron los correlativos del prefijo "{}" para {}'.format(prefijo, anio))
+    return ['{}{:05d}-{}'.format(prefijo, numero, anio) for numero in range(ultimo - cantidad + 1, ultimo + 1)]
+
+
+def emitir_certificados(certificados):
+    """
+    Emite los certificados que aún no existen y devuelve los que insertó. Es idempotente: los que ya están
+    emitidos (misma clave módulo, persona, cargo y tipo) o repetidos en la lista se descartan antes de reservar
+    correlativos, y `ignore_conflicts` cubre a los emitidos por otra transacción en paralelo. Cualquier otro
+    certificado que no llegue a insertarse (p. ej. por un correlativo repetido) lanza IntegrityError y
+    revierte la emisión, correlativos incluidos.
+    """
+    def clave(certificado):
+        return certificado.modulo_id, certificado.persona_id, certificado.cargo, certificado.tipo
+
+    nuevos = {clave(c): c for c in certificados}
+    if not nuevos:
+        return []
+    existentes = CertEmitido.objects.filter(modulo_id__in={k[0] for k in nuevos}).values_list(
+        'modulo_id', 'persona_id', 'cargo', 'tipo')
+    for existente in existentes:
+        nuevos.pop(existente, None)
+    certificados = list(nuevos.values())
+    prefijos = getattr(settings, 'CERTIFICADO_CORRELATIVO_PREFIJOS', {})
+    por_prefijo = {}
+    for certificado in certificados:
+        por_prefijo.setdefault(prefijos.get(certificado.tipo, ''), []).append(certificado)
+    with transaction.atomic():
+        for prefijo, grupo in por_prefijo.items():
+            for certificado, correlativo in zip(grupo, reservar_correlativos(len(grupo), prefijo)):
+                certificado.correlativo = correlativo
+        CertEmitido.objects.bulk_create(certificados, ignore_conflicts=True)
+        # ignore_conflicts no informa qué filas descartó: se comprueba qué quedó en la base
+        guardados = set(CertEmitido.objects.filter(correlativo__in=[c.correlativo for c in certificados])
+                        .values_list('modulo_id', 'persona_id', 'cargo', 'tipo', 'correlativo'))
+        emitidos = [c for c in certificados if clave(c) + (c.correlativo,) in guardados]
+        if len(emitidos) < len(certificados):
+            omitidos = [c for c in certificados if clave(c) + (c.correlativo,) not in guardados]
+            en_paralelo = set(CertEmitido.objects.filter(modulo_id__in={c.modulo_id for c in omitidos}).values_list(
+                'modulo_id', 'persona_id', 'cargo', 'tipo'))
+            perdidos = [c.correlativo for c in omitidos if clave(c) not in en_paralelo]
+            if perdidos:
+                raise IntegrityError('No se insertaron los certificados con correlativo {}'.format(
+                    ', '.join(perdidos)))
+            logger.warning('%s certificado(s) ya los emitió otra transacción; sus correlativos quedan sin usar',
+                           len(omitidos))
+    # bulk_create no emite señales: el padrón debe recoger los correlativos nuevos
+    for capacitacion_id in Modulo.objects.filter(id__in={c.modulo_id for c in certificados}).values_list(
+            'capacitacion_id', flat=True).distinct():
+        programar_resumen(capacitacion_id)
+    return emitidos
+
+
+def participantes_aprobados(capacitacion, modulo=None):
+    """
+    Personas que aprobaron todas las actas de la capacitación (o solo la del módulo indicado) en las que
+    tienen nota. Se resuelve en la base de datos agrupando las notas por persona.
+    """
+    notas = NotaParticipante.objects.filter(acta_asistencia__modulo__capacitacion=capacitacion)
+    if modulo is not None:
+        notas = notas.filter(acta_asistencia__modulo=modulo)
+    aprobados = notas.order_by().values('persona_id').annotate(
+        aprobo=BoolAnd(Case(When(resultado__iexact='APROBADO', then=Value(True)), default=Value(False),
+                            output_field=BooleanField()))
+    ).filter(aprobo=True).values('persona_id')
+    return Persona.objects.filter(id__in=aprobados).select_related('facultad').order_by(
+        'apellido_paterno', 'apellido_materno', 'nombres', 'id')
@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.capacitacion.cache_certificados import clave_cache_verificacion, invalidar_contexto_certificados
+from apps.capacitacion.models import (ActaAsistencia, Capacitacion, CertEmitido, EquipoProyecto, HistorialRevision,
+                                      Modulo, ResponsableFirma)
+from apps.capacitacion.services import programar_resumen
+from apps.common.constants import ESTADO_PROYECTO_CULMINADO
+from apps.persona.models import Firmante, Persona
+
+
+def _modifica(instance, update_fields, campos):
+    # Al crear la capacitación todo cuenta como modificado
+    modificados = instance.campos_modificados()
+    if modificados is None:
+        return True
+    if update_fields is not None:
+        modificados &= set(update_fields)
+    return not modificados.isdisjoint(campos)
+
+
+@receiver(post_save, sender=Capacitacion)
+def resumen_por_edicion(sender, instance, update_fields=None, **kwargs):
+    # el tipo de emisión decide qué certificados entran al padrón; cambiar el estado o marcar el envío de correos
+    # no lo reconstruye
+    if _modifica(instance, update_fields, Capacitacion.CAMPOS_PADRON):
+        programar_resumen(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Modulo)
+@receiver([post_save, post_delete], sender=ResponsableFirma)
+@receiver([post_save, post_delete], sender=EquipoProyecto)
+def resumen_por_capacitacion(sender, instance, **kwargs):
+    programar_resumen(instance.capacitacion_id)
+
+
+# Las notas de los participantes se crean y eliminan junto con su acta, por eso basta con la señal del acta
+@receiver([post_save, post_delete], sender=ActaAsistencia)
+@receiver([post_save, post_delete], sender=CertEmitido)
+def resumen_por_modulo(sender, instance, **kwargs):
+    programar_resumen(Modulo.objects.filter(id=instance.modulo_id).values_list('capacitacion_id', flat=True).first())
+
+
+@receiver([post_save, post_delete], sender=HistorialRevision)
+def resumen_por_revision(sender, instance, **kwargs):
+    if instance.estado == ESTADO_PROYECTO_CULMINADO:
+        programar_resumen(instance.capacitacion_id)
+
+
+# Un certificado anulado o eliminado deja de verificarse de inmediato, sin esperar a que caduque la caché
+@receiver([post_save, post_delete], sender=CertEmitido)
+def verificacion_por_certificado(sender, instance, **kwargs):
+    clave = clave_cache_verificacion(instance.correlativo)
+    transaction.on_commit(lambda: cache.delete(clave))
+
+
+# Contexto de los certificados en caché. Estas señales van después de las del resumen: al confirmar, la caché se
+# descarta cuando el resumen (horas, fecha de culminación) ya está actualizado.
+@receiver(post_save, sender=Capacitacion)
+def contexto_por_edicion(sender, instance, update_fields=None, **kwargs):
+    if _modifica(instance, update_fields, Capacitacion.CAMPOS_CONTEXTO_CERTIFICADOS):
+        invalidar_contexto_certificados([instance.id])
+
+
+@receiver([post_save, post_delete], sender=Modulo)
+def contexto_por_modulo(sender, instance, **kwargs):
+    invalidar_contexto_certificados([instance.capacitacion_id], [instance.id])
+
+
+@receiver([post_save, post_delete], sender=ResponsableFirma)
+@receiver([post_save, post_delete], sender=HistorialRevision)
+def contexto_por_capacitacion(sender, instance, **kwargs):
+    invalidar_contexto_certificados([instance.capacitacion_id])
+
+
+# Las fechas de asistencia se crean y eliminan junto con su acta, como las notas
+@receiver([post_save, post_delete], sender=ActaAsistencia)
+def contexto_por_acta(sender, instance, **kwargs):
+    invalidar_contexto_certificados(
+        Modulo.objects.filter(id=instance.modulo_id).values_list('capacitacion_id', flat=True))
+
+
+# Nombre, grado, ámbito y firma de los firmantes
+@receiver(post_save, sender=Firmante)
+@receiver(post_save, sender=Persona)
+def contexto_por_firmante(sender, instance, created=False, update_fields=None, **kwargs):
+    # Una persona nueva aún no firma nada; tampoco importa guardar datos que no salen en los certificados (p. ej.
+    # el correo y el sexo de los participantes al importar un acta)
+    if sender is Persona and (created or update_fields is not None and
+                              set(update_fields).isdisjoint(Persona.CAMPOS_FIRMANTE)):
+        return
+    firmantes = {'firmante': instance} if sender is Firmante else {'firmante__persona': instance}
+    invalidar_contexto_certificados(set(ResponsableFirma.objects.filter(**firmantes).values_list(
+        'capacitacion_id', flat=True)))
@@ -1,3 +1,442 @@
-from django.test import TestCase
+from datetime import date
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.capacitacion import dibujo
+from apps.capacitacion.cache_certificados import verificacion_certificado
+from apps.capacitacion.certificados import (CertificadoSpec, PlantillaCertificado, certificados_curso, contexto_curso,
+                                             firmar_enlace, programar_prerender, url_verificacion)
+from apps.capacitacion.models import (ActaAsistencia, ArchivoCertificado, Capacitacion, CertEmitido,
+                                      CorrelativoCertificado, DetalleAsistencia, EnvioCertificado, EquipoProyecto,
+                                      HistorialRevision,
+                                      LoteCertificados, Modulo, NotaParticipante, PadronCertificado, ResponsableFirma)
+from apps.capacitacion.services import (actualizar_padron, emitir_certificados, participantes_aprobados,
+                                        reservar_correlativos)
+from apps.capacitacion.views import RevisarCapacitacionView, enviar_certificados, envio_completo
+from apps.common.constants import (AMBITO_UNASAM, CARGO_CERT_EMITIDO_ASISTENTE, CARGO_PROYECTO_PONENTE,
+                                   CORREO_CERTIFICADO_ENLACE, EMISION_CERTIFICADO_UNICO,
+                                   EMISION_CERTIFICADO_UNICO_Y_MODULOS, ESTADO_ASISTENCIA_PRESENTE,
+                                   ESTADO_CERT_ANULADO, ESTADO_PROYECTO_CULMINADO, SEXO_MASCULINO,
+                                   TIPO_CERT_EMITIDO_MODULO, TIPO_CERT_EMITIDO_UNICO, TIPO_FIRMA_CHOICES)
+from apps.persona.models import Firmante, Persona
+
+
+class CapacitacionTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.capacitacion = Capacitacion.objects.create(
+            nombre='Curso de prueba', fecha_inicio=date(2022, 3, 1), fecha_fin=date(2022, 4, 30),
+            tipo_emision_certificado=EMISION_CERTIFICADO_UNICO_Y_MODULOS)
+        cls.modulos = [Modulo.objects.create(capacitacion=cls.capacitacion, nombre='Módulo {}'.format(i),
+                                             horas_academicas=10, temas='Tema A\nTema B') for i in (1, 2)]
+        cls.personas = [Persona.objects.create(numero_documento='4000000{}'.format(i), sexo=SEXO_MASCULINO,
+                                               nombres='Nombre {}'.format(i), apellido_paterno='Paterno',
+                                               apellido_materno='Materno') for i in range(3)]
+
+    @classmethod
+    def calificar(cls, resultados):
+        # `resultados`: por módulo, el resultado de cada persona (None si no tiene nota en ese módulo)
+        for dia, (modulo, notas) in enumerate(zip(cls.modulos, resultados), 1):
+            acta = ActaAsistencia.objects.create(modulo=modulo)
+            NotaParticipante.objects.bulk_create([
+                NotaParticipante(acta_asistencia=acta, persona=persona, resultado=resultado)
+                for persona, resultado in zip(cls.personas, notas) if resultado is not None
+            ])
+            DetalleAsistencia.objects.bulk_create([
+                DetalleAsistencia(acta_asistencia=acta, persona=persona, fecha=date(2022, 3, dia),
+                                  estado=ESTADO_ASISTENCIA_PRESENTE)
+                for persona, resultado in zip(cls.personas, notas) if resultado is not None
+            ])
+
+    def emitir(self):
+        # Igual que RevisarCapacitacionView.insert_emision_cert
+        certificados = []
+        equipo = list(self.capacitacion.equipoproyecto_set.values_list('persona_id', 'cargo'))
+        grupos = [(self.modulos[-1], TIPO_CERT_EMITIDO_UNICO, participantes_aprobados(self.capacitacion))]
+        grupos += [(m, TIPO_CERT_EMITIDO_MODULO, participantes_aprobados(self.capacitacion, m)) for m in self.modulos]
+        for modulo, tipo, aprobados in grupos:
+            certificados += [CertEmitido(modulo=modulo, persona=p, cargo=CARGO_CERT_EMITIDO_ASISTENTE, tipo=tipo)
+                             for p in aprobados]
+            certificados += [CertEmitido(modulo=modulo, persona_id=p, cargo=c, tipo=tipo) for p, c in equipo]
+        emitir_certificados(certificados)
+
+    def culminar(self):
+        # Emite los certificados y registra la culminación, con el resumen y el padrón ya confirmados
+        with self.captureOnCommitCallbacks(execute=True):
+            self.emitir()
+            HistorialRevision.objects.create(capacitacion=self.capacitacion, estado=ESTADO_PROYECTO_CULMINADO)
+        self.capacitacion.refresh_from_db()
+
+
+class ResumenCapacitacionTest(CapacitacionTestMixin, TestCase):
+    def test_resumen_y_padron_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.calificar([('APROBADO', 'APROBADO', 'DESAPROBADO'), ('APROBADO', 'APROBADO', 'APROBADO')])
+        capacitacion = Capacitacion.objects.get(pk=self.capacitacion.pk)
+        self.assertEqual((capacitacion.num_modulos, capacitacion.num_actas, capacitacion.total_horas), (2, 2, 20))
+        self.assertFalse(capacitacion.tiene_firmantes)
+        # Un certificado único y uno por módulo por persona; el único exige aprobar todos los módulos
+        padron = PadronCertificado.objects.filter(capacitacion=capacitacion)
+        self.assertEqual(padron.filter(tipo=TIPO_CERT_EMITIDO_UNICO, elegible=True).count(), 2)
+        self.assertEqual(padron.filter(tipo=TIPO_CERT_EMITIDO_MODULO, elegible=True).count(), 5)
+
+    def test_guardar_sin_cambiar_el_padron_no_lo_reconstruye(self):
+        capacitacion = Capacitacion.objects.get(pk=self.capacitacion.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            capacitacion.estado = ESTADO_PROYECTO_CULMINADO
+            capacitacion.save()
+            capacitacion.se_envio_correo = True
+            capacitacion.save(update_fields=['se_envio_correo'])
+        self.assertEqual(callbacks, [])
+
+    def test_cambiar_el_tipo_de_emision_reconstruye_el_padron(self):
+        self.calificar([('APROBADO',) * 3, ('APROBADO',) * 3])
+        capacitacion = Capacitacion.objects.get(pk=self.capacitacion.pk)
+        capacitacion.tipo_emision_certificado = EMISION_CERTIFICADO_UNICO
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            capacitacion.save()
+        self.assertTrue(callbacks)
+        self.assertFalse(PadronCertificado.objects.filter(tipo=TIPO_CERT_EMITIDO_MODULO).exists())
+        self.assertEqual(PadronCertificado.objects.filter(tipo=TIPO_CERT_EMITIDO_UNICO).count(), 3)
+
+
+class ReservarCorrelativosTest(TestCase):
+    def test_bloques_contiguos_y_unicos(self):
+        primero = reservar_correlativos(3, anio=2022)
+        segundo = reservar_correlativos(2, anio=2022)
+        self.assertEqual(primero, ['00001-2022', '00002-2022', '00003-2022'])
+        self.assertEqual(segundo, ['00004-2022', '00005-2022'])
+
+    def test_numeracion_por_prefijo_y_anio(self):
+        reservar_correlativos(4, anio=2022)
+        self.assertEqual(reservar_correlativos(1, prefijo='M', anio=2022), ['M00001-2022'])
+        self.assertEqual(reservar_correlativos(1, anio=2023), ['00001-2023'])
+        self.assertEqual(reservar_correlativos(1, anio=2022), ['00005-2022'])
+
+    def test_cantidad_vacia(self):
+        self.assertEqual(reservar_correlativos(0, anio=2022), [])
+
+    def test_prefijo_demasiado_largo(self):
+        with self.assertRaises(ValueError):
+            reservar_correlativos(1, prefijo='MODULO', anio=2022)
+
+
+class EmitirCertificadosTest(CapacitacionTestMixin, TestCase):
+    def certificados(self):
+        return [CertEmitido(modulo=m, persona=p, cargo=CARGO_CERT_EMITIDO_ASISTENTE, tipo=TIPO_CERT_EMITIDO_MODULO)
+                for m in self.modulos for p in self.personas]
+
+    def test_emitir_dos_veces_no_duplica_ni_consume_correlativos(self):
+        emitidos = emitir_certificados(self.certificados())
+        ultimo = CorrelativoCertificado.objects.get().ultimo
+        self.assertEqual(len(emitidos), 6)
+        self.assertEqual(emitir_certificados(self.certificados()), [])
+        self.assertEqual(CertEmitido.objects.count(), 6)
+        self.assertEqual(CorrelativoCertificado.objects.get().ultimo, ultimo)
+        self.assertEqual(len(set(CertEmitido.objects.values_list('correlativo', flat=True))), 6)
+
+    def test_certificado_no_insertado_falla(self):
+        # Un correlativo ya usado fuera del contador hace que ignore_conflicts descarte la fila
+        anio = date.today().year
+        CertEmitido.objects.create(modulo=self.modulos[0], persona=self.personas[0], cargo='ponente',
+                                   tipo=TIPO_CERT_EMITIDO_MODULO, correlativo='00001-{}'.format(anio))
+        with self.assertRaises(IntegrityError):
+            emitir_certificados(self.certificados())
+        self.assertEqual(CertEmitido.objects.count(), 1)
+        self.assertFalse(CorrelativoCertificado.objects.exists())
+
+
+class EmisionAlCulminarTest(CapacitacionTestMixin, TestCase):
+    @override_settings(CERTIFICADO_CORRELATIVO_PREFIJOS={TIPO_CERT_EMITIDO_UNICO: 'DEMASIADO'})
+    def test_correlativo_que_no_cabe_devuelve_el_motivo(self):
+        self.calificar([('APROBADO',) * 3, ('APROBADO',) * 3])
+        vista = RevisarCapacitacionView()
+        vista.request = RequestFactory().post('/')
+        vista.request.user = AnonymousUser()
+        with self.assertLogs('apps.capacitacion.views', 'ERROR'):
+            errors = vista.insert_emision_cert(self.capacitacion, EMISION_CERTIFICADO_UNICO_Y_MODULOS, self.modulos,
+                                               list(ActaAsistencia.objects.all()))
+        self.assertIn('demasiado largo', errors)
+        self.assertFalse(CertEmitido.objects.exists())
+
+
+class ParticipantesAprobadosTest(CapacitacionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.calificar([('APROBADO', 'aprobado', 'APROBADO'), ('APROBADO', 'DESAPROBADO', None)])
+
+    def test_un_desaprobado_excluye_del_curso(self):
+        aprobados = set(participantes_aprobados(self.capacitacion))
+        self.assertEqual(aprobados, {self.personas[0], self.personas[2]})
+
+    def test_por_modulo(self):
+        self.assertEqual(set(participantes_aprobados(self.capacitacion, self.modulos[0])), set(self.personas))
+        self.assertEqual(list(participantes_aprobados(self.capacitacion, self.modulos[1])), [self.personas[0]])
+
+
+class PadronCertificadoTest(CapacitacionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.calificar([('APROBADO', 'APROBADO', 'APROBADO'), ('APROBADO', 'DESAPROBADO', None)])
+        EquipoProyecto.objects.create(capacitacion=cls.capacitacion, persona=cls.personas[2],
+                                      cargo=CARGO_PROYECTO_PONENTE)
+
+    def test_padron_coincide_con_los_certificados_emitidos(self):
+        self.emitir()
+        actualizar_padron([self.capacitacion.id])
+        campos = ('modulo_id', 'persona_id', 'cargo', 'tipo', 'correlativo')
+        padron = PadronCertificado.objects.filter(capacitacion=self.capacitacion)
+        self.assertEqual(set(padron.filter(elegible=True).values_list(*campos)),
+                         set(CertEmitido.objects.values_list(*campos)))
+        self.assertFalse(padron.filter(elegible=False, correlativo__isnull=False).exists())
+        self.assertTrue(padron.filter(elegible=False, persona=self.personas[1]).exists())
+
+    def test_reconstruir_no_duplica(self):
+        actualizar_padron([self.capacitacion.id])
+        antes = PadronCertificado.objects.count()
+        actualizar_padron([self.capacitacion.id])
+        self.assertEqual(PadronCertificado.objects.count(), antes)
+
+
+class ContextoPorPersonaTest(CapacitacionTestMixin, TestCase):
+    def test_guardar_participantes_no_consulta_firmantes(self):
+        persona = self.personas[0]
+        persona.email = 'participante@unasam.edu.pe'
+        # Solo el UPDATE (o el INSERT): nada de buscar en qué capacitaciones firma
+        with self.assertNumQueries(1):
+            persona.save(update_fields=['email'])
+        with self.assertNumQueries(1):
+            Persona.objects.create(numero_documento='40000009', sexo=SEXO_MASCULINO, nombres='Nueva')
+
+    def test_cambiar_el_nombre_invalida_el_contexto(self):
+        persona = self.personas[0]
+        persona.nombres = 'Otro Nombre'
+        with self.assertNumQueries(2):
+            persona.save(update_fields=['nombres'])
+
+
+class FirmasCertificadoTest(CapacitacionTestMixin, TestCase):
+    def test_firmas_en_el_orden_asignado(self):
+        tipos = [t for t, _ in TIPO_FIRMA_CHOICES]
+        for persona, tipo in zip(reversed(self.personas), tipos):
+            firmante = Firmante.objects.create(persona=persona, ambito=AMBITO_UNASAM, firma=b'firma')
+            ResponsableFirma.objects.create(capacitacion=self.capacitacion, firmante=firmante, tipo_firma=tipo)
+        firmas = contexto_curso(self.capacitacion).plantilla.firmas
+        self.assertEqual([f.lineas[0] for f in firmas], [str(p).upper() for p in reversed(self.personas)])
+
+
+class PrerenderCertificadosTest(CapacitacionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.calificar([('APROBADO', 'APROBADO', 'DESAPROBADO'), ('APROBADO', 'APROBADO', 'APROBADO')])
+
+    def test_pendiente_hasta_que_se_dibuja(self):
+        self.culminar()
+        with self.captureOnCommitCallbacks() as callbacks:
+            programar_prerender(self.capacitacion.id)
+        self.assertTrue(Capacitacion.objects.get(pk=self.capacitacion.pk).certificados_pendientes)
+        # Al confirmar se lanza el comando en otro proceso
+        with mock.patch('apps.capacitacion.certificados.subprocess.Popen') as popen:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(popen.call_args[0][0][-2:], ['prerenderizar_certificados', str(self.capacitacion.id)])
+
+        call_command('prerenderizar_certificados', stdout=StringIO())
+        self.assertFalse(Capacitacion.objects.get(pk=self.capacitacion.pk).certificados_pendientes)
+        self.assertEqual(ArchivoCertificado.objects.count(), CertEmitido.objects.count())
+        self.assertEqual(CertEmitido.objects.count(), 7)
+
+    def test_sigue_pendiente_si_falla(self):
+        self.culminar()
+        programar_prerender(self.capacitacion.id)
+        with mock.patch('apps.capacitacion.management.commands.prerenderizar_certificados.'
+                        'prerenderizar_certificados', side_effect=OSError):
+            call_command('prerenderizar_certificados', stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(Capacitacion.objects.get(pk=self.capacitacion.pk).certificados_pendientes)
+
+
+class DescargaCertificadosEtagTest(CapacitacionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.calificar([('APROBADO', 'APROBADO', 'APROBADO'), ('APROBADO', 'APROBADO', 'APROBADO')])
+        cls.usuario = get_user_model().objects.create(username='revisor')
+
+    def setUp(self):
+        self.culminar()
+        self.client.force_login(self.usuario)
+
+    def test_individual_etag_fuerte_y_304(self):
+        url = reverse('capacitacion:descarga_certificado', args=[self.capacitacion.id, self.personas[0].id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        revalidacion = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidacion.status_code, 304)
+        self.assertEqual(revalidacion['ETag'], response['ETag'])
+        self.assertFalse(revalidacion.content)
+
+    def test_masivo_etag_debil_y_reutiliza_el_lote(self):
+        url = reverse('capacitacion:generar_certificados', args=[self.capacitacion.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(LoteCertificados.objects.filter(capacitacion=self.capacitacion).count(), 1)
+
+        # Un cambio en los datos cambia el ETag y el lote se vuelve a armar sobre el anterior
+        with self.captureOnCommitCallbacks(execute=True):
+            self.personas[1].nombres = 'Otro Nombre'
+            self.personas[1].save(update_fields=['nombres'])
+        with mock.patch('apps.capacitacion.dibujo.componer_lote', wraps=dibujo.componer_lote) as componer:
+            actualizado = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(actualizado.status_code, 200)
+        # Solo se dibuja el certificado que cambió
+        self.assertEqual(len(componer.call_args[0][2]), 1)
+        self.assertNotEqual(actualizado['ETag'], response['ETag'])
+        lote = LoteCertificados.objects.get(capacitacion=self.capacitacion)
+        self.assertEqual(len(lote.paginas), CertEmitido.objects.filter(
+            tipo=TIPO_CERT_EMITIDO_UNICO, modulo__capacitacion=self.capacitacion).count())
+
+
+@override_settings(CERTIFICADO_CORREO_MODO=CORREO_CERTIFICADO_ENLACE)
+class EnvioCertificadosTest(CapacitacionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.calificar([('APROBADO', 'APROBADO', 'APROBADO'), ('APROBADO', 'APROBADO', 'APROBADO')])
+
+    def setUp(self):
+        self.culminar()
+        Persona.objects.filter(pk__in=[p.id for p in self.personas[:2]]).update(email='participante@example.com')
+        self.request = RequestFactory().get('/')
+
+    def test_reenviar_solo_lo_pendiente(self):
+        certificados = certificados_curso(self.capacitacion)
+        enviados, errores, omitidos = enviar_certificados(self.request, certificados, 'Certificado')
+        self.assertEqual((len(enviados), len(errores), omitidos), (2, 1, []))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(envio_completo(certificados, errores))
+
+        Persona.objects.filter(pk=self.personas[2].id).update(email='otro@example.com')
+        enviados, errores, omitidos = enviar_certificados(self.request, certificados, 'Certificado',
+                                                          omitir_enviados=True)
+        self.assertEqual((len(enviados), errores, len(omitidos)), (1, [], 2))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertTrue(envio_completo(certificados, errores))
+        self.assertEqual(list(EnvioCertificado.objects.values_list('intentos', flat=True).order_by('intentos')),
+                         [1, 1, 2])
+
+    def test_un_error_anterior_deja_pendiente_el_envio(self):
+        certificados = certificados_curso(self.capacitacion)
+        enviar_certificados(self.request, certificados, 'Certificado')
+        # Lo que falló en un envío anterior sigue pendiente aunque el último no tenga errores
+        self.assertTrue(envio_completo(certificados[:2], []))
+        self.assertFalse(envio_completo(certificados, []))
+        self.assertFalse(envio_completo([], []))
+
+
+class CodigoQrTest(CapacitacionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.calificar([('APROBADO', 'APROBADO', 'APROBADO'), ('APROBADO', 'APROBADO', 'APROBADO')])
+
+    def setUp(self):
+        self.culminar()
+        self.certificados = certificados_curso(self.capacitacion)
+
+    @override_settings(CERTIFICADO_VERIFICACION_URL='')
+    def test_sin_dominio_no_lleva_qr(self):
+        with self.assertRaises(ImproperlyConfigured):
+            url_verificacion(self.certificados[0].correlativo)
+        with mock.patch('apps.capacitacion.dibujo.dibujar_qr') as dibujar_qr:
+            dibujo.dibujar_pdf(self.certificados)
+        dibujar_qr.assert_not_called()
+
+    @override_settings(CERTIFICADO_VERIFICACION_URL='https://capacitaciones.example.com/')
+    def test_qr_apunta_a_la_verificacion(self):
+        correlativo = self.certificados[0].correlativo
+        url = 'https://capacitaciones.example.com' + reverse('capacitacion:verificar_certificado', args=[correlativo])
+        self.assertEqual(url_verificacion(correlativo), url)
+        with mock.patch('apps.capacitacion.dibujo.dibujar_qr') as dibujar_qr:
+            dibujo.dibujar_pdf(self.certificados[:1])
+        self.assertEqual(dibujar_qr.call_args[0][1], url)
+
+
+class CacheCertificadosTest(CapacitacionTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.calificar([('APROBADO', 'APROBADO', 'APROBADO'), ('APROBADO', 'APROBADO', 'APROBADO')])
+
+    def setUp(self):
+        cache.clear()
+        self.culminar()
+
+    def consultan_modelos(self, consultas):
+        # Con la caché en la base (la predeterminada) la lectura de la caché también es una consulta
+        return [c['sql'] for c in consultas if 'capacitacion_' in c['sql'] or 'persona_' in c['sql']]
+
+    def test_contexto_en_cache_hasta_que_cambia_un_modulo(self):
+        contexto = contexto_curso(self.capacitacion)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(contexto_curso(self.capacitacion), contexto)
+        self.assertFalse(self.consultan_modelos(consultas))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.modulos[0].horas_academicas = 20
+            self.modulos[0].save()
+        self.assertEqual(contexto_curso(self.capacitacion).horas, 30)
+
+    def test_verificacion_en_cache_hasta_que_se_anula(self):
+        emitido = CertEmitido.objects.order_by('id').first()
+        self.assertTrue(verificacion_certificado(emitido.correlativo)['vigente'])
+        with CaptureQueriesContext(connection) as consultas:
+            verificacion_certificado(emitido.correlativo)
+        self.assertFalse(self.consultan_modelos(consultas))
+        with self.captureOnCommitCallbacks(execute=True):
+            emitido.estado = ESTADO_CERT_ANULADO
+            emitido.save()
+        self.assertFalse(verificacion_certificado(emitido.correlativo)['vigente'])
+
+    def test_verificacion_de_correlativo_inexistente(self):
+        self.assertIsNone(verificacion_certificado('NO-EXISTE'))
+        self.assertEqual(self.client.get(reverse('capacitacion:verificar_certificado',
+                                                 args=['NO-EXISTE'])).status_code, 404)
+
+
+class DescargaCertificadoEnlaceTest(CapacitacionTestMixin, TestCase):
+    def url(self, capacitacion_id):
+        plantilla = PlantillaCertificado(clave='curso-{}'.format(capacitacion_id), capacitacion_id=capacitacion_id,
+                                         modulo_id=None, fecha_emision=None, firmas=(), temarios=())
+        certificado = CertificadoSpec(plantilla=plantilla, persona_id=self.personas[0].id,
+                                      cargo=CARGO_CERT_EMITIDO_ASISTENTE, nombre_completo='', texto='',
+                                      correlativo='')
+        return reverse('capacitacion:descarga_certificado_enlace', args=[firmar_enlace(certificado)])
+
+    @override_settings(CERTIFICADO_ENLACE_DIAS=-1)
+    def test_enlace_caducado(self):
+        self.assertEqual(self.client.get(self.url(self.capacitacion.id)).status_code, 410)
+
+    def test_enlace_alterado(self):
+        url = self.url(self.capacitacion.id)
+        self.assertEqual(self.client.get(url[:-3] + 'xx/').status_code, 404)
+
+    def test_sin_certificado(self):
+        # Enlace válido a una persona sin certificado elegible, y a una capacitación que ya no existe
+        self.assertEqual(self.client.get(self.url(self.capacitacion.id)).status_code, 404)
+        self.assertEqual(self.client.get(self.url(0)).status_code, 404)
@@ -6,7 +6,8 @@ from .views import (CapacitacionCreateView, ListaCapacitacionView, CapacitacionU
                     AsignarFirmanteView, EliminarResponsableFirmanteView, GenerarMultipleCertificadosPdfView,
                     VerActaAsistenciaModalView, EnvioCertificadoMultiCorreo, EnvioCertificadoCorreo,
                     EnviaParaRevisionView, GeneraCertificadoPdfPorModulo, EnvioCertificadoPorModuloCorreo,
-                    GenerarMultipleCertificadosPorModPdfView, EnvioCertificadoMultiCorreoMod)
+                    GenerarMultipleCertificadosPorModPdfView, EnvioCertificadoMultiCorreoMod,
+                    DescargaCertificadoEnlaceView, PortafolioCertificadosView, VerificarCertificadoView)
 
 app_name = 'capacitacion'
 
@@ -47,4 +48,9 @@ urlpatterns = [
          GenerarMultipleCertificadosPorModPdfView.as_view(), name='generar_certificados_por_mod'),
     path('certificado-multiple-correo-mod/<int:id_capacitacion>/<int:id_modulo>', EnvioCertificadoMultiCorreoMod.as_view(),
          name='envio_cert_multi_correo_mod'),
+    path('certificado/<str:token>/', DescargaCertificadoEnlaceView.as_view(), name='descarga_certificado_enlace'),
+    path('certificados-persona/<int:id_persona>/', PortafolioCertificadosView.as_view(),
+         name='portafolio_certificados'),
+    path('verificar-certificado/<str:correlativo>/', VerificarCertificadoView.as_view(),
+         name='verificar_certificado'),
 ]
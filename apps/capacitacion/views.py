@@ -1,55 +1,57 @@
-import base64
-import os
+import logging
 import re
 import uuid
 
-import qrcode
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
-from django.core.mail import EmailMessage
-from django.db import IntegrityError, transaction
+from django.core.mail import DNS_NAME, EmailMessage, make_msgid
+from django.db import DatabaseError, IntegrityError, transaction
 from django.db.models import F, Value
 from django.db.models.functions import Concat
 from django.forms import inlineformset_factory
-from django.http import HttpResponseRedirect, JsonResponse, FileResponse, Http404
+from django.http import HttpResponse, HttpResponseGone, HttpResponseRedirect, JsonResponse, FileResponse, Http404
 from django.contrib import messages
+from django.core import signing
 from datetime import datetime
 from django.shortcuts import get_object_or_404, render, redirect
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.generic import CreateView, UpdateView, TemplateView
 from django.urls import reverse
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_RIGHT
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import Table, Paragraph, Image
-from reportlab.graphics.barcode import code128
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 from rest_framework.views import APIView
 
+from apps.capacitacion.cache_certificados import invalidar_contexto_certificados, verificacion_certificado
+from apps.capacitacion.certificados import (certificado_de_enlace, certificados_curso, certificados_modulo,
+                                             certificados_persona, firmar_enlace, generar_lote, generar_pdf,
+                                             huella_certificados, nombre_archivo, pdf_certificado, portafolio_pdf,
+                                             portafolio_zip, programar_prerender)
 from apps.capacitacion.forms import (CapacitacionForm, ActaAsistenciaForm, ModuloFormset,
                                      ModuloForm, EquipoProyectoFormset, EquipoProyectoForm)
 from apps.capacitacion.models import (Capacitacion, ResponsableFirma, ActaAsistencia, DetalleAsistencia,
                                       NotaParticipante, Modulo, HistorialRevision, HistorialRevisionConsejo,
-                                      EquipoProyecto, CertEmitido)
+                                      EquipoProyecto, CertEmitido, EnvioCertificado)
+from apps.capacitacion.services import programar_resumen, emitir_certificados, participantes_aprobados
 from apps.common.constants import (ESTADO_PROYECTO_REGISTRADO, DOCUMENT_TYPE_DNI, DOCUMENT_TYPE_CE,
-                                   ESTADO_PROYECTO_VALIDADO, ESTADO_PROYECTO_CANCELADO, ESTADO_PROYECTO_CULMINADO,
+                                   ESTADO_PROYECTO_VALIDADO, ESTADO_PROYECTO_CULMINADO,
                                    ESTADO_PROYECTO_OBSERVADO, TIPO_PERSONA_CONSEJO_UNASAM, AMBITO_UNASAM,
                                    TIPO_PERSONA_CONSEJO_FACULTAD, AMBITO_FACULTAD, EMISION_CERTIFICADO_UNICO,
                                    ESTADO_PROYECTO_POR_VALIDAR, EMISION_CERTIFICADO_MODULOS,
                                    EMISION_CERTIFICADO_UNICO_Y_MODULOS, CARGO_CERT_EMITIDO_ASISTENTE,
-                                   TIPO_CERT_EMITIDO_UNICO, TIPO_CERT_EMITIDO_MODULO, ABREVIATURA_GRADO)
-from apps.common.datatables_pagination import datatable_page
-from apps.common.utils import PdfCertView
+                                   TIPO_CERT_EMITIDO_UNICO, TIPO_CERT_EMITIDO_MODULO,
+                                   ESTADO_PROYECTO_CHOICES, AMBITO_CHOICES, CORREO_CERTIFICADO_ENLACE)
+from apps.common.datatables_pagination import datatable_page, datatable_order, datatable_filter
 from apps.login.views import BaseLogin
-from apps.persona.models import Persona, Firmante
-from config.settings import MEDIA_ROOT, STATIC_ROOT
+from apps.persona.models import Persona, Firmante, Facultad
+from config.settings import MEDIA_ROOT
 import pandas as pd
-from reportlab.lib.pagesizes import letter
+
+logger = logging.getLogger(__name__)
+
 
 class CapacitacionCreateView(LoginRequiredMixin, BaseLogin, CreateView):
     template_name = 'capacitacion/crear.html'
@@ -127,6 +129,7 @@ class CapacitacionCreateView(LoginRequiredMixin, BaseLogin, CreateView):
         context.update({
             'modulo_formset': self.get_modulo_formset(),
             'equipo_formset': self.get_equipo_formset(),
+            'estados': ESTADO_PROYECTO_CHOICES,
         })
         return context
 
@@ -201,6 +204,9 @@ class CapacitacionUpdateView(LoginRequiredMixin, BaseLogin, UpdateView):
                 else:
                     if not m_form.cleaned_data.get('DELETE'):
                         m_form.save()
+            # el update() de los módulos no emite señales
+            programar_resumen(capacitacion.id)
+            invalidar_contexto_certificados([capacitacion.id])
             self.object.equipoproyecto_set.all().delete()
             for e in equipo_formset:
                 e.capacitacion = capacitacion
@@ -251,6 +257,7 @@ class CapacitacionUpdateView(LoginRequiredMixin, BaseLogin, UpdateView):
         context.update({
             'modulo_formset': self.get_modulo_formset(),
             'equipo_formset': self.get_equipo_formset(),
+            'estados': ESTADO_PROYECTO_CHOICES,
             'archivo': self.get_archivo_cargado() if self.object.ruta_proyecto_pdf else '',
             'ids_errors': self.ids_errors,
         })
@@ -261,94 +268,74 @@ class CapacitacionUpdateView(LoginRequiredMixin, BaseLogin, UpdateView):
         return reverse('capacitacion:crear_capacitacion')
 
 
-class ListaCapacitacionView(LoginRequiredMixin, BaseLogin, View):
-    def get(self, request, *args, **kwargs):
-        search_param = self.request.GET.get('search[value]')
-        filtro = self.request.GET.get('filtro')
-        capacitaciones = Capacitacion.objects.none()
-        if filtro:
-            ''
-        else:
-            capacitaciones = Capacitacion.objects.filter(creado_por=self.request.user.username
-                                                         ).order_by('-fecha_creacion')
+def modulos_por_capacitacion(capacitaciones_ids):
+    """
+    Devuelve los módulos de las capacitaciones indicadas agrupados por capacitación, con el id de su acta
+    de asistencia (si existe), en una sola consulta.
+    """
+    modulos = {}
+    for m in Modulo.objects.filter(capacitacion_id__in=capacitaciones_ids).order_by('id').values(
+            'id', 'capacitacion_id', 'se_envio_correo', 'actaasistencia__id'):
+        modulos.setdefault(m['capacitacion_id'], []).append({
+            'id': m['id'],
+            'acta': m['actaasistencia__id'],
+            'se_envio_correo': m['se_envio_correo'],
+        })
+    return modulos
+
+
+class FiltroCapacitacionMixin:
+    """
+    Filtros y ordenamiento que las bandejas de capacitaciones aceptan desde datatables.
+    """
+    filtros = {
+        'estado': ('estado', str),
+        'facultad': ('facultad_id', int),
+        'ambito': ('ambito', str),
+        'fecha_desde': ('fecha_inicio__gte', parse_date),
+        'fecha_hasta': ('fecha_fin__lte', parse_date),
+    }
+    columnas_orden = {}
+
+    def filtrar_capacitaciones(self, capacitaciones):
+        search_param = self.request.GET.get('search[value]', '')
         if len(search_param) > 3:
             capacitaciones = capacitaciones.filter(nombre__icontains=search_param)
+        capacitaciones = datatable_filter(capacitaciones, self.request, self.filtros)
+        return datatable_order(capacitaciones, self.request, self.columnas_orden, '-fecha_creacion', '-id')
+
+
+class ListaCapacitacionView(LoginRequiredMixin, BaseLogin, FiltroCapacitacionMixin, View):
+    columnas_orden = {1: 'nombre', 2: 'fecha_inicio', 5: 'estado'}
+
+    def get(self, request, *args, **kwargs):
+        capacitaciones = self.filtrar_capacitaciones(
+            Capacitacion.objects.filter(creado_por=self.request.user.username))
+        capacitaciones = capacitaciones.only('id', 'nombre', 'fecha_inicio', 'fecha_fin', 'observacion_revision',
+                                             'ruta_proyecto_pdf', 'estado')
         draw, page = datatable_page(capacitaciones, request)
+        modulos = modulos_por_capacitacion([a.id for a in page.object_list])
         lista_equipos_data = []
-        cont = 0
         for a in page.object_list:
-            cont = cont + 1
-            mm = 0
-            mod_cont = 0
-            color = ''
-            asistencia = ''
-            for m in a.modulo_set.all():
-                mod_cont += 1
-                acta = ActaAsistencia.objects.filter(modulo=m).order_by('fecha_creacion').first()
-                if acta:
-                    mm += 1
-                    asistencia = asistencia + '''<a class="btn btn-success btn-xs" 
-                    style="margin-top:2px;margin-left:2px;" href="{}">{}</a>'''.format(
-                        reverse('capacitacion:ver_acta_asistencia', kwargs={'id': acta.id}), 'Ver acta {}'.format(mm))
-                else:
-                    if mod_cont == mm + 1:
-                        if a.estado in (ESTADO_PROYECTO_VALIDADO, ESTADO_PROYECTO_OBSERVADO):
-                            asistencia = asistencia + '''<a class='btn btn-primary btn-xs' 
-                            style="margin-top:2px;margin-left:2px;" href='{}'>{}</a>'''.format(
-                                reverse('capacitacion:crear_acta_asistencia', kwargs={'id': m.id}),
-                                'Crear acta {}'.format(mod_cont))
-            boton_envia_revision = ''
-            if a.estado == ESTADO_PROYECTO_VALIDADO:
-                color = 'text-success'
-            elif a.estado == ESTADO_PROYECTO_OBSERVADO:
-                color = 'text-warning'
-                boton_envia_revision = '''<button class="btn btn-success btn-xs parevision" data-id={}>
-                                        Enviar a revision</button>'''.format(a.id)
-            elif a.estado == ESTADO_PROYECTO_CULMINADO:
-                color = 'text-info'
-            elif a.estado == ESTADO_PROYECTO_POR_VALIDAR:
-                color = 'text-warning'
-            elif a.estado == ESTADO_PROYECTO_CANCELADO:
-                color = 'text-danger'
-            elif a.estado == ESTADO_PROYECTO_REGISTRADO:
-                boton_envia_revision = '''<button class="btn btn-success btn-xs parevision" data-id={}>
-                                        Enviar a revision</button>'''.format(a.id)
-            lista_equipos_data.append([
-                cont,
-                a.nombre,
-                '{} al {}'.format(a.fecha_inicio, a.fecha_fin),
-                mod_cont,
-                a.observacion_revision or '-',
-                '<label class="{}">{}</label>{}'.format(color, a.get_estado_display(), boton_envia_revision),
-                ('''<button class="btn btn-info btn-xs" id="ver_archivo_pdf" data-archivo={}>
-                  Ver PDF</button>'''.format(a.ruta_proyecto_pdf) if a.ruta_proyecto_pdf else ''
-                 ),
-                asistencia,
-                self.get_boton_editar(a),
-                self.get_boton_eliminar(a) if a.estado == ESTADO_PROYECTO_REGISTRADO else '',
-            ])
+            lista_equipos_data.append({
+                'id': a.id,
+                'nombre': a.nombre,
+                'fecha_inicio': a.fecha_inicio,
+                'fecha_fin': a.fecha_fin,
+                'observacion': a.observacion_revision,
+                'estado': a.estado,
+                'estado_display': a.get_estado_display(),
+                'pdf': a.ruta_proyecto_pdf.name or None,
+                'modulos': modulos.get(a.id, []),
+            })
         data = {
             'draw': draw,
-            'recordsTotal': capacitaciones.count(),
-            'recordsFiltered': capacitaciones.count(),
+            'recordsTotal': page.paginator.count,
+            'recordsFiltered': page.paginator.count,
             'data': lista_equipos_data
         }
         return JsonResponse(data)
 
-    def get_boton_eliminar(self, a):
-        boton_eliminar = '''<button class="btn btn-danger btn-sm eliminarc" data-id={0}>
-                      <i class="fa fa-trash"></i></button>'''
-        boton_eliminar = boton_eliminar.format(a.id)
-        boton = '{0}'.format(boton_eliminar)
-        return boton
-
-    def get_boton_editar(self, a):
-        link = reverse('capacitacion:editar', kwargs={'pk': a.id})
-        boton_editar = '<a class="btn btn-warning btn-sm" href="{0}"><i class="fa fa-edit"></i></a>'
-        boton_editar = boton_editar.format(link)
-        boton = '{0}'.format(boton_editar)
-        return boton
-
 
 class ProyectoDescargaPdf(LoginRequiredMixin, View):
     def get(self, request, **kwargs):
@@ -534,7 +521,7 @@ class ActaAsistenciaCreateView(LoginRequiredMixin, BaseLogin, CreateView):
                 if persona:
                     persona.sexo = '1' if d[5] == 'M' else '2'
                     persona.email = d[6].lower() if d[6] else ''
-                    persona.save()
+                    persona.save(update_fields=['sexo', 'email', 'fecha_modificacion'])
                     array_acta.append({
                         'id_persona': persona.id,
                         'resultado': d[len(columnas) - 1]
@@ -686,329 +673,110 @@ class VerActaAsistenciaModalView(LoginRequiredMixin, BaseLogin, TemplateView):
         })
         return context
 
-# Genera los certificados unicos, es decir, que no tiene modulos
-class GeneraCertificadoPdf(LoginRequiredMixin, PdfCertView):
-    filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
+class DescargaCertificadosView(View):
+    """
+    Descarga en un solo PDF los certificados que arma `get_certificados` (404 si no hay ninguno). El PDF es
+    determinista, así que el ETag sale de los datos y una revalidación con If-None-Match se responde con 304 sin
+    dibujar nada.
+    """
     disposition = 'attachment'
-    canvas = None
-    id_acta = None
-    participantes = None
-    capacitacion = None
-    path_code_qr = None
-    horas_academicas = 0
-    nota_participante = None
-    temarios = []
-    fecha_culminado = None
+    content_type = 'application/pdf'
+    certificados = ()
+    # Los PDF masivos se arman sobre el último lote guardado, reutilizando los certificados que no cambiaron
+    reutilizar_lote = False
+
+    def get(self, request, *args, **kwargs):
+        self.certificados = self.get_certificados()
+        # Persona no elegible, certificado anulado o enlace a datos que ya no existen: no hay nada que descargar
+        if not self.certificados:
+            raise Http404
+        # Un lote armado con páginas de otro no es idéntico byte a byte a uno dibujado de cero: ETag débil
+        etag = ('W/"{}"' if self.reutilizar_lote else '"{}"').format(huella_certificados(self.certificados))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            filename = self.get_nombre_archivo()
+            response = HttpResponse(self.get_pdf(filename), content_type=self.content_type)
+            response['Content-Disposition'] = '{}; filename={}'.format(self.disposition, filename)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_pdf(self, filename):
+        if self.reutilizar_lote:
+            return generar_lote(self.certificados, filename)
+        if len(self.certificados) == 1:
+            # Los certificados individuales salen del archivo que se llena al culminar la capacitación
+            return pdf_certificado(self.certificados[0])
+        return generar_pdf(self.certificados, titulo=filename)
+
+    def get_nombre_archivo(self):
+        return nombre_archivo(self.certificados)
+
+    def get_certificados(self):
+        raise NotImplementedError
+
+
+class CertificadosPdfView(LoginRequiredMixin, DescargaCertificadosView):
+    pass
+
+
+# Descarga del certificado desde el enlace firmado que llega por correo, sin iniciar sesión
+class DescargaCertificadoEnlaceView(DescargaCertificadosView):
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except signing.SignatureExpired:
+            return HttpResponseGone('El enlace de descarga del certificado ha caducado')
+        except signing.BadSignature:
+            raise Http404
+
+    def get_certificados(self):
+        return certificado_de_enlace(self.kwargs.get('token'))
+
+
+# Página pública a la que apunta el código QR de los certificados; no consulta la base si el correlativo está en caché
+class VerificarCertificadoView(View):
+    template_name = 'capacitacion/verificar_certificado.html'
+
+    def get(self, request, *args, **kwargs):
+        certificado = verificacion_certificado(kwargs.get('correlativo'))
+        if certificado is None:
+            raise Http404
+        response = render(request, self.template_name, {'certificado': certificado})
+        patch_cache_control(response, public=True, max_age=settings.CERTIFICADO_VERIFICACION_CACHE)
+        return response
+
+
+# Todos los certificados emitidos a una persona, en un solo PDF o en un ZIP (?formato=zip) con uno por certificado
+class PortafolioCertificadosView(CertificadosPdfView):
     persona = None
-    cantidad_cert = 0
-    equipo_proyecto = []
-    mostrar_pdf = False
-    miembro = None
-    correlativo = None
+    es_zip = False
 
-    def dispatch(self, request, *args, **kwargs):
-        self.filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
-        
-        if not self.kwargs.get('capacitacion', None):
-            self.capacitacion = get_object_or_404(Capacitacion, pk=self.kwargs.get('id_capacitacion'))
-        else:
-            self.capacitacion = self.kwargs.get('capacitacion', None)
-        
-        if not self.kwargs.get('persona', None):
-            self.persona = get_object_or_404(Persona, pk=self.kwargs.get('id_persona'))
-        else:
-            self.persona = self.kwargs.get('persona', None)
-        
-        self.fecha_culminado = self.capacitacion.historialrevision_set.filter(estado=ESTADO_PROYECTO_CULMINADO).last().fecha_creacion
-        
-        modulo = None
-        self.temarios = []
-        self.equipo_proyecto = []
-        self.miembro = None
-        
-        for modulo in self.capacitacion.modulo_set.all():
-            self.temarios.append(modulo.temas)
-            self.horas_academicas = self.horas_academicas + modulo.horas_academicas
-        
-        self.mostrar_pdf = NotaParticipante.objects.filter(acta_asistencia__modulo=modulo, persona=self.persona, resultado='APROBADO').last()
-        if self.kwargs.get('cargo', None):
-            cargo = self.kwargs.get('cargo', None)
-        else:
-            cargo = self.request.GET.get('cargo', None)
-        if cargo:
-            self.miembro = self.capacitacion.equipoproyecto_set.filter(
-                persona=self.persona, cargo=cargo).first()
-            self.mostrar_pdf = True if self.miembro else False
-            self.correlativo = CertEmitido.objects.filter(modulo__capacitacion=self.capacitacion,
-                                                          persona=self.miembro.persona,
-                                                          cargo=cargo,
-                                                          tipo=TIPO_CERT_EMITIDO_UNICO).first().correlativo
-        else:
-            self.correlativo = CertEmitido.objects.filter(modulo__capacitacion=self.capacitacion,
-                                                          persona=self.persona,
-                                                          cargo=CARGO_CERT_EMITIDO_ASISTENTE,
-                                                          tipo=TIPO_CERT_EMITIDO_UNICO).first().correlativo
-        self.cantidad_cert = 1
-        code_qr = default_storage.save('temp_code_qr.png', ContentFile(''))
-        self.path_code_qr = default_storage.path(code_qr)
-        return super().dispatch(request, *args, **kwargs)
+    def get(self, request, *args, **kwargs):
+        self.persona = get_object_or_404(Persona, pk=kwargs.get('id_persona'))
+        self.es_zip = request.GET.get('formato') == 'zip'
+        if self.es_zip:
+            self.content_type = 'application/zip'
+        return super().get(request, *args, **kwargs)
 
-    def process_canvas(self, c):
-        self.canvas = c
-        self.encabezado()
-        if self.mostrar_pdf:
-            self.get_certificados()
-        return c
-
-    def encabezado(self):
-        lWidth, lHeight = 'A4'
-        self.canvas.setPageSize((lHeight, lWidth))
-        self.canvas.setFont('Helvetica', 13)
-        self.style = getSampleStyleSheet()['BodyText']
-        self.style.alignment = TA_CENTER
-        self.style.fontSize = 10
-        self.style1 = getSampleStyleSheet()['Normal']
-        self.style1.fontSize = 6
-        self.style2 = getSampleStyleSheet()['Normal']
-        self.style2.fontSize = 16
-        self.style2.alignment = TA_CENTER
-        self.style3 = getSampleStyleSheet()['Normal']
-        self.style3.fontSize = 13
-        self.style3.alignment = TA_CENTER
-        self.style4 = getSampleStyleSheet()['Normal']
-        self.style4.fontSize = 12
-        self.style4.alignment = TA_JUSTIFY
-        self.style4.leading  = 26
-        self.style4.padding = '20px'
-        self.style5 = getSampleStyleSheet()['Normal']
-        self.style5.fontSize = 16
-        self.style5.alignment = TA_CENTER
-        self.style_fullname = getSampleStyleSheet()['Normal']
-        self.style_fullname.fontSize = 13
-        self.style_fullname.alignment = TA_CENTER
-        self.style_right = getSampleStyleSheet()['Normal']
-        self.style_right.fontSize = 12.5
-        self.style_right.alignment = TA_RIGHT
-        self.style_certificado = getSampleStyleSheet()['Normal']
-        self.style_certificado.fontSize = 18
-        self.style_certificado.alignment = TA_CENTER
-
-    def generar_code_qr(self):
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4,)
-        qr.add_data("https://www.google.com")
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color='black', back_color='white')
-        img.save(self.path_code_qr)
-        imagen = os.path.join(self.path_code_qr)
-        width = 60
-        y_start = 10
-        self.canvas.drawImage(ImageReader(imagen), 270, y_start - 55, width=width, preserveAspectRatio=True, mask='auto')
-        os.remove(self.path_code_qr)
-
-    def obtener_path_temporal_firma(self, id, firma):
-        path = ''
-        try:
-            decode = base64.b64decode(firma)
-            filename = default_storage.save('firma_{}_temp.jpg'.format(id), ContentFile(decode))
-            path = default_storage.path(filename)
-        except:  # noqa
-            pass
-        return path
-
-    def get_certificados(self, **kwargs):
-        mes = ["", "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre","octubre", "noviembre", "diciembre"]
-        table_style1 = [
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.black, None, (2, 2, 1)),
-            ('BOX', (0, 0), (-1, -1), 0.25, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ('FONTSIZE', (0, 1), (0, -1), 10),
-        ]
-        
-        table_style4 = [('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('FONTSIZE', (0, 0), (-1, -1), 12), ]
-        data2 = [[]] * 4
-        data = [[]] * 4
-        data6 = [[]] * 4
-        contador = 0
-        
-        # Datos del certificado
-        logo_unasam = os.path.join(F'{STATIC_ROOT}', 'img', 'unasam_logo_oficial.jpg')
-        logo_ogcu = os.path.join(F'{STATIC_ROOT}', 'img', 'ogcu_logo_oficial.jpg')
-        self.canvas.drawImage(ImageReader(logo_unasam), 100, 645, 90, 90)
-        self.canvas.drawImage(ImageReader(logo_ogcu), 360, 645, 117, 85)
-
-        titulo = Paragraph('<b>CERTIFICADO</b>', style=self.style_certificado)
-        w, h = titulo.wrap(440, 0)
-        titulo.drawOn(self.canvas, 85, 600 - h)
-
-        otorgado = Paragraph('La Oficina General de Calidad Universitaria de la Universidad Nacional Santiago Antúnez de Mayolo certifica que:',
-            style=self.style4)
-        w, h = otorgado.wrap(440, 0)
-        otorgado.drawOn(self.canvas, 85, 535 - h)
-
-        contador += 1
-        n_correlativo = ''
-        
-        if 'PRESENCIAL' in self.capacitacion.canal_reunion.upper():
-            tipo_canal = 'presencial'
-        else:
-            tipo_canal = 'virtual'
-        
-        if self.miembro:
-            parrafo1 = Paragraph('''participó en calidad de {} en el Curso de {}, desarrollado de forma {} del {} de {} de {}
-            al {} de {} de {} con un total de {} horas académicas.'''.format(self.miembro.get_cargo_display(),
-                                                           self.capacitacion.nombre,
-                                                           tipo_canal,
-                                                            self.capacitacion.fecha_inicio.day,
-                                                            mes[self.capacitacion.fecha_inicio.month],
-                                                            self.capacitacion.fecha_inicio.year,
-                                                            self.capacitacion.fecha_fin.day,
-                                                            mes[self.capacitacion.fecha_fin.month],
-                                                            self.capacitacion.fecha_fin.year,
-                                                           self.horas_academicas), style=self.style4)
-            res_correlativo = CertEmitido.objects.filter(modulo__capacitacion=self.capacitacion,
-                                                         persona=self.persona,
-                                                         cargo=self.persona.cargo_miembro,
-                                                         tipo=TIPO_CERT_EMITIDO_UNICO).first()
-            if res_correlativo:
-                n_correlativo = res_correlativo.correlativo
-        else:
-            parrafo1 = Paragraph('''aprobó satisfactoriamente el Curso de {}, desarrollado de forma {} del {} de {} de {}
-            al {} de {} de {} con un total de {} horas académicas.'''.format(self.capacitacion.nombre, tipo_canal,
-                                                                      self.capacitacion.fecha_inicio.day,
-                                                                      mes[self.capacitacion.fecha_inicio.month],
-                                                                      self.capacitacion.fecha_inicio.year,
-                                                                      self.capacitacion.fecha_fin.day,
-                                                                      mes[self.capacitacion.fecha_fin.month],
-                                                                      self.capacitacion.fecha_fin.year,
-                                                                      self.horas_academicas), style=self.style4)
-            res_correlativo = CertEmitido.objects.filter(modulo__capacitacion=self.capacitacion,
-                                                         persona=self.persona,
-                                                         cargo=CARGO_CERT_EMITIDO_ASISTENTE,
-                                                         tipo=TIPO_CERT_EMITIDO_UNICO).first()
-            if res_correlativo:
-                n_correlativo = res_correlativo.correlativo
-
-        # Nombre del participante
-        nombre_completo = Paragraph('<b>{}</b>'.format(self.persona.nombre_completo.upper()), style=self.style_fullname)
-        w, h = nombre_completo.wrap(440, 0)
-        nombre_completo.drawOn(self.canvas, 85, 475 - h)
-
-        w, h = parrafo1.wrap(440, 0)
-        parrafo1.drawOn(self.canvas, 85, 440 - h)
-        
-        fecha_lugar = Paragraph('Huaraz, {} de {} de {}'.format(self.fecha_culminado.day, mes[self.fecha_culminado.month], self.fecha_culminado.year),
-            style=self.style_right)
-        w, h = fecha_lugar.wrap(440, 0)
-        fecha_lugar.drawOn(self.canvas, 85, 350 - h)
-
-        responsables_firma = self.capacitacion.responsablefirma_set.all()
-        cx = 0
-        cant_firmas = responsables_firma.count()
-        table_style = [
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ]
-        for f in responsables_firma:
-            data3 = [['']]
-            data4 = [['']] * 4
-            path_temp_firma = ''
-            if f.firmante.firma:
-                path_temp_firma = self.obtener_path_temporal_firma(f.id, f.firmante.firma)
-            if path_temp_firma:
-                a = Image(path_temp_firma, width=110, height=80)
-                data3[0] = [a]
-            tt = Table(data=data3, rowHeights=70, repeatCols=1, colWidths=230)
-            tt.setStyle(table_style)
-            w, h = tt.wrap(0, 0)
-            if cant_firmas == 2:
-                tt.drawOn(self.canvas, 65 + cx, 215)
-            else:
-                tt.drawOn(self.canvas, 50 + cx, 215)
-            data4[0] = ['__________________________________']
-            data4[1] = [str(f.firmante).upper()]
-            data4[2] = [f.get_tipo_firma_display()]
-            tt = Table(data=data4, rowHeights=14, repeatCols=1, colWidths=230)
-            tt.setStyle(table_style)
-            w, h = tt.wrap(0, 0)
-
-            if cant_firmas == 2:
-                tt.drawOn(self.canvas, 65 + cx, 170)
-                cx += 250
-            else:
-                tt.drawOn(self.canvas, 37 + cx, 170)
-                cx += 150
-
-            if path_temp_firma:
-                os.remove(path_temp_firma)
-
-        self.generar_code_qr()
-
-        titulo1 = Paragraph('VICERRECTORADO ACADÉMICO', style=self.style)
-        sub_titulo1 = Paragraph('Consejo de Capacitación, Especialización y Actualización Docente', style=self.style)
-        titulo2 = Paragraph('CCEAD UNASAM', style=self.style)
-        data6[0] = [titulo1]
-        data6[1] = [sub_titulo1]
-        data6[2] = [titulo2]
-        ta = Table(data=data6, rowHeights=15, repeatCols=1, colWidths=610)
-        ta.setStyle(table_style4)
-        w, h = ta.wrap(0, 0)
-        ta.drawOn(self.canvas, 1, 25)
-        self.canvas.showPage()
-
-        cxx = 0
-        conta = 0
-        codigo_barra = code128.Code128(barWidth=1.2, barHeight=25)
-        codigo_barra.value = n_correlativo
-        codigo_barra.drawOn(self.canvas, x=215, y=730)
-        self.canvas.drawString(278, 715, n_correlativo)
-
-        if len(self.temarios) == 1:
-            temas = self.temarios[0].split('\n')
-            data1 = [[]] * (len(temas) + 1)
-            conta += 1
-            mod = Paragraph('<b>Temario</b>', style=self.style)
-            data1[0] = [mod]
-            for x in range(1, len(temas) + 1):
-                data1[x] = [temas[x - 1].strip()]
-            tbl = Table(data=data1, rowHeights=30, repeatCols=1, colWidths=[439])
-            tbl.setStyle(table_style1)
-            w, h = tbl.wrap(0, 0)
-            tbl.drawOn(self.canvas, 87 + cxx, 680 - h)
-            cxx += 20
-            self.canvas.showPage()
-        else:
-            for t in self.temarios:
-                temas = t.split('\n')
-                data1 = [[]] * (len(temas) + 1)
-                conta += 1
-                mod = Paragraph('<b>Temario del Módulo {}</b>'.format(conta), style=self.style)
-                data1[0] = [mod]
-                trow = 20
-                espace = 0
-                tem = 0
-                for x in range(1, len(temas) + 1):
-                    te3 = temas[x - 1].strip()
-                    tem += 1
-                    if len(temas[x - 1].strip()) >= 90:
-                        trow = 30
-                        espace = 30
-                        te = temas[x - 1].strip()[:90]
-                        pos_te = te.rfind(' ')
-                        te1 = temas[x - 1].strip()[:pos_te]
-                        te2 = temas[x - 1].strip()[pos_te:]
-                        te3 = '{}\n  {}'.format(te1, te2)
-                    data1[x] = [te3]
-                tbl = Table(data=data1, rowHeights=trow, repeatCols=1, colWidths=[439])
-                tbl.setStyle(table_style1)
-                w, h = tbl.wrap(0, 0)
-                tbl.drawOn(self.canvas, 87, (680 - h) - cxx + espace)
-                cxx += 50 + (tem * 20)
-            self.canvas.showPage()
+    def get_certificados(self):
+        return certificados_persona(self.persona)
+
+    def get_nombre_archivo(self):
+        return 'Certificados-{}.{}'.format(self.persona.numero_documento, 'zip' if self.es_zip else 'pdf')
+
+    def get_pdf(self, filename):
+        if self.es_zip:
+            return portafolio_zip(self.certificados)
+        return portafolio_pdf(self.certificados, titulo=filename)
+
+
+# Genera los certificados unicos, es decir, que no tiene modulos
+class GeneraCertificadoPdf(CertificadosPdfView):
+    def get_certificados(self):
+        return certificados_curso(get_object_or_404(Capacitacion, pk=self.kwargs.get('id_capacitacion')),
+                                  persona=get_object_or_404(Persona, pk=self.kwargs.get('id_persona')),
+                                  cargo=self.request.GET.get('cargo'))
 
 
 class BandejaValidacionView(LoginRequiredMixin, BaseLogin, TemplateView):
@@ -1020,187 +788,52 @@ class BandejaValidacionView(LoginRequiredMixin, BaseLogin, TemplateView):
             return redirect("login:403")
         return super().dispatch(request, *args, **kwargs)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'estados': [e for e in ESTADO_PROYECTO_CHOICES if e[0] != ESTADO_PROYECTO_REGISTRADO],
+            'ambitos': AMBITO_CHOICES,
+            'facultades': Facultad.objects.order_by('nombre'),
+        })
+        return context
+
 
-class ListaCapacitacionValidarView(LoginRequiredMixin, BaseLogin, View):
-    array_modulos = []
+class ListaCapacitacionValidarView(LoginRequiredMixin, BaseLogin, FiltroCapacitacionMixin, View):
+    columnas_orden = {1: 'facultad__nombre', 2: 'nombre', 3: 'fecha_inicio', 7: 'estado'}
 
     def get(self, request, *args, **kwargs):
-        search_param = self.request.GET.get('search[value]')
-        filtro = self.request.GET.get('filtro')
-        capacitaciones = Capacitacion.objects.none()
-        if filtro:
-            ''
-        else:
-            capacitaciones = Capacitacion.objects.all().exclude(
-                estado=ESTADO_PROYECTO_REGISTRADO).order_by('-fecha_creacion')
-        if len(search_param) > 3:
-            capacitaciones = capacitaciones.filter(nombre__icontains=search_param)
+        capacitaciones = self.filtrar_capacitaciones(
+            Capacitacion.objects.exclude(estado=ESTADO_PROYECTO_REGISTRADO))
+        capacitaciones = capacitaciones.select_related('facultad').only(
+            'id', 'nombre', 'fecha_inicio', 'fecha_fin', 'observacion_revision', 'ruta_proyecto_pdf', 'estado',
+            'tipo_emision_certificado', 'se_envio_correo', 'tiene_firmantes', 'facultad__nombre')
         draw, page = datatable_page(capacitaciones, request)
+        modulos = modulos_por_capacitacion([a.id for a in page.object_list])
         lista_equipos_data = []
-        cont = 0
         for a in page.object_list:
-            cont = cont + 1
-            asistencia = ''
-            select1 = ''
-            select2 = ''
-            select3 = ''
-            select4 = ''
-            select5 = ''
-            color = ''
-            if a.estado == ESTADO_PROYECTO_POR_VALIDAR:
-                select1 = 'selected'
-                color = 'text-warning'
-            elif a.estado == ESTADO_PROYECTO_VALIDADO:
-                select2 = 'selected'
-                color = 'text-success'
-            elif a.estado == ESTADO_PROYECTO_CANCELADO:
-                select3 = 'selected'
-                color = 'text-danger'
-            elif a.estado == ESTADO_PROYECTO_CULMINADO:
-                select4 = 'selected'
-                color = 'text-info'
-            elif a.estado == ESTADO_PROYECTO_OBSERVADO:
-                select5 = 'selected'
-                color = 'text-warning'
-            mod_cont = 0
-            mm = 0
-            self.array_modulos = []
-            for m in a.modulo_set.all():
-                self.array_modulos.append(m)
-                mod_cont += 1
-                acta = ActaAsistencia.objects.filter(modulo=m).order_by('fecha_creacion').first()
-                if acta:
-                    mm += 1
-                    asistencia = asistencia + '''<button class="btn btn-success btn-xs v-acta" data-id="{}" 
-                    capacitacion-id="{}" style="margin-top:2px;margin-left:2px;"> Ver acta {}
-                    </button>'''.format(acta.id, a.id, mm)
-            combo = '''<input type='hidden' value='{}' id='estado-{}'>
-                   <select id='accion_revisar' class='{} form-control' data-id='{}'>
-                   <option value='por_validar' {}>Por validar</option>
-                   <option value='validado' {}>Validado</option>""
-                   <option value='cancelado' {}>Cancelado</option>
-                   <option value='culminado' {}>Culminado</option>
-                   <option value='observado' {}>Observado</option>
-                   </select><label id="msje1_{}"></label>
-               '''.format(a.estado, a.id, color, a.id, select1, select2, select3, select4, select5, a.id)
-            lista_equipos_data.append([
-                cont,
-                '<p style="font-size:14px;">{}</p>'.format(a.facultad or '-'),
-                '<p style="font-size:14px;">{}</p>'.format(a.nombre),
-                '<label style="font-size:12px;">{} al {}</label>'.format(a.fecha_inicio, a.fecha_fin),
-                ('''<button class="btn btn-info btn-xs" id="ver_archivo_pdf" data-archivo={}>
-                  Ver</button>'''.format(a.ruta_proyecto_pdf) if a.ruta_proyecto_pdf else ''
-                 ),
-                asistencia,
-                a.observacion_revision or '-',
-                combo if a.estado != ESTADO_PROYECTO_CULMINADO else '<label class="text-info"> {}</label>'.format(
-                    a.get_estado_display()),
-                self.get_boton_bandeja_asignar_firmante(a) if a.estado == ESTADO_PROYECTO_VALIDADO else '',
-                self.get_boton_genera_certificados(a) if a.estado == ESTADO_PROYECTO_CULMINADO else '',
-                (self.get_boton_envia_correo(a) if a.estado == ESTADO_PROYECTO_CULMINADO else '')
-            ])
+            lista_equipos_data.append({
+                'id': a.id,
+                'facultad': a.facultad.nombre if a.facultad else None,
+                'nombre': a.nombre,
+                'fecha_inicio': a.fecha_inicio,
+                'fecha_fin': a.fecha_fin,
+                'pdf': a.ruta_proyecto_pdf.name or None,
+                'observacion': a.observacion_revision,
+                'estado': a.estado,
+                'estado_display': a.get_estado_display(),
+                'tipo_emision': a.tipo_emision_certificado,
+                'tiene_firmantes': a.tiene_firmantes,
+                'se_envio_correo': a.se_envio_correo,
+                'modulos': modulos.get(a.id, []),
+            })
         data = {
             'draw': draw,
-            'recordsTotal': capacitaciones.count(),
-            'recordsFiltered': capacitaciones.count(),
+            'recordsTotal': page.paginator.count,
+            'recordsFiltered': page.paginator.count,
             'data': lista_equipos_data
         }
         return JsonResponse(data)
 
-    def get_boton_bandeja_asignar_firmante(self, a):
-        link = reverse('capacitacion:bandeja_asignar_firmante', kwargs={'id': a.id})
-        if a.responsablefirma_set.exists():
-            boton = '<a class="btn btn-success btn-sm" href="{0}"><i class="fa fa-eye"></i></a>'
-        else:
-            boton = '<a class="btn btn-warning btn-sm" href="{0}"><i class="fa fa-plus"></i></a>'
-        boton = boton.format(link)
-        boton = '{0}'.format(boton)
-        return boton
-
-    def get_boton_genera_certificados(self, a):
-        botones = ''
-        if a.tipo_emision_certificado == EMISION_CERTIFICADO_UNICO:
-            link = reverse('capacitacion:generar_certificados', kwargs={'id': a.id})
-            boton = ''
-            if a.responsablefirma_set.exists():
-                boton = '<a class="btn btn-success btn-xs" href="{0}"><i class="fa fa-print"></i> Único PDF</a>'
-            boton = boton.format(link)
-            boton = '{0}'.format(boton)
-            return boton
-        elif a.tipo_emision_certificado == EMISION_CERTIFICADO_MODULOS:
-            cc = 0
-            for m in self.array_modulos:
-                cc += 1
-                link = reverse('capacitacion:generar_certificados_por_mod', kwargs={'id': a.id, 'id_modulo': m.id})
-                boton = ''
-                if a.responsablefirma_set.exists():
-                    boton = '''<a class="btn btn-success btn-xs" href="{}" style="margin-top:2px;margin-left:2px;">
-                            <i class="fa fa-print"> Modulo{} PDF</i></a>'''.format(link, cc)
-                botones = botones + '{}'.format(boton)
-            return botones
-        elif a.tipo_emision_certificado == EMISION_CERTIFICADO_UNICO_Y_MODULOS:
-            cc = 0
-            link1 = reverse('capacitacion:generar_certificados', kwargs={'id': a.id})
-            bot = '''<a class="btn btn-success btn-xs" href="{0}" style="margin-top:2px;margin-left:2px;">
-                  <i class="fa fa-print"></i> Único PDF</a>'''.format(link1)
-            for m in self.array_modulos:
-                cc += 1
-                link = reverse('capacitacion:generar_certificados_por_mod', kwargs={'id': a.id, 'id_modulo': m.id})
-                boton = ''
-                if a.responsablefirma_set.exists():
-                    boton = '''<a class="btn btn-success btn-xs" href="{}" style="margin-top:2px;margin-left:2px;">
-                                <i class="fa fa-print"> Modulo{} PDF</i></a>'''.format(link, cc)
-                botones = botones + '{}'.format(boton)
-
-            return bot + botones
-
-    def get_boton_envia_correo(self, a):
-        botones = ''
-        if a.tipo_emision_certificado == EMISION_CERTIFICADO_UNICO:
-            if a.se_envio_correo:
-                return '<label class="text-success">Correo enviado</label>'
-            boton = ''
-            if a.responsablefirma_set.exists():
-                boton = '''<button class="btn btn-info btn-xs enviar-correo ev-{}" data-id="{}">
-                <i class="fa fa-envelope"></i> Enviar</button>'''
-            boton = boton.format(a.id, a.id)
-            boton = '{0}'.format(boton)
-            return boton
-        elif a.tipo_emision_certificado == EMISION_CERTIFICADO_MODULOS:
-            cc = 0
-            for m in self.array_modulos:
-                cc += 1
-                boton = ''
-                if a.responsablefirma_set.exists():
-                    if m.se_envio_correo:
-                        boton = '<label class="text-success">mod{} enviado</label>'.format(cc)
-                    else:
-                        boton = '''<button class="btn btn-info btn-xs enviar-correo-mod evm-{}" data-id="{}" 
-                                data-modulo="{}" style="margin-top:2px;margin-left:2px;"><i class="fa fa-envelope">
-                                Enviar mod{}</i></button>'''.format(m.id, a.id, m.id, cc)
-                botones = botones + '{}'.format(boton)
-            return botones
-
-        elif a.tipo_emision_certificado == EMISION_CERTIFICADO_UNICO_Y_MODULOS:
-            cc = 0
-            if a.se_envio_correo:
-                boton1 = '<label class="text-success">Correo enviado</label>'.format(cc)
-            else:
-                boton1 = '''<button class="btn btn-info btn-xs enviar-correo ev-{}" data-id="{}">
-                <i class="fa fa-envelope"></i> Enviar</button>'''
-            for m in self.array_modulos:
-                cc += 1
-                boton = ''
-                if a.responsablefirma_set.exists():
-                    if m.se_envio_correo:
-                        boton = '<label class="text-success">mod{} enviado</label>'.format(cc)
-                    else:
-                        boton = '''<button class="btn btn-info btn-xs enviar-correo-mod evm-{}" data-id="{}" 
-                                data-modulo="{}" style="margin-top:2px;margin-left:2px;"><i class="fa fa-envelope">
-                                Enviar mod{}</i></button>'''.format(m.id, a.id, m.id, cc)
-                botones = botones + '{}'.format(boton)
-            return boton1 + botones
-
 
 class ObservaCapacitacionView(LoginRequiredMixin, APIView):
     def post(self, request, *args, **kwargs):
@@ -1240,7 +873,6 @@ class RevisarCapacitacionView(LoginRequiredMixin, APIView):
             data = request.POST
             capacitacion_id = data.get('id')
             estado = data.get('estado')
-            res = True
             if capacitacion_id:
                 miembros_consejo = Persona.objects.filter(tipo_persona=TIPO_PERSONA_CONSEJO_UNASAM)
                 if not miembros_consejo:
@@ -1258,114 +890,60 @@ class RevisarCapacitacionView(LoginRequiredMixin, APIView):
                     if len(modulos) != len(actas):
                         errors = '''No se puede dar por culminado porque cuenta con módulo(s) sin acta de asistencia'''
                         return JsonResponse({'error': f"{errors}"}, status=HTTP_400_BAD_REQUEST)
-                    res = self.insert_emision_cert(capacitacion, capacitacion.tipo_emision_certificado, modulos, actas)
-                if res:
-                    capacitacion.estado = estado
-                    capacitacion.observacion_revision = None
-                    capacitacion.save()
-                    revision = HistorialRevision.objects.create(creado_por=self.request.user.username,
-                                                                capacitacion=capacitacion, estado=estado)
-                    for miembro in miembros_consejo:
-                        HistorialRevisionConsejo.objects.create(ambito=AMBITO_UNASAM,
-                                                                cargo_miembro=miembro.cargo_miembro,
-                                                                persona=miembro,
-                                                                revision=revision)
-                        msg = 'OK'
-                        return JsonResponse({'data': msg})
-                else:
-                    errors = 'Error al realizar el registro, Realize la búsqueda e intente nuevamente'
-                    return JsonResponse({'error': f"{errors}"}, status=HTTP_400_BAD_REQUEST)
+                    errors = self.insert_emision_cert(capacitacion, capacitacion.tipo_emision_certificado, modulos,
+                                                      actas)
+                    if errors:
+                        return JsonResponse({'error': errors}, status=HTTP_400_BAD_REQUEST)
+                capacitacion.estado = estado
+                capacitacion.observacion_revision = None
+                capacitacion.save()
+                revision = HistorialRevision.objects.create(creado_por=self.request.user.username,
+                                                            capacitacion=capacitacion, estado=estado)
+                if estado == ESTADO_PROYECTO_CULMINADO:
+                    # Después del estado y del historial, ver programar_prerender
+                    programar_prerender(capacitacion.id)
+                for miembro in miembros_consejo:
+                    HistorialRevisionConsejo.objects.create(ambito=AMBITO_UNASAM,
+                                                            cargo_miembro=miembro.cargo_miembro,
+                                                            persona=miembro,
+                                                            revision=revision)
+                    msg = 'OK'
+                    return JsonResponse({'data': msg})
             else:
                 errors = 'Error al realizar el registro, Realize la búsqueda e intente nuevamente'
                 return JsonResponse({'error': f"{errors}"}, status=HTTP_400_BAD_REQUEST)
 
     def insert_emision_cert(self, capacitacion, tipo_emision_cert, modulos, actas_asistencias):
-        res = False
+        usuario = self.request.user.username
+        equipo = list(capacitacion.equipoproyecto_set.values_list('persona_id', 'cargo'))
+        certificados = []
+
+        def agregar_certificados(modulo, tipo, participantes_aprobados):
+            for persona_id in participantes_aprobados:
+                certificados.append(CertEmitido(modulo=modulo, persona_id=persona_id, cargo=CARGO_CERT_EMITIDO_ASISTENTE,
+                                                tipo=tipo, creado_por=usuario, modificado_por=usuario))
+            for persona_id, cargo in equipo:
+                certificados.append(CertEmitido(modulo=modulo, persona_id=persona_id, cargo=cargo, tipo=tipo,
+                                                creado_por=usuario, modificado_por=usuario))
+
         if tipo_emision_cert in (EMISION_CERTIFICADO_UNICO, EMISION_CERTIFICADO_UNICO_Y_MODULOS):
-            aprobados = []
-            desaprobados = []
-            array_equipo_proyecto = []
-            for acta in actas_asistencias:
-                nota_participantes = NotaParticipante.objects.filter(acta_asistencia_id=acta.id).order_by('persona_id')
-                persona_id = ''
-                cc = 0
-                desaprobado = 0
-                for n in nota_participantes:
-                    if n.resultado.upper() == 'DESAPROBADO':
-                        cc += 1
-                    if persona_id != n.persona_id:
-                        persona_id = n.persona_id
-                        desaprobado += cc
-                        cc = 0
-                        if desaprobado == 0:
-                            aprobados.append(n.persona)
-                        else:
-                            desaprobados.append(n.persona)
-                            desaprobado = 0
-            ultimo_modulo = modulos[-1]
-            array_participantes_aprobados = set(aprobados) - set(desaprobados)
-            for equipo in capacitacion.equipoproyecto_set.all():
-                array_equipo_proyecto.append(equipo)
-            contador = 0
-            try:
-                for p in list(array_participantes_aprobados) + list(array_equipo_proyecto):
-                    contador += 1
-                    if contador > len(array_participantes_aprobados):
-                        cert_emitido_existente = CertEmitido.objects.filter(modulo=ultimo_modulo, persona=p.persona,
-                                                                            cargo=p.cargo,
-                                                                            tipo=TIPO_CERT_EMITIDO_UNICO).first()
-                        if not cert_emitido_existente:
-                            CertEmitido.objects.create(modulo=ultimo_modulo, persona=p.persona, cargo=p.cargo,
-                                                       creado_por=self.request.user.username,
-                                                       modificado_por=self.request.user.username)
-                    else:
-                        cert_emitido_existente = CertEmitido.objects.filter(modulo=ultimo_modulo, persona=p,
-                                                                            cargo=CARGO_CERT_EMITIDO_ASISTENTE,
-                                                                            tipo=TIPO_CERT_EMITIDO_UNICO).first()
-                        if not cert_emitido_existente:
-                            CertEmitido.objects.create(modulo=ultimo_modulo, persona=p,
-                                                       creado_por=self.request.user.username,
-                                                       modificado_por=self.request.user.username,
-                                                       cargo=CARGO_CERT_EMITIDO_ASISTENTE)
-                res = True
-            except Exception:
-                res = False
+            agregar_certificados(modulos[-1], TIPO_CERT_EMITIDO_UNICO,
+                                 participantes_aprobados(capacitacion).values_list('id', flat=True))
         if tipo_emision_cert in (EMISION_CERTIFICADO_MODULOS, EMISION_CERTIFICADO_UNICO_Y_MODULOS):
-            try:
-                for m in modulos:
-                    array_participantes_aprobados = []
-                    array_equipo_proyecto = []
-                    nota_participantes = NotaParticipante.objects.filter(
-                        acta_asistencia__modulo=m, resultado__iexact='APROBADO').order_by('persona_id')
-                    for equipo in capacitacion.equipoproyecto_set.all():
-                        array_equipo_proyecto.append(equipo)
-                    for n in nota_participantes:
-                        array_participantes_aprobados.append(n.persona)
-                    contador = 0
-                    for p in list(array_participantes_aprobados) + list(array_equipo_proyecto):
-                        contador += 1
-                        if contador > len(array_participantes_aprobados):
-                            cert_emitido_existente = CertEmitido.objects.filter(modulo=m, persona=p.persona,
-                                                                                cargo=p.cargo,
-                                                                                tipo=TIPO_CERT_EMITIDO_MODULO).first()
-                            if not cert_emitido_existente:
-                                CertEmitido.objects.create(modulo=m, persona=p.persona, cargo=p.cargo,
-                                                           tipo=TIPO_CERT_EMITIDO_MODULO,
-                                                           creado_por=self.request.user.username,
-                                                           modificado_por=self.request.user.username)
-                        else:
-                            cert_emitido_existente = CertEmitido.objects.filter(modulo=m, persona=p,
-                                                                                cargo=CARGO_CERT_EMITIDO_ASISTENTE,
-                                                                                tipo=TIPO_CERT_EMITIDO_MODULO).first()
-                            if not cert_emitido_existente:
-                                CertEmitido.objects.create(modulo=m, persona=p, tipo=TIPO_CERT_EMITIDO_MODULO,
-                                                           creado_por=self.request.user.username,
-                                                           modificado_por=self.request.user.username,
-                                                           cargo=CARGO_CERT_EMITIDO_ASISTENTE)
-                res = True
-            except Exception:
-                res = False
-        return res
+            for m in modulos:
+                agregar_certificados(m, TIPO_CERT_EMITIDO_MODULO,
+                                     participantes_aprobados(capacitacion, m).values_list('id', flat=True))
+        # Devuelve el mensaje de error para el usuario, o '' si se emitieron
+        try:
+            emitir_certificados(certificados)
+        except ValueError as ex:
+            # Correlativos que no caben: prefijo demasiado largo (CERTIFICADO_CORRELATIVO_PREFIJOS) o contador agotado
+            logger.exception('No se pudieron emitir los certificados de la capacitación %s', capacitacion.id)
+            return 'No se pudieron emitir los certificados: {}'.format(ex)
+        except DatabaseError:
+            logger.exception('No se pudieron emitir los certificados de la capacitación %s', capacitacion.id)
+            return 'Error al emitir los certificados, intente nuevamente'
+        return ''
 
 
 class BandejaAsignarFirmanteView(LoginRequiredMixin, BaseLogin, TemplateView):
@@ -1379,7 +957,8 @@ class BandejaAsignarFirmanteView(LoginRequiredMixin, BaseLogin, TemplateView):
 
     def get_context_data(self, **kwargs):
         capacitacion = get_object_or_404(Capacitacion, pk=self.kwargs.get('id'))
-        firmantes = ResponsableFirma.objects.filter(capacitacion=capacitacion)
+        firmantes = ResponsableFirma.objects.filter(capacitacion=capacitacion).select_related(
+            'firmante__persona').defer('firmante__firma')
         context = super().get_context_data(**kwargs)
         context.update({
             'capacitacion': capacitacion,
@@ -1435,1203 +1014,159 @@ class AsignarFirmanteView(LoginRequiredMixin, APIView):
                 return Response({'error': f"{errors}"}, HTTP_400_BAD_REQUEST)
 
 # Genera el certificado de todos los participantes en un unico pdf, sin modulos
-class GenerarMultipleCertificadosPdfView(LoginRequiredMixin, PdfCertView):
-    filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
-    disposition = 'attachment'
-    canvas = None
-    id_acta = None
-    participantes = None
-    capacitacion = None
-    path_code_qr = None
-    array_equipo_proyecto = []
-    horas_academicas = 0
-    temarios = []
-    cantidad_cert = 0
-    fecha_culminado = None
-    correlativo = None
-    array_participantes_aprobados = []
-
-    def dispatch(self, request, *args, **kwargs):
-        self.array_participantes_aprobados = []
-        self.array_equipo_proyecto = []
-        self.filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
-        self.capacitacion = get_object_or_404(Capacitacion, pk=kwargs.get('id'))
-        self.fecha_culminado = self.capacitacion.historialrevision_set.filter(
-            estado=ESTADO_PROYECTO_CULMINADO).last().fecha_creacion
-        actas_asistencias = ActaAsistencia.objects.filter(modulo__capacitacion=self.capacitacion).order_by('modulo_id')
-        aprobados = []
-        desaprobados = []
-        self.temarios = []
-        for acta in actas_asistencias:
-            self.temarios.append(acta.modulo.temas)
-            self.horas_academicas = self.horas_academicas + acta.modulo.horas_academicas
-            nota_participantes = NotaParticipante.objects.filter(acta_asistencia_id=acta.id).order_by('persona_id')
-            persona_id = ''
-            cc = 0
-            desaprobado = 0
-            for n in nota_participantes:
-                if n.resultado.upper() == 'DESAPROBADO':
-                    cc += 1
-                if persona_id != n.persona_id:
-                    persona_id = n.persona_id
-                    desaprobado += cc
-                    cc = 0
-                    if desaprobado == 0:
-                        aprobados.append(n.persona)
-                    else:
-                        desaprobados.append(n.persona)
-                        desaprobado = 0
-        self.array_participantes_aprobados = set(aprobados) - set(desaprobados)
-        for equipo in self.capacitacion.equipoproyecto_set.all():
-            self.array_equipo_proyecto.append(equipo)
-        self.cantidad_cert = len(self.array_participantes_aprobados) + len(self.array_equipo_proyecto)
-        code_qr = default_storage.save('temp_code_qr.png', ContentFile(''))
-        self.path_code_qr = default_storage.path(code_qr)
-        return super().dispatch(request, *args, **kwargs)
-
-    def process_canvas(self, c):
-        self.canvas = c
-        self.encabezado()
-        self.get_certificados()
-        return c
-
-    def encabezado(self):
-        lWidth, lHeight = 'A4'
-        self.canvas.setPageSize((lHeight, lWidth))
-        self.canvas.setFont('Helvetica', 13)
-        self.style = getSampleStyleSheet()['BodyText']
-        self.style.alignment = TA_CENTER
-        self.style.fontSize = 10
-        self.style1 = getSampleStyleSheet()['Normal']
-        self.style1.fontSize = 6
-        self.style2 = getSampleStyleSheet()['Normal']
-        self.style2.fontSize = 16
-        self.style2.alignment = TA_CENTER
-        self.style3 = getSampleStyleSheet()['Normal']
-        self.style3.fontSize = 13
-        self.style3.alignment = TA_CENTER
-        self.style4 = getSampleStyleSheet()['Normal']
-        self.style4.fontSize = 12
-        self.style4.alignment = TA_JUSTIFY
-        self.style4.leading  = 26
-        self.style5 = getSampleStyleSheet()['Normal']
-        self.style5.fontSize = 16
-        self.style5.alignment = TA_CENTER
-        self.style_fullname = getSampleStyleSheet()['Normal']
-        self.style_fullname.fontSize = 13
-        self.style_fullname.alignment = TA_CENTER
-        self.style_right = getSampleStyleSheet()['Normal']
-        self.style_right.fontSize = 12.5
-        self.style_right.alignment = TA_RIGHT
-        self.style_certificado = getSampleStyleSheet()['Normal']
-        self.style_certificado.fontSize = 18
-        self.style_certificado.alignment = TA_CENTER
-
-    def generar_code_qr(self):
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4,)
-        qr.add_data("https://www.google.com")
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color='black', back_color='white')
-        img.save(self.path_code_qr)
-        imagen = os.path.join(self.path_code_qr)
-        width = 60
-        y_start = 10
-        self.canvas.drawImage(ImageReader(imagen), 270, y_start - 55, width=width, preserveAspectRatio=True, mask='auto')
-        os.remove(self.path_code_qr)
-
-    def obtener_path_temporal_firma(self, id, firma):
-        path = ''
+class GenerarMultipleCertificadosPdfView(CertificadosPdfView):
+    reutilizar_lote = True
+
+    def get_certificados(self):
+        return certificados_curso(get_object_or_404(Capacitacion, pk=self.kwargs.get('id')))
+
+
+def enviar_certificados(request, certificados, asunto, omitir_enviados=False):
+    """
+    Envía a cada persona su certificado, según CERTIFICADO_CORREO_MODO: adjunto (tomado del archivo de certificados
+    sin pasar por disco) o como enlace firmado de descarga, que lo dibuja recién al abrirse. Cada intento queda en
+    EnvioCertificado; con `omitir_enviados` no se vuelve a enviar (ni a dibujar) lo que ya se entregó.
+    Devuelve las listas de enviados, errores y omitidos como '<documento>-<nombre>'.
+    """
+    personas = Persona.objects.in_bulk({c.persona_id for c in certificados})
+    emitidos = dict(CertEmitido.objects.filter(correlativo__in=[c.correlativo for c in certificados if c.correlativo])
+                    .values_list('correlativo', 'id'))
+    envios = {e.cert_emitido_id: e for e in EnvioCertificado.objects.filter(cert_emitido_id__in=emitidos.values())}
+    por_enlace = settings.CERTIFICADO_CORREO_MODO == CORREO_CERTIFICADO_ENLACE
+    array_enviados = []
+    array_errores = []
+    array_omitidos = []
+    for certificado in certificados:
+        persona = personas[certificado.persona_id]
+        nombre_completo = '{}-{}'.format(persona.numero_documento, persona.nombre_completo)
+        cert_emitido_id = emitidos.get(certificado.correlativo)
+        # Sin correlativo el certificado aún no se emitió: se envía igual, pero no hay dónde registrarlo
+        envio = envios.get(cert_emitido_id) or EnvioCertificado(cert_emitido_id=cert_emitido_id)
+        if omitir_enviados and envio.fecha_envio:
+            array_omitidos.append(nombre_completo)
+            continue
+        envio.intentos += 1
         try:
-            decode = base64.b64decode(firma)
-            filename = default_storage.save('firma_{}_temp.jpg'.format(id), ContentFile(decode))
-            path = default_storage.path(filename)
-        except:  # noqa
-            pass
-        return path
-
-    def get_certificados(self, **kwargs):
-        mes = ["", "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre","octubre", "noviembre", "diciembre"]
-        table_style1 = [
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.black, None, (2, 2, 1)),
-            ('BOX', (0, 0), (-1, -1), 0.25, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ('FONTSIZE', (0, 1), (0, -1), 10),
-        ]
-        
-        table_style4 = [('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('FONTSIZE', (0, 0), (-1, -1), 12), ]
-        
-        data2 = [[]] * 4
-        data = [[]] * 4
-        data6 = [[]] * 4
-        contador = 0
-
-        for p in list(self.array_participantes_aprobados) + list(self.array_equipo_proyecto):
-            # Datos del certificado
-            logo_unasam = os.path.join(F'{STATIC_ROOT}', 'img', 'unasam_logo_oficial.jpg')
-            logo_ogcu = os.path.join(F'{STATIC_ROOT}', 'img', 'ogcu_logo_oficial.jpg')
-            self.canvas.drawImage(ImageReader(logo_unasam), 100, 645, 90, 90)
-            self.canvas.drawImage(ImageReader(logo_ogcu), 360, 645, 117, 85)
-
-            titulo = Paragraph('<b>CERTIFICADO</b>', style=self.style_certificado)
-            w, h = titulo.wrap(440, 0)
-            titulo.drawOn(self.canvas, 85, 600 - h)
-
-            otorgado = Paragraph('La Oficina General de Calidad Universitaria de la Universidad Nacional Santiago Antúnez de Mayolo certifica que:',
-                style=self.style4)
-            w, h = otorgado.wrap(440, 0)
-            otorgado.drawOn(self.canvas, 85, 535 - h)
-
-            contador += 1
-            n_correlativo = ''
-            fullname = ''
-
-            if 'PRESENCIAL' in self.capacitacion.canal_reunion.upper():
-                tipo_canal = 'presencial'
-            else:
-                tipo_canal = 'virtual'
-
-            if contador > len(self.array_participantes_aprobados):
-                parrafo1 = Paragraph('''participó en calidad de {} en el Curso de {}, desarrollado de forma {} del {} de {} de {}
-                al {} de {} de {} con un total de {} horas académicas.'''.format(p.get_cargo_display(),
-                                                            self.capacitacion.nombre,
-                                                            tipo_canal,
-                                                            self.capacitacion.fecha_inicio.day,
-                                                            mes[self.capacitacion.fecha_inicio.month],
-                                                            self.capacitacion.fecha_inicio.year,
-                                                            self.capacitacion.fecha_fin.day,
-                                                            mes[self.capacitacion.fecha_fin.month],
-                                                            self.capacitacion.fecha_fin.year,
-                                                            self.horas_academicas), style=self.style4)
-                fullname = p.persona.nombre_completo
-                res_correlativo = CertEmitido.objects.filter(modulo__capacitacion=self.capacitacion,
-                                                             persona=p.persona,
-                                                             cargo=p.cargo,
-                                                             tipo=TIPO_CERT_EMITIDO_UNICO).first()
-                if res_correlativo:
-                    n_correlativo = res_correlativo.correlativo
-            else:
-                parrafo1 = Paragraph('''aprobó satisfactoriamente el Curso de {}, desarrollado de forma {} del {} de {} de {}
-                al {} de {} de {} con un total de {} horas académicas.'''.format(self.capacitacion.nombre, tipo_canal,
-                                                                    self.capacitacion.fecha_inicio.day,
-                                                                    mes[self.capacitacion.fecha_inicio.month],
-                                                                    self.capacitacion.fecha_inicio.year,
-                                                                    self.capacitacion.fecha_fin.day,
-                                                                    mes[self.capacitacion.fecha_fin.month],
-                                                                    self.capacitacion.fecha_fin.year,
-                                                                    self.horas_academicas), style=self.style4)
-                fullname = p.nombre_completo
-                res_correlativo = CertEmitido.objects.filter(modulo__capacitacion=self.capacitacion,
-                                                             persona=p,
-                                                             cargo=CARGO_CERT_EMITIDO_ASISTENTE,
-                                                             tipo=TIPO_CERT_EMITIDO_UNICO).first()
-                if res_correlativo:
-                    n_correlativo = res_correlativo.correlativo
-
-            # Nombre del participante
-            nombre_completo = Paragraph('<b>{}</b>'.format(str(fullname).upper()), style=self.style_fullname)
-            w, h = nombre_completo.wrap(440, 0)
-            nombre_completo.drawOn(self.canvas, 85, 475 - h)
-
-            w, h = parrafo1.wrap(440, 0)
-            parrafo1.drawOn(self.canvas, 85, 440 - h)
-        
-            fecha_lugar = Paragraph('Huaraz, {} de {} de {}'.format(self.fecha_culminado.day, mes[self.fecha_culminado.month], self.fecha_culminado.year),
-                style=self.style_right)
-            w, h = fecha_lugar.wrap(440, 0)
-            fecha_lugar.drawOn(self.canvas, 85, 350 - h)
-
-            responsables_firma = self.capacitacion.responsablefirma_set.all()
-            cx = 0
-            cant_firmas = responsables_firma.count()
-            table_style = [
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ]
-            for f in responsables_firma:
-                data3 = [['']]
-                data4 = [['']] * 4
-                path_temp_firma = ''
-                if f.firmante.firma:
-                    path_temp_firma = self.obtener_path_temporal_firma(f.id, f.firmante.firma)
-                if path_temp_firma:
-                    a = Image(path_temp_firma, width=110, height=80)
-                    data3[0] = [a]
-                tt = Table(data=data3, rowHeights=70, repeatCols=1, colWidths=230)
-                tt.setStyle(table_style)
-                w, h = tt.wrap(0, 0)
-
-                if cant_firmas == 2:
-                    tt.drawOn(self.canvas, 65 + cx, 215)
-                else:
-                    tt.drawOn(self.canvas, 50 + cx, 215)
-                
-                data4[0] = ['__________________________________']
-                data4[1] = [str(f.firmante).upper()]
-                data4[2] = [f.get_tipo_firma_display()]
-
-                tt = Table(data=data4, rowHeights=14, repeatCols=1, colWidths=230)
-                tt.setStyle(table_style)
-                w, h = tt.wrap(0, 0)
-
-                if cant_firmas == 2:
-                    tt.drawOn(self.canvas, 65 + cx, 170)
-                    cx += 250
-                else:
-                    tt.drawOn(self.canvas, 37 + cx, 170)
-                    cx += 150
-
-                if path_temp_firma:
-                    os.remove(path_temp_firma)
-            # footer
-            self.generar_code_qr()
-            
-            titulo1 = Paragraph('VICERRECTORADO ACADÉMICO', style=self.style)
-            sub_titulo1 = Paragraph('Consejo de Capacitación, Especialización y Actualización Docente', style=self.style)
-            titulo2 = Paragraph('CCEAD UNASAM', style=self.style)
-            data6[0] = [titulo1]
-            data6[1] = [sub_titulo1]
-            data6[2] = [titulo2]
-
-            ta = Table(data=data6, rowHeights=15, repeatCols=1, colWidths=610)
-            ta.setStyle(table_style4)
-            w, h = ta.wrap(0, 0)
-            ta.drawOn(self.canvas, 1, 25)
-
-            self.canvas.showPage()
-
-            cxx = 0
-            conta = 0
-            codigo_barra = code128.Code128(barWidth=1.2, barHeight=25)
-            codigo_barra.value = n_correlativo
-            codigo_barra.drawOn(self.canvas, x=215, y=730)
-            self.canvas.drawString(278, 715, n_correlativo)
-            
-            if len(self.temarios) == 1:
-                temas = self.temarios[0].split('\n')
-                data1 = [[]] * (len(temas) + 1)
-                conta += 1
-                mod = Paragraph('<b>Temario</b>', style=self.style)
-                data1[0] = [mod]
-                for x in range(1, len(temas) + 1):
-                    data1[x] = [temas[x - 1].strip()]
-                tbl = Table(data=data1, rowHeights=30, repeatCols=1, colWidths=[439])
-                tbl.setStyle(table_style1)
-                w, h = tbl.wrap(0, 0)
-                tbl.drawOn(self.canvas, 87 + cxx, 680 - h)
-                cxx += 20
-                self.canvas.showPage()
+            if not persona.email:
+                raise ValueError('La persona no tiene correo electrónico registrado')
+            if por_enlace:
+                enlace = request.build_absolute_uri(
+                    reverse('capacitacion:descarga_certificado_enlace', args=[firmar_enlace(certificado)]))
+                mensaje = '''<p>Estimado (a) {},</p>
+                             <p> Puede descargar su Certificado desde el siguiente enlace, válido por {} días:</p>
+                             <p><a href="{}">{}</a></p>'''.format(persona.nombre_completo,
+                                                                settings.CERTIFICADO_ENLACE_DIAS, enlace, enlace)
             else:
-                for t in self.temarios:
-                    temas = t.split('\n')
-                    data1 = [[]] * (len(temas) + 1)
-                    conta += 1
-                    mod = Paragraph('<b>Temario del Módulo {}</b>'.format(conta), style=self.style)
-                    data1[0] = [mod]
-                    trow = 20
-                    espace = 0
-                    tem = 0
-                    for x in range(1, len(temas) + 1):
-                        te3 = temas[x - 1].strip()
-                        tem += 1
-                        if len(temas[x - 1].strip()) >= 90:
-                            trow = 30
-                            espace = 30
-                            te = temas[x - 1].strip()[:90]
-                            pos_te = te.rfind(' ')
-                            te1 = temas[x - 1].strip()[:pos_te]
-                            te2 = temas[x - 1].strip()[pos_te:]
-                            te3 = '{}\n  {}'.format(te1, te2)
-                        data1[x] = [te3]
-                    tbl = Table(data=data1, rowHeights=trow, repeatCols=1, colWidths=[439])
-                    tbl.setStyle(table_style1)
-                    w, h = tbl.wrap(0, 0)
-                    tbl.drawOn(self.canvas, 87, (680 - h) - cxx + espace)
-                    cxx += 50 + (tem * 20)
-                self.canvas.showPage()
-
+                mensaje = '''<p>Estimado (a) {},</p>
+                             <p> Se envía adjunto su Certificado.</p>'''.format(persona.nombre_completo)
+            message_id = make_msgid(domain=DNS_NAME)
+            email = EmailMessage(asunto, mensaje, settings.EMAIL_HOST_USER, [persona.email],
+                                 headers={'Message-ID': message_id})
+            email.content_subtype = "html"
+            if not por_enlace:
+                email.attach(nombre_archivo((certificado,)), pdf_certificado(certificado), 'application/pdf')
+            if not email.send(fail_silently=False):
+                raise ValueError('El servidor de correo no aceptó el mensaje')
+            envio.fecha_envio = timezone.now()
+            envio.message_id = message_id
+            envio.ultimo_error = ''
+            array_enviados.append(nombre_completo)
+        except Exception as ex:
+            envio.ultimo_error = str(ex)
+            array_errores.append(nombre_completo)
+        if cert_emitido_id:
+            envio.save()
+    return array_enviados, array_errores, array_omitidos
+
+
+def envio_completo(certificados, array_errores):
+    """
+    Si ya se entregaron todos `certificados`: el último envío no tuvo errores y ninguno de sus registros en
+    EnvioCertificado sigue sin fecha de envío.
+    """
+    if array_errores or not certificados:
+        return False
+    return not EnvioCertificado.objects.filter(
+        cert_emitido__correlativo__in=[c.correlativo for c in certificados if c.correlativo],
+        fecha_envio__isnull=True).exists()
+
+
+# Los envíos no corren en la transacción de la petición: cada intento registrado en EnvioCertificado se confirma
+# al momento, así un corte a mitad de un envío masivo no hace reenviar lo que ya salió.
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class EnvioCertificadoMultiCorreo(View):
-    persona = None
-    capacitacion = None
-    filename = 'Certificado_{}.pdf'
-    horas_academicas = 0
-    array_participantes_aprobados = 0
-
     def get(self, request, *args, **kwargs):
-        self.capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
-        actas_asistencias = ActaAsistencia.objects.filter(modulo__capacitacion=self.capacitacion)
-        if self.capacitacion and actas_asistencias:
-            aprobados = []
-            desaprobados = []
-            self.temarios = []
-            self.array_equipo_proyecto = []
-            array_errores = []
-            array_enviados = []
-            for acta in actas_asistencias:
-                self.temarios.append(acta.modulo.temas)
-                self.horas_academicas = self.horas_academicas + acta.modulo.horas_academicas
-                nota_participantes = NotaParticipante.objects.filter(acta_asistencia_id=acta.id).order_by('persona_id')
-                persona_id = ''
-                cc = 0
-                desaprobado = 0
-                for n in nota_participantes:
-                    if n.resultado.upper() == 'DESAPROBADO':
-                        cc += 1
-                    if persona_id != n.persona_id:
-                        persona_id = n.persona_id
-                        desaprobado += cc
-                        cc = 0
-                        if desaprobado == 0:
-                            aprobados.append(n.persona)
-                        else:
-                            desaprobados.append(n.persona)
-                            desaprobado = 0
-            self.array_participantes_aprobados = set(aprobados) - set(desaprobados)
-            for equipo in self.capacitacion.equipoproyecto_set.all():
-                self.array_equipo_proyecto.append(equipo)
-            ccc = 0
-            for p in list(self.array_participantes_aprobados) + list(self.array_equipo_proyecto):
-                ccc += 1
-                if ccc > len(self.array_participantes_aprobados):
-                    nombre_completo = '{}-{}'.format(p.persona.numero_documento, p.persona.nombre_completo)
-                    correo_e = p.persona.email
-                    cargo = p.cargo
-                    persona_id = p.persona_id
-                else:
-                    nombre_completo = '{}-{}'.format(p.numero_documento, p.nombre_completo)
-                    correo_e = p.email
-                    cargo = None
-                    persona_id = p.id
-                kwargs.update({'id_capacitacion': self.capacitacion.id, 'id_persona': persona_id,
-                               'capacitacion': self.capacitacion, 'cargo': cargo})
-                response = GeneraCertificadoPdf.as_view()(request, **kwargs)
-                if response.status_code == HTTP_200_OK:
-                    self.filename = self.filename.format(timezone.now().strftime('%d_%m_%Y'))
-                    pdf = default_storage.save(self.filename, ContentFile(response.content))
-                    path_pdf = default_storage.path(pdf)
-                    try:
-                        asunto = 'UNASAM - Certificado del curso de: {}'.format(self.capacitacion.nombre)
-                        mensaje = '''<p>Estimado (a) {},</p>
-                                     <p> Se envía adjunto su Certificado.</p>'''.format(nombre_completo)
-                        remitente = settings.EMAIL_HOST_USER
-                        destinatarios = [correo_e]
-                        email = EmailMessage(asunto, mensaje, remitente, destinatarios)
-                        email.content_subtype = "html"
-                        email.attach_file(path_pdf)
-                        if correo_e and email.send(fail_silently=False):
-                            array_enviados.append(nombre_completo)
-                            if path_pdf:
-                                os.remove(path_pdf)
-                        else:
-                            array_errores.append(nombre_completo)
-                            if path_pdf:
-                                os.remove(path_pdf)
-                    except Exception as ex:
-                        array_errores.append(nombre_completo)
-                        if path_pdf:
-                            os.remove(path_pdf)
-            if array_enviados:
-                self.capacitacion.se_envio_correo = True
-                self.capacitacion.save(update_fields=['se_envio_correo'])
-            return JsonResponse({'errores': array_errores, 'enviados': array_enviados}, status=HTTP_200_OK)
-        else:
+        capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
+        if not capacitacion:
             return JsonResponse({}, status=HTTP_400_BAD_REQUEST)
-
-
+        certificados = certificados_curso(capacitacion)
+        array_enviados, array_errores, array_omitidos = enviar_certificados(
+            request, certificados, 'UNASAM - Certificado del curso de: {}'.format(capacitacion.nombre),
+            omitir_enviados=True)
+        # Mientras falte alguno la bandeja sigue ofreciendo el envío, que retoma solo los pendientes
+        capacitacion.se_envio_correo = envio_completo(certificados, array_errores)
+        capacitacion.save(update_fields=['se_envio_correo'])
+        return JsonResponse({'errores': array_errores, 'enviados': array_enviados, 'omitidos': array_omitidos},
+                            status=HTTP_200_OK)
+
+
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class EnvioCertificadoCorreo(View):
-    persona = None
-    capacitacion = None
-    modulo = None
-    filename = 'Certificado_{}.pdf'
-    horas_academicas = 0
-    array_participantes_aprobados = 0
-
     def get(self, request, *args, **kwargs):
-        self.capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
-        self.persona = Persona.objects.filter(pk=kwargs.get('id_persona')).first()
-        kwargs.update({'persona': self.persona, 'capacitacion': self.capacitacion,
-                       'cargo': self.request.GET.get('cargo', '')})
-        response = GeneraCertificadoPdf.as_view()(request, **kwargs)
-        if response.status_code == HTTP_200_OK:
-            array_enviados = []
-            array_errores = []
-            self.filename = self.filename.format(timezone.now().strftime('%d_%m_%Y'))
-            pdf = default_storage.save(self.filename, ContentFile(response.content))
-            path_pdf = default_storage.path(pdf)
-            try:
-                asunto = 'UNASAM - Certificado del curso de: {}'.format(self.capacitacion.nombre)
-                mensaje = '''<p>Estimado (a) {},</p>
-                             <p> Se envía adjunto su Certificado.</p>'''.format(self.persona.nombre_completo)
-                remitente = settings.EMAIL_HOST_USER
-                destinatarios = [self.persona.email]
-                email = EmailMessage(asunto, mensaje, remitente, destinatarios)
-                email.content_subtype = "html"
-                email.attach_file(path_pdf)
-                if self.persona.email and email.send(fail_silently=False):
-                    array_enviados.append('{}-{}'.format(self.persona.numero_documento, self.persona.nombre_completo))
-                    if path_pdf:
-                        os.remove(path_pdf)
-                else:
-                    array_errores.append('{}-{}'.format(self.persona.numero_documento, self.persona.nombre_completo))
-                    if path_pdf:
-                        os.remove(path_pdf)
-            except Exception as ex:
-                array_errores.append('{}-{}'.format(self.persona.numero_documento, self.persona.nombre_completo))
-                if path_pdf:
-                    os.remove(path_pdf)
-            return JsonResponse({'errores': array_errores, 'enviados': array_enviados}, status=HTTP_200_OK)
-        else:
+        capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
+        persona = Persona.objects.filter(pk=kwargs.get('id_persona')).first()
+        certificados = certificados_curso(capacitacion, persona=persona,
+                                          cargo=request.GET.get('cargo')) if capacitacion and persona else ()
+        if not certificados:
             return JsonResponse({}, status=HTTP_400_BAD_REQUEST)
+        array_enviados, array_errores, _ = enviar_certificados(
+            request, certificados, 'UNASAM - Certificado del curso de: {}'.format(capacitacion.nombre))
+        return JsonResponse({'errores': array_errores, 'enviados': array_enviados}, status=HTTP_200_OK)
 
 # Certificado x cada persona x cada modulo
-class GeneraCertificadoPdfPorModulo(LoginRequiredMixin, PdfCertView):
-    filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
-    disposition = 'attachment'
-    canvas = None
-    id_acta = None
-    participantes = None
-    capacitacion = None
-    path_code_qr = None
-    horas_academicas = 0
-    nota_participante = None
-    temarios = []
-    fecha_culminado = None
-    persona = None
-    cantidad_cert = 0
-    equipo_proyecto = []
-    mostrar_pdf = True
-    miembro = None
-    modulo = None
-    correlativo = None
+class GeneraCertificadoPdfPorModulo(CertificadosPdfView):
+    def get_certificados(self):
+        return certificados_modulo(get_object_or_404(Capacitacion, pk=self.kwargs.get('id_capacitacion')),
+                                   get_object_or_404(Modulo, pk=self.kwargs.get('id_modulo')),
+                                   persona=get_object_or_404(Persona, pk=self.kwargs.get('id_persona')),
+                                   cargo=self.request.GET.get('cargo'))
 
-    def dispatch(self, request, *args, **kwargs):
-        self.filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
-        if not self.kwargs.get('capacitacion', None):
-            self.capacitacion = get_object_or_404(Capacitacion, pk=self.kwargs.get('id_capacitacion'))
-        else:
-            self.capacitacion = self.kwargs.get('capacitacion', None)
-        if not self.kwargs.get('persona', None):
-            self.persona = get_object_or_404(Persona, pk=self.kwargs.get('id_persona'))
-        else:
-            self.persona = self.kwargs.get('persona', None)
-        if not self.kwargs.get('modulo', None):
-            self.modulo = get_object_or_404(Modulo, pk=self.kwargs.get('id_modulo'))
-        else:
-            self.modulo = self.kwargs.get('modulo', None)
-        self.temarios = []
-        self.equipo_proyecto = []
-        self.miembro = None
-        if self.kwargs.get('cargo', None):
-            cargo = self.kwargs.get('cargo', None)
-        else:
-            cargo = self.request.GET.get('cargo', None)
-        if cargo:
-            self.miembro = self.capacitacion.equipoproyecto_set.filter(
-                persona=self.persona, cargo=cargo).first()
-            self.mostrar_pdf = True if self.miembro else False
-            self.correlativo = CertEmitido.objects.filter(modulo=self.modulo,
-                                                          persona=self.miembro.persona,
-                                                          cargo=cargo,
-                                                          tipo=TIPO_CERT_EMITIDO_MODULO).first().correlativo
-        else:
-            self.correlativo = CertEmitido.objects.filter(modulo=self.modulo,
-                                                          persona=self.persona,
-                                                          cargo=CARGO_CERT_EMITIDO_ASISTENTE,
-                                                          tipo=TIPO_CERT_EMITIDO_MODULO).first().correlativo
-        self.cantidad_cert = 1
-        code_qr = default_storage.save('temp_code_qr.png', ContentFile(''))
-        self.path_code_qr = default_storage.path(code_qr)
-        return super().dispatch(request, *args, **kwargs)
-
-    def process_canvas(self, c):
-        self.canvas = c
-        self.encabezado()
-        if self.mostrar_pdf:
-            self.get_certificados()
-        return c
-
-    def encabezado(self):
-        lWidth, lHeight = 'A4'
-        self.canvas.setPageSize((lHeight, lWidth))
-        self.canvas.setFont('Helvetica', 13)
-
-        self.style = getSampleStyleSheet()['BodyText']
-        self.style.alignment = TA_CENTER
-        self.style.fontSize = 10
-
-        self.style1 = getSampleStyleSheet()['Normal']
-        self.style1.fontSize = 6
-
-        self.style2 = getSampleStyleSheet()['Normal']
-        self.style2.fontSize = 16
-        self.style2.alignment = TA_CENTER
-
-        self.style3 = getSampleStyleSheet()['Normal']
-        self.style3.fontSize = 13
-        self.style3.alignment = TA_CENTER
-
-        self.style4 = getSampleStyleSheet()['Normal']
-        self.style4.fontSize = 12
-        self.style4.alignment = TA_JUSTIFY
-        self.style4.leading  = 26
-
-        self.style5 = getSampleStyleSheet()['Normal']
-        self.style5.fontSize = 16
-        self.style5.alignment = TA_CENTER
-
-        self.style_fullname = getSampleStyleSheet()['Normal']
-        self.style_fullname.fontSize = 13
-        self.style_fullname.alignment = TA_CENTER
-
-        self.style_right = getSampleStyleSheet()['Normal']
-        self.style_right.fontSize = 12.5
-        self.style_right.alignment = TA_RIGHT
-
-        self.style_certificado = getSampleStyleSheet()['Normal']
-        self.style_certificado.fontSize = 18
-        self.style_certificado.alignment = TA_CENTER
-
-    def generar_code_qr(self):
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4,)
-        qr.add_data("https://www.google.com")
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color='black', back_color='white')
-        img.save(self.path_code_qr)
-        imagen = os.path.join(self.path_code_qr)
-        width = 60
-        y_start = 10
-        self.canvas.drawImage(ImageReader(imagen), 270, y_start - 55, width=width, preserveAspectRatio=True, mask='auto')
-        os.remove(self.path_code_qr)
-
-    def obtener_path_temporal_firma(self, id, firma):
-        path = ''
-        try:
-            decode = base64.b64decode(firma)
-            filename = default_storage.save('firma_{}_temp.jpg'.format(id), ContentFile(decode))
-            path = default_storage.path(filename)
-        except:  # noqa
-            pass
-        return path
-
-    def get_certificados(self, **kwargs):
-        mes = ["", "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre","octubre", "noviembre", "diciembre"]
-        
-        table_style1 = [
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.black, None, (2, 2, 1)),
-            ('BOX', (0, 0), (-1, -1), 0.25, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ('FONTSIZE', (0, 1), (0, -1), 10),
-        ]
-        table_style4 = [('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('FONTSIZE', (0, 0), (-1, -1), 12)]
-
-        fecha_inicio = DetalleAsistencia.objects.filter(acta_asistencia__modulo=self.modulo).first().fecha
-        fecha_fin = DetalleAsistencia.objects.filter(acta_asistencia__modulo=self.modulo).last().fecha
-
-        self.horas_academicas = self.modulo.horas_academicas
-
-        if not self.miembro:
-            self.mostrar_pdf = NotaParticipante.objects.filter(acta_asistencia__modulo=self.modulo, persona=self.persona, resultado='APROBADO').last()
-
-        if self.miembro or self.mostrar_pdf:
-            data2 = [[]] * 4
-            data = [[]] * 4
-            contador = 0
-
-            # Datos del certificado
-            logo_unasam = os.path.join(F'{STATIC_ROOT}', 'img', 'unasam_logo_oficial.jpg')
-            logo_ogcu = os.path.join(F'{STATIC_ROOT}', 'img', 'ogcu_logo_oficial.jpg')
-            self.canvas.drawImage(ImageReader(logo_unasam), 100, 645, 90, 90)
-            self.canvas.drawImage(ImageReader(logo_ogcu), 360, 645, 117, 85)
-
-            titulo = Paragraph('<b>CERTIFICADO</b>', style=self.style_certificado)
-            w, h = titulo.wrap(440, 0)
-            titulo.drawOn(self.canvas, 85, 600 - h)
-
-            otorgado = Paragraph('La Oficina General de Calidad Universitaria de la Universidad Nacional Santiago Antúnez de Mayolo certifica que:', style=self.style4)
-            w, h = otorgado.wrap(440, 0)
-            otorgado.drawOn(self.canvas, 85, 535 - h)
-
-            contador += 1
-            if 'PRESENCIAL' in self.capacitacion.canal_reunion.upper():
-                tipo_canal = 'presencial'
-            else:
-                tipo_canal = 'virtual'
-
-            if self.miembro:
-                parrafo1 = Paragraph('''participó en calidad de {} en el Módulo de {}, desarrollado de forma {} del {} de {} de {} al {} de {} de {} con un total de {} horas académicas.'''.format(self.miembro.get_cargo_display(),
-                                            self.modulo.nombre,
-                                            tipo_canal,
-                                            fecha_inicio.day, mes[fecha_inicio.month], fecha_inicio.year,
-                                            fecha_fin.day, mes[fecha_fin.month], fecha_fin.year,
-                                            self.horas_academicas), style=self.style4)
-            else:                                           
-                parrafo1 = Paragraph('''aprobó satisfactoriamente el Módulo de {}, desarrollado de forma {} del {} de {} de {}  al {} de {} de {} con un total de {} horas académicas.'''.format(self.modulo.nombre, tipo_canal,
-                                            fecha_inicio.day, mes[fecha_inicio.month], fecha_inicio.year,
-                                            fecha_fin.day, mes[fecha_fin.month], fecha_fin.year,
-                                            self.horas_academicas), style=self.style4)
-
-            # Nombre del participante
-            nombre_completo = Paragraph('<b>{}</b>'.format(self.persona.nombre_completo.upper()), style=self.style_fullname)
-            w, h = nombre_completo.wrap(440, 0)
-            nombre_completo.drawOn(self.canvas, 85, 475 - h)          
-            
-            w, h = parrafo1.wrap(440, 0)
-            parrafo1.drawOn(self.canvas, 85, 440 - h)
-        
-            fecha_lugar = Paragraph('Huaraz, {} de {} de {}'.format(fecha_fin.day, mes[fecha_fin.month], fecha_fin.year), style=self.style_right)
-            w, h = fecha_lugar.wrap(440, 0)
-            fecha_lugar.drawOn(self.canvas, 85, 350 - h)
-
-            responsables_firma = self.capacitacion.responsablefirma_set.all()
-            cx = 0
-            cant_firmas = responsables_firma.count()
-            table_style = [
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ]
-            for f in responsables_firma:
-                data3 = [['']]
-                data4 = [['']] * 4
-                path_temp_firma = ''
-                if f.firmante.firma:
-                    path_temp_firma = self.obtener_path_temporal_firma(f.id, f.firmante.firma)
-                if path_temp_firma:
-                    a = Image(path_temp_firma, width=110, height=80)
-                    data3[0] = [a]
-                tt = Table(data=data3, rowHeights=70, repeatCols=1, colWidths=230)
-                tt.setStyle(table_style)
-                w, h = tt.wrap(0, 0)
-
-                if cant_firmas == 2:
-                    tt.drawOn(self.canvas, 65 + cx, 215)
-                else:
-                    tt.drawOn(self.canvas, 50 + cx, 215)
-
-                grado = dict(ABREVIATURA_GRADO).get(f.firmante.persona.grado_academico, '')
-                data4[0] = ['__________________________________']
-                data4[1] = ['{} {}'.format(grado, str(f.firmante).upper()).title()]
-                data4[2] = [f.get_tipo_firma_display()]
-                data4[3] = [f.firmante.ambito.upper()]
-                tt = Table(data=data4, rowHeights=14, repeatCols=1, colWidths=230)
-                tt.setStyle(table_style)
-                w, h = tt.wrap(0, 0)
-                
-                if cant_firmas == 2:
-                    tt.drawOn(self.canvas, 65 + cx, 170)
-                    cx += 250
-                else:
-                    tt.drawOn(self.canvas, 37 + cx, 170)
-                    cx += 150
-
-                if path_temp_firma:
-                    os.remove(path_temp_firma)
-            
-            # footer
-            self.generar_code_qr()
-
-            titulo1 = Paragraph('VICERRECTORADO ACADÉMICO', style=self.style)
-            sub_titulo = Paragraph('Consejo de Capacitación, Especialización y Actualización Docente', style=self.style)
-            titulo2 = Paragraph('CCEAD UNASAM', style=self.style)
-            data2[0] = [titulo1]
-            data2[1] = [sub_titulo]
-            data2[2] = [titulo2]
-
-            ta = Table(data=data2, rowHeights=15, repeatCols=1, colWidths=610)
-            ta.setStyle(table_style4)
-            w, h = ta.wrap(0, 0)
-            ta.drawOn(self.canvas, 1, 25)
-
-            self.canvas.showPage()
-
-            cxx = 0
-            conta = 0
-            codigo_barra = code128.Code128(barWidth=1.2, barHeight=25)
-            codigo_barra.value = self.correlativo
-            codigo_barra.drawOn(self.canvas, x=215, y=730)
-            self.canvas.drawString(278, 715, self.correlativo)
-
-            temas = self.modulo.temas.split('\n')
-            data1 = [[]] * (len(temas) + 1)
-            conta += 1
-            mod = Paragraph('<b>Temario</b>', style=self.style)
-            data1[0] = [mod]
-
-            for x in range(1, len(temas) + 1):
-                data1[x] = [temas[x - 1].strip()]
-
-            tbl = Table(data=data1, rowHeights=30, repeatCols=1, colWidths=[439])
-            tbl.setStyle(table_style1)
-            w, h = tbl.wrap(0, 0)
-            tbl.drawOn(self.canvas, 87 + cxx, 680 - h)
-            cxx += 20
-            self.canvas.showPage()
 
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class EnvioCertificadoPorModuloCorreo(View):
-    persona = None
-    capacitacion = None
-    modulo = None
-    filename = 'Certificado_{}.pdf'
-    horas_academicas = 0
-    array_participantes_aprobados = 0
-
     def get(self, request, *args, **kwargs):
-        self.capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
-        self.persona = Persona.objects.filter(pk=kwargs.get('id_persona')).first()
-        self.modulo = Modulo.objects.filter(pk=kwargs.get('id_modulo')).first()
-        kwargs.update({'persona': self.persona, 'capacitacion': self.capacitacion, 'modulo': self.modulo,
-                       'cargo': self.request.GET.get('cargo', '')})
-        response = GeneraCertificadoPdfPorModulo.as_view()(request, **kwargs)
-        if response.status_code == HTTP_200_OK:
-            array_enviados = []
-            array_errores = []
-            self.filename = self.filename.format(timezone.now().strftime('%d_%m_%Y'))
-            pdf = default_storage.save(self.filename, ContentFile(response.content))
-            path_pdf = default_storage.path(pdf)
-            try:
-                asunto = 'UNASAM - Certificado del curso de: {}'.format(self.modulo.nombre)
-                mensaje = '''<p>Estimado (a) {},</p>
-                             <p> Se envía adjunto su Certificado.</p>'''.format(self.persona.nombre_completo)
-                remitente = settings.EMAIL_HOST_USER
-                destinatarios = [self.persona.email]
-                email = EmailMessage(asunto, mensaje, remitente, destinatarios)
-                email.content_subtype = "html"
-                email.attach_file(path_pdf)
-                if self.persona.email and email.send(fail_silently=False):
-                    array_enviados.append('{}-{}'.format(self.persona.numero_documento, self.persona.nombre_completo))
-                    if path_pdf:
-                        os.remove(path_pdf)
-                else:
-                    array_errores.append('{}-{}'.format(self.persona.numero_documento, self.persona.nombre_completo))
-                    if path_pdf:
-                        os.remove(path_pdf)
-            except Exception as ex:
-                array_errores.append('{}-{}'.format(self.persona.numero_documento, self.persona.nombre_completo))
-                if path_pdf:
-                    os.remove(path_pdf)
-            return JsonResponse({'errores': array_errores, 'enviados': array_enviados}, status=HTTP_200_OK)
-        else:
+        capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
+        persona = Persona.objects.filter(pk=kwargs.get('id_persona')).first()
+        modulo = Modulo.objects.filter(pk=kwargs.get('id_modulo'), capacitacion=capacitacion).first()
+        certificados = certificados_modulo(capacitacion, modulo, persona=persona,
+                                           cargo=request.GET.get('cargo')) if modulo and persona else ()
+        if not certificados:
             return JsonResponse({}, status=HTTP_400_BAD_REQUEST)
+        array_enviados, array_errores, _ = enviar_certificados(
+            request, certificados, 'UNASAM - Certificado del curso de: {}'.format(modulo.nombre))
+        return JsonResponse({'errores': array_errores, 'enviados': array_enviados}, status=HTTP_200_OK)
 
 # Genera los certificados por cada tema de modulo para todos los participantes
-class GenerarMultipleCertificadosPorModPdfView(LoginRequiredMixin, PdfCertView):
-    filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
-    disposition = 'attachment'
-    canvas = None
-    id_acta = None
-    participantes = None
-    capacitacion = None
-    path_code_qr = None
-    array_participantes_aprobados = []
-    array_equipo_proyecto = []
-    horas_academicas = 0
-    temarios = []
-    cantidad_cert = 0
-    fecha_culminado = None
-    modulo = None
-    fecha_inicio = None
-    fecha_fin = None
+class GenerarMultipleCertificadosPorModPdfView(CertificadosPdfView):
+    reutilizar_lote = True
 
-    def dispatch(self, request, *args, **kwargs):
-        self.array_participantes_aprobados = []
-        self.array_equipo_proyecto = []
-        self.filename = 'Certificado-{}.pdf'.format(timezone.now().strftime('%d/%m/%Y %H:%M:%S'))
-        self.capacitacion = get_object_or_404(Capacitacion, pk=kwargs.get('id'))
-        self.modulo = get_object_or_404(Modulo, pk=kwargs.get('id_modulo'))
-        self.fecha_inicio = DetalleAsistencia.objects.filter(acta_asistencia__modulo=self.modulo).first().fecha
-        self.fecha_fin = DetalleAsistencia.objects.filter(acta_asistencia__modulo=self.modulo).last().fecha
-        actas_asistencias = ActaAsistencia.objects.filter(modulo=self.modulo).order_by('modulo_id')
-        aprobados = []
-        desaprobados = []
-        self.temarios = []
-        for acta in actas_asistencias:
-            self.temarios.append(acta.modulo.temas)
-            self.horas_academicas = self.horas_academicas + acta.modulo.horas_academicas
-            nota_participantes = NotaParticipante.objects.filter(acta_asistencia_id=acta.id).order_by('persona_id')
-            persona_id = ''
-            cc = 0
-            desaprobado = 0
-            for n in nota_participantes:
-                if n.resultado.upper() == 'DESAPROBADO':
-                    cc += 1
-                if persona_id != n.persona_id:
-                    persona_id = n.persona_id
-                    desaprobado += cc
-                    cc = 0
-                    if desaprobado == 0:
-                        aprobados.append(n.persona)
-                    else:
-                        desaprobados.append(n.persona)
-                        desaprobado = 0
-        self.array_participantes_aprobados = set(aprobados) - set(desaprobados)
-        for equipo in self.capacitacion.equipoproyecto_set.all():
-            self.array_equipo_proyecto.append(equipo)
-        self.cantidad_cert = len(self.array_participantes_aprobados) + len(self.array_equipo_proyecto)
-        code_qr = default_storage.save('temp_code_qr.png', ContentFile(''))
-        self.path_code_qr = default_storage.path(code_qr)
-        return super().dispatch(request, *args, **kwargs)
+    def get_certificados(self):
+        return certificados_modulo(get_object_or_404(Capacitacion, pk=self.kwargs.get('id')),
+                                   get_object_or_404(Modulo, pk=self.kwargs.get('id_modulo')))
 
-    def process_canvas(self, c):
-        self.canvas = c
-        self.encabezado()
-        self.get_certificados()
-        return c
-
-    def encabezado(self):
-        lWidth, lHeight = 'A4'
-        self.canvas.setPageSize((lHeight, lWidth))
-        self.canvas.setFont('Helvetica', 13)
-
-        self.style = getSampleStyleSheet()['BodyText']
-        self.style.alignment = TA_CENTER
-        self.style.fontSize = 10
-        
-        self.style1 = getSampleStyleSheet()['Normal']
-        self.style1.fontSize = 6
-        
-        self.style2 = getSampleStyleSheet()['Normal']
-        self.style2.fontSize = 16
-        self.style2.alignment = TA_CENTER
-        
-        self.style3 = getSampleStyleSheet()['Normal']
-        self.style3.fontSize = 13
-        self.style3.alignment = TA_CENTER
-        
-        self.style4 = getSampleStyleSheet()['Normal']
-        self.style4.fontSize = 12
-        self.style4.alignment = TA_JUSTIFY
-        self.style4.leading  = 26
-        
-        self.style5 = getSampleStyleSheet()['Normal']
-        self.style5.fontSize = 16
-        self.style5.alignment = TA_CENTER
-        
-        self.style_fullname = getSampleStyleSheet()['Normal']
-        self.style_fullname.fontSize = 13
-        self.style_fullname.alignment = TA_CENTER
-        
-        self.style_right = getSampleStyleSheet()['Normal']
-        self.style_right.fontSize = 12.5
-        self.style_right.alignment = TA_RIGHT
-        
-        self.style_certificado = getSampleStyleSheet()['Normal']
-        self.style_certificado.fontSize = 18
-        self.style_certificado.alignment = TA_CENTER
-
-    def generar_code_qr(self):
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-        qr.add_data("https://www.google.com")
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color='black', back_color='white')
-        img.save(self.path_code_qr)
-        imagen = os.path.join(self.path_code_qr)
-        width = 60
-        y_start = 10
-        self.canvas.drawImage(ImageReader(imagen), 270, y_start-55, width=width, preserveAspectRatio=True, mask='auto')
-        os.remove(self.path_code_qr)
-
-    def obtener_path_temporal_firma(self, id, firma):
-        path = ''
-        try:
-            decode = base64.b64decode(firma)
-            filename = default_storage.save('firma_{}_temp.jpg'.format(id), ContentFile(decode))
-            path = default_storage.path(filename)
-        except:  # noqa
-            pass
-        return path
-
-    def get_certificados(self, **kwargs):
-        mes = ["", "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre","octubre", "noviembre", "diciembre"]
-
-        table_style1 = [
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 0.25, colors.black, None, (2, 2, 1)),
-            ('BOX', (0, 0), (-1, -1), 0.25, colors.black),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ('FONTSIZE', (0, 1), (0, -1), 10),
-        ]
-
-        table_style4 = [('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('FONTSIZE', (0, 0), (-1, -1), 12)]
-
-        data2 = [[]] * 4
-        data = [[]] * 4
-        data6 = [[]] * 4
-        contador = 0
-
-        for p in list(self.array_participantes_aprobados) + list(self.array_equipo_proyecto):
-            # Datos del certificado
-            logo_unasam = os.path.join(F'{STATIC_ROOT}', 'img', 'unasam_logo_oficial.jpg')
-            logo_ogcu = os.path.join(F'{STATIC_ROOT}', 'img', 'ogcu_logo_oficial.jpg')
-            self.canvas.drawImage(ImageReader(logo_unasam), 100, 645, 90, 90)
-            self.canvas.drawImage(ImageReader(logo_ogcu), 360, 645, 117, 85)
-
-            titulo = Paragraph('<b>CERTIFICADO</b>', style=self.style_certificado)
-            w, h = titulo.wrap(440, 0)
-            titulo.drawOn(self.canvas, 85, 600 - h)
-
-            otorgado = Paragraph('La Oficina General de Calidad Universitaria de la Universidad Nacional Santiago Antúnez de Mayolo certifica que:', style=self.style4)
-            w, h = otorgado.wrap(440, 0)
-            otorgado.drawOn(self.canvas, 85, 535 - h)
-
-            contador += 1
-            n_correlativo = ''
-            nombre_completo = ''
-
-            if 'PRESENCIAL' in self.capacitacion.canal_reunion.upper():
-                tipo_canal = 'presencial'
-            else:
-                tipo_canal = 'virtual'
-
-            if contador > len(self.array_participantes_aprobados):
-                parrafo1 = Paragraph('''participó en calidad de {} en el Módulo de {}, desarrollado de forma {} del {} de {} de {} al {} de {} de {} con un total de {} horas académicas.'''.format(p.get_cargo_display(),
-                                                            self.modulo.nombre,
-                                                            tipo_canal,
-                                                            self.fecha_inicio.day, mes[self.fecha_inicio.month], self.fecha_inicio.year,
-                                                            self.fecha_fin.day, mes[self.fecha_fin.month], self.fecha_fin.year,
-                                                            self.horas_academicas), style=self.style4)
-                nombre_completo = p.persona.nombre_completo
-
-                res_correlativo = CertEmitido.objects.filter(modulo=self.modulo, persona=p.persona, cargo=p.cargo, tipo=TIPO_CERT_EMITIDO_MODULO).first()
-
-                if res_correlativo:
-                    n_correlativo = res_correlativo.correlativo
-            else:
-                parrafo1 = Paragraph('''aprobó satisfactoriamente el Módulo de {}, desarrollado de forma {} del {} de {} de {}
-                al {} de {} de {} con un total de {} horas académicas.'''.format(self.modulo.nombre, tipo_canal,
-                                                                    self.fecha_inicio.day, mes[self.fecha_inicio.month], self.fecha_inicio.year,
-                                                                    self.fecha_fin.day, mes[self.fecha_fin.month], self.fecha_fin.year,
-                                                                    self.horas_academicas), style=self.style4)
-                nombre_completo = p.nombre_completo
-                res_correlativo = CertEmitido.objects.filter(modulo=self.modulo, persona=p, cargo=CARGO_CERT_EMITIDO_ASISTENTE, tipo=TIPO_CERT_EMITIDO_MODULO).first()
-
-                if res_correlativo:
-                    n_correlativo = res_correlativo.correlativo
-
-            # Nombre del participante
-            nombre_completo_lb = Paragraph('<b>{}</b>'.format(str(nombre_completo).upper()), style=self.style_fullname)
-            w, h = nombre_completo_lb.wrap(440, 0)
-            nombre_completo_lb.drawOn(self.canvas, 85, 475 - h)
-            
-            w, h = parrafo1.wrap(440, 0)
-            parrafo1.drawOn(self.canvas, 85, 440 - h)
-        
-            fecha_lugar = Paragraph('Huaraz, {} de {} de {}'.format(self.fecha_fin.day, mes[self.fecha_fin.month], self.fecha_fin.year), style=self.style_right)
-            w, h = fecha_lugar.wrap(440, 0)
-            fecha_lugar.drawOn(self.canvas, 85, 350 - h)
-
-            responsables_firma = self.capacitacion.responsablefirma_set.all()
-            cx = 0
-            cant_firmas = responsables_firma.count()
-            table_style = [
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ]
-            for f in responsables_firma:
-                data3 = [['']]
-                data4 = [['']] * 3
-                path_temp_firma = ''
-
-                if f.firmante.firma:
-                    path_temp_firma = self.obtener_path_temporal_firma(f.id, f.firmante.firma)
-
-                if path_temp_firma:
-                    a = Image(path_temp_firma, width=110, height=80)
-                    data3[0] = [a]
-
-                tt = Table(data=data3, rowHeights=70, repeatCols=1, colWidths=230)
-                tt.setStyle(table_style)
-                w, h = tt.wrap(0, 0)
-
-                if cant_firmas == 2:
-                    tt.drawOn(self.canvas, 65 + cx, 215)
-                else:
-                    tt.drawOn(self.canvas, 50 + cx, 215)
-
-                data4[0] = ['__________________________________']
-                data4[1] = [str(f.firmante).upper()]
-                data4[2] = [f.get_tipo_firma_display()]
-                tt = Table(data=data4, rowHeights=14, repeatCols=1, colWidths=230)
-                tt.setStyle(table_style)
-                w, h = tt.wrap(0, 0)
-
-                if cant_firmas == 2:
-                    tt.drawOn(self.canvas, 65 + cx, 180)
-                    cx += 250
-                else:
-                    tt.drawOn(self.canvas, 37 + cx, 180)
-                    cx += 150
-
-                if path_temp_firma:
-                    os.remove(path_temp_firma)
-
-            self.generar_code_qr()
-
-            titulo1 = Paragraph('VICERRECTORADO ACADÉMICO', style=self.style)
-            sub_titulo1 = Paragraph('Consejo de Capacitación, Especialización y Actualización Docente', style=self.style)
-            titulo2 = Paragraph('CCEAD UNASAM', style=self.style)
-
-            data6[0] = [titulo1]
-            data6[1] = [sub_titulo1]
-            data6[2] = [titulo2]
-
-            ta = Table(data=data6, rowHeights=15, repeatCols=1, colWidths=610)
-            ta.setStyle(table_style4)
-            w, h = ta.wrap(0, 0)
-            ta.drawOn(self.canvas, 1, 25)
-
-            self.canvas.showPage()
-
-            cxx = 0
-            conta = 0
-            codigo_barra = code128.Code128(barWidth=1.2, barHeight=25)
-            codigo_barra.value = n_correlativo
-            codigo_barra.drawOn(self.canvas, x=215, y=730)
-            self.canvas.drawString(278, 715, n_correlativo)
-
-            if len(self.temarios) == 1:
-                temas = self.temarios[0].split('\n')
-                data1 = [[]] * (len(temas) + 1)
-                conta += 1
-                mod = Paragraph('<b>Temario</b>', style=self.style)
-                data1[0] = [mod]
-
-                for x in range(1, len(temas) + 1):
-                    data1[x] = [temas[x - 1].strip()]
-
-                tbl = Table(data=data1, rowHeights=30, repeatCols=1, colWidths=[439])
-                tbl.setStyle(table_style1)
-                w, h = tbl.wrap(0, 0)
-                tbl.drawOn(self.canvas, 87 + cxx, 680 - h)
-                cxx += 20
-                self.canvas.showPage()
-            else:
-                for t in self.temarios:
-                    temas = t.split('\n')
-                    data1 = [[]] * (len(temas) + 1)
-                    conta += 1
-                    mod = Paragraph('<b>Temario del Módulo {}</b>'.format(conta), style=self.style)
-                    data1[0] = [mod]
-                    trow = 30
-                    espace = 30
-                    tem = 0
-                    for x in range(1, len(temas) + 1):
-                        te3 = temas[x - 1].strip()
-                        tem += 1
-                        if len(temas[x - 1].strip()) >= 90:
-                            trow = 30
-                            espace = 30
-                            te = temas[x - 1].strip()[:90]
-                            pos_te = te.rfind(' ')
-                            te1 = temas[x - 1].strip()[:pos_te]
-                            te2 = temas[x - 1].strip()[pos_te:]
-                            te3 = '{}\n  {}'.format(te1, te2)
-                        data1[x] = [te3]
-                    tbl = Table(data=data1, rowHeights=trow, repeatCols=1, colWidths=[439])
-                    tbl.setStyle(table_style1)
-                    w, h = tbl.wrap(0, 0)
-                    tbl.drawOn(self.canvas, 87, (680 - h) - cxx + espace)
-                    cxx += 50 + (tem * 20)
-                self.canvas.showPage()
 
+@method_decorator(transaction.non_atomic_requests, name='dispatch')
 class EnvioCertificadoMultiCorreoMod(View):
-    persona = None
-    capacitacion = None
-    filename = 'Certificado_{}.pdf'
-    horas_academicas = 0
-    array_participantes_aprobados = 0
-    modulo = None
-    temarios = []
-    array_equipo_proyecto = []
-
     def get(self, request, *args, **kwargs):
-        self.capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
-        self.modulo = Modulo.objects.filter(pk=kwargs.get('id_modulo')).first()
-        actas_asistencias = ActaAsistencia.objects.filter(modulo=self.modulo)
-        if self.capacitacion and actas_asistencias:
-            aprobados = []
-            desaprobados = []
-            self.temarios = []
-            self.array_equipo_proyecto = []
-            array_errores = []
-            array_enviados = []
-            for acta in actas_asistencias:
-                self.temarios.append(acta.modulo.temas)
-                self.horas_academicas = self.horas_academicas + acta.modulo.horas_academicas
-                nota_participantes = NotaParticipante.objects.filter(acta_asistencia_id=acta.id).order_by('persona_id')
-                persona_id = ''
-                cc = 0
-                desaprobado = 0
-                for n in nota_participantes:
-                    if n.resultado.upper() == 'DESAPROBADO':
-                        cc += 1
-                    if persona_id != n.persona_id:
-                        persona_id = n.persona_id
-                        desaprobado += cc
-                        cc = 0
-                        if desaprobado == 0:
-                            aprobados.append(n.persona)
-                        else:
-                            desaprobados.append(n.persona)
-                            desaprobado = 0
-            self.array_participantes_aprobados = set(aprobados) - set(desaprobados)
-            for equipo in self.capacitacion.equipoproyecto_set.all():
-                self.array_equipo_proyecto.append(equipo)
-            ccc = 0
-            for p in list(self.array_participantes_aprobados) + list(self.array_equipo_proyecto):
-                ccc += 1
-                if ccc > len(self.array_participantes_aprobados):
-                    nombre_completo = '{}-{}'.format(p.persona.numero_documento, p.persona.nombre_completo)
-                    correo_e = p.persona.email
-                    cargo = p.cargo
-                    persona_id = p.persona_id
-                else:
-                    nombre_completo = '{}-{}'.format(p.numero_documento, p.nombre_completo)
-                    correo_e = p.email
-                    cargo = None
-                    persona_id = p.id
-                kwargs.update({'id_capacitacion': self.capacitacion.id, 'id_persona': persona_id,
-                               'modulo': self.modulo, 'capacitacion': self.capacitacion, 'cargo': cargo})
-                response = GeneraCertificadoPdfPorModulo.as_view()(request, **kwargs)
-                if response.status_code == HTTP_200_OK:
-                    self.filename = self.filename.format(timezone.now().strftime('%d_%m_%Y'))
-                    pdf = default_storage.save(self.filename, ContentFile(response.content))
-                    path_pdf = default_storage.path(pdf)
-                    try:
-                        asunto = 'UNASAM - Certificado del curso de: {}'.format(self.modulo.nombre)
-                        mensaje = '''<p>Estimado (a) {},</p>
-                                     <p> Se envía adjunto su Certificado.</p>'''.format(nombre_completo)
-                        remitente = settings.EMAIL_HOST_USER
-                        destinatarios = [correo_e]
-                        email = EmailMessage(asunto, mensaje, remitente, destinatarios)
-                        email.content_subtype = "html"
-                        email.attach_file(path_pdf)
-                        if correo_e and email.send(fail_silently=False):
-                            array_enviados.append(nombre_completo)
-                            if path_pdf:
-                                os.remove(path_pdf)
-                        else:
-                            array_errores.append(nombre_completo)
-                            if path_pdf:
-                                os.remove(path_pdf)
-                    except Exception as ex:
-                        array_errores.append(nombre_completo)
-                        if path_pdf:
-                            os.remove(path_pdf)
-            if array_enviados:
-                self.modulo.se_envio_correo = True
-                self.modulo.save(update_fields=['se_envio_correo'])
-            return JsonResponse({'errores': array_errores, 'enviados': array_enviados}, status=HTTP_200_OK)
-        else:
+        capacitacion = Capacitacion.objects.filter(pk=kwargs.get('id_capacitacion')).first()
+        modulo = Modulo.objects.filter(pk=kwargs.get('id_modulo'), capacitacion=capacitacion).first()
+        if not modulo:
             return JsonResponse({}, status=HTTP_400_BAD_REQUEST)
+        certificados = certificados_modulo(capacitacion, modulo)
+        array_enviados, array_errores, array_omitidos = enviar_certificados(
+            request, certificados, 'UNASAM - Certificado del curso de: {}'.format(modulo.nombre),
+            omitir_enviados=True)
+        modulo.se_envio_correo = envio_completo(certificados, array_errores)
+        modulo.save(update_fields=['se_envio_correo'])
+        return JsonResponse({'errores': array_errores, 'enviados': array_enviados, 'omitidos': array_omitidos},
+                            status=HTTP_200_OK)
@@ -127,6 +127,9 @@ EMISION_CERTIFICADO_CHOICES = (
     (EMISION_CERTIFICADO_UNICO_Y_MODULOS, 'Certificado único y por módulos'),
 )
 
+CORREO_CERTIFICADO_ADJUNTO = 'adjunto'
+CORREO_CERTIFICADO_ENLACE = 'enlace'
+
 TIPO_CERT_EMITIDO_UNICO = 'certificado_unico'
 TIPO_CERT_EMITIDO_MODULO = 'certificado_por_modulo'
 
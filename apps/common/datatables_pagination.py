@@ -38,3 +38,54 @@ def datatable_page(queryset, request):
     except ValueError:
         draw = 0
     return draw, page
+
+
+def datatable_order(queryset, request, columns, *default_order):
+    """
+    Returns queryset ordered with datatables parameters
+
+    :param queryset: Queryset to order
+    :param request: Django HTTP request containing datatables parameters: `order[i][column]` and `order[i][dir]`.
+    :param columns: Dict mapping the index of each orderable column to the model field used to order it.
+           Columns not present in the dict are ignored.
+    :param default_order: Fields appended after the requested ones (and used alone when there is none),
+           so that the pagination is stable.
+    :return: Ordered queryset
+    """
+    order = []
+    i = 0
+    while 'order[{}][column]'.format(i) in request.GET:
+        try:
+            field = columns.get(int(request.GET.get('order[{}][column]'.format(i))))
+        except ValueError:
+            field = None
+        if field and field not in order and '-{}'.format(field) not in order:
+            desc = request.GET.get('order[{}][dir]'.format(i)) == 'desc'
+            order.append('-{}'.format(field) if desc else field)
+        i += 1
+    return queryset.order_by(*order, *default_order)
+
+
+def datatable_filter(queryset, request, filters):
+    """
+    Returns queryset filtered with the extra parameters sent along with the datatables request
+
+    :param queryset: Queryset to filter
+    :param request: Django HTTP request containing the filter parameters.
+    :param filters: Dict mapping each GET parameter to a tuple `(lookup, conversion)`, where `conversion`
+           turns the raw value into the one used in the lookup. Empty values, and values for which the
+           conversion fails or returns None, are ignored.
+    :return: Filtered queryset
+    """
+    lookups = {}
+    for param, (lookup, conversion) in filters.items():
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            value = conversion(value)
+        except (TypeError, ValueError):
+            continue
+        if value is not None:
+            lookups[lookup] = value
+    return queryset.filter(**lookups)
@@ -1,3 +1,50 @@
-from django.test import TestCase
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.dateparse import parse_date
 
-# Create your tests here.
+from apps.capacitacion.models import Capacitacion
+from apps.common.datatables_pagination import datatable_filter, datatable_order
+
+
+class DatatableOrderTest(SimpleTestCase):
+    columnas = {1: 'nombre', 2: 'fecha_inicio', 5: 'estado'}
+
+    def ordenar(self, parametros):
+        request = RequestFactory().get('/', parametros)
+        return datatable_order(Capacitacion.objects.all(), request, self.columnas, '-fecha_creacion', '-id')
+
+    def test_sin_orden_usa_el_predeterminado(self):
+        self.assertEqual(self.ordenar({}).query.order_by, ('-fecha_creacion', '-id'))
+
+    def test_varias_columnas(self):
+        queryset = self.ordenar({'order[0][column]': '2', 'order[0][dir]': 'desc',
+                                 'order[1][column]': '1', 'order[1][dir]': 'asc'})
+        self.assertEqual(queryset.query.order_by, ('-fecha_inicio', 'nombre', '-fecha_creacion', '-id'))
+
+    def test_ignora_columnas_no_permitidas_o_repetidas(self):
+        queryset = self.ordenar({'order[0][column]': '3', 'order[1][column]': 'x',
+                                 'order[2][column]': '5', 'order[3][column]': '5', 'order[3][dir]': 'desc'})
+        self.assertEqual(queryset.query.order_by, ('estado', '-fecha_creacion', '-id'))
+
+
+class DatatableFilterTest(SimpleTestCase):
+    filtros = {
+        'estado': ('estado', str),
+        'facultad': ('facultad_id', int),
+        'fecha_desde': ('fecha_inicio__gte', parse_date),
+    }
+
+    def filtrar(self, parametros):
+        request = RequestFactory().get('/', parametros)
+        return datatable_filter(Capacitacion.objects.all(), request, self.filtros)
+
+    def test_aplica_los_filtros(self):
+        queryset = self.filtrar({'estado': '2', 'facultad': '7', 'fecha_desde': '2022-03-01'})
+        self.assertEqual(str(queryset.query), str(Capacitacion.objects.filter(
+            estado='2', facultad_id=7, fecha_inicio__gte=parse_date('2022-03-01')).query))
+
+    def test_ignora_valores_vacios_o_invalidos(self):
+        # parse_date devuelve None con un formato que no reconoce y lanza ValueError con una fecha imposible
+        queryset = self.filtrar({'estado': '', 'facultad': 'abc', 'fecha_desde': '01/03/2022'})
+        self.assertEqual(str(queryset.query), str(Capacitacion.objects.all().query))
+        queryset = self.filtrar({'fecha_desde': '2022-02-30'})
+        self.assertEqual(str(queryset.query), str(Capacitacion.objects.all().query))
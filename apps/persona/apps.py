@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PersonaConfig(AppConfig):
     name = 'apps.persona'
+
+    def ready(self):
+        from apps.persona import signals  # noqa
@@ -53,10 +53,13 @@ class FirmanteForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         if self.data.get('persona'):
             self.fields['persona'].queryset = Persona.objects.only('id').filter(id=self.data.get('persona'))
+        # Al editar se conserva la firma registrada si no se carga otra
+        if self.instance.firma_hash:
+            self.fields['firma'].required = False
 
     class Meta:
         model = Firmante
-        fields = ('persona', 'ambito', 'facultad', 'firma')
+        fields = ('persona', 'ambito', 'facultad')
 
     def clean(self):
         cleaned_data = super().clean()
@@ -0,0 +1,40 @@
+# Generated by Django 3.2 on 2026-10-19 09:12
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0002_persona_grado_academico'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.AddField(
+            model_name='persona',
+            name='busqueda',
+            field=models.CharField(blank=True, editable=False, max_length=400, null=True),
+        ),
+        migrations.RunSQL(
+            sql='''
+                UPDATE persona_persona
+                   SET busqueda = upper(unaccent(regexp_replace(
+                       concat_ws(' ', nullif(btrim(apellido_paterno), ''), nullif(btrim(apellido_materno), ''),
+                                 nullif(btrim(nombres), '')),
+                       '\\s+', ' ', 'g')))
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='persona',
+            index=models.Index(fields=['numero_documento'], name='persona_numero_documento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='persona',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='persona_busqueda_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0003_persona_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='firmante',
+            name='firma_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        # La firma se guardaba como texto base64: se decodifica en la misma columna
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql="""
+                        ALTER TABLE persona_firmante ALTER COLUMN firma DROP NOT NULL;
+                        ALTER TABLE persona_firmante ALTER COLUMN firma TYPE bytea
+                            USING decode(nullif(firma, ''), 'base64');
+                    """,
+                    reverse_sql="""
+                        ALTER TABLE persona_firmante ALTER COLUMN firma TYPE text
+                            USING coalesce(translate(encode(firma, 'base64'), E'\\n', ''), '');
+                        ALTER TABLE persona_firmante ALTER COLUMN firma SET NOT NULL;
+                    """,
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='firmante',
+                    name='firma',
+                    field=models.BinaryField(blank=True, null=True),
+                ),
+            ],
+        ),
+        migrations.RunSQL(
+            sql="UPDATE persona_firmante SET firma_hash = encode(sha256(firma), 'hex') WHERE firma IS NOT NULL",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,3 +1,7 @@
+import hashlib
+import unicodedata
+
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import validate_email
 from django.db import models
 
@@ -14,7 +18,41 @@ class Facultad(models.Model):
         return '{nombre}'.format(nombre=self.nombre)
 
 
+def normalizar_busqueda(*partes):
+    """
+    Normaliza el texto usado en la búsqueda de personas: une las partes no vacías, colapsa los espacios,
+    quita las tildes (equivalente a `unaccent` de PostgreSQL) y lo pasa a mayúsculas.
+    """
+    texto = ' '.join(' '.join(p.split()) for p in partes if p and p.strip())
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in texto if not unicodedata.combining(c)).upper()
+
+
+class PersonaQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for persona in objs:
+            persona.actualizar_busqueda()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if set(fields) & set(Persona.CAMPOS_BUSQUEDA):
+            for persona in objs:
+                persona.actualizar_busqueda()
+            fields = list(fields) + ['busqueda']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def buscar(self, texto):
+        texto = (texto or '').strip()
+        return self.filter(models.Q(busqueda__contains=normalizar_busqueda(texto)) | models.Q(numero_documento=texto))
+
+
 class Persona(AuditableModel, TimeStampedModel):
+    CAMPOS_BUSQUEDA = ('apellido_paterno', 'apellido_materno', 'nombres')
+    # Lo que muestran de un firmante los certificados (nombre y grado)
+    CAMPOS_FIRMANTE = CAMPOS_BUSQUEDA + ('grado_academico',)
+
     tipo_documento = models.CharField(
         max_length=2, verbose_name='Tipo de documento', choices=DOCUMENT_TYPE_CHOICES, default=DOCUMENT_TYPE_DNI)
     numero_documento = models.CharField(max_length=15, verbose_name='Número de documento')
@@ -29,10 +67,17 @@ class Persona(AuditableModel, TimeStampedModel):
     tipo_persona = models.CharField(max_length=25, choices=TIPO_PERSONA_CHOICES, default=TIPO_PERSONA_PARTICIPANTE)
     grado_academico = models.CharField(max_length=25, choices=GRADO_CHOICES, blank=True, null=True)
     es_activo = models.BooleanField(default=True)
+    busqueda = models.CharField(max_length=400, editable=False, blank=True, null=True)
+
+    objects = PersonaQuerySet.as_manager()
 
     class Meta:
         unique_together = [('tipo_documento', 'numero_documento')]
         ordering = ['apellido_paterno']
+        indexes = [
+            models.Index(fields=['numero_documento'], name='persona_numero_documento_idx'),
+            GinIndex(fields=['busqueda'], name='persona_busqueda_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return '{nombre_completo}'.format(nombre_completo=self.nombre_completo)
@@ -45,6 +90,16 @@ class Persona(AuditableModel, TimeStampedModel):
             a_materno=self.apellido_materno
         )
 
+    def actualizar_busqueda(self):
+        self.busqueda = normalizar_busqueda(self.apellido_paterno, self.apellido_materno, self.nombres)
+
+    def save(self, *args, **kwargs):
+        self.actualizar_busqueda()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_BUSQUEDA):
+            kwargs['update_fields'] = set(update_fields) | {'busqueda'}
+        super().save(*args, **kwargs)
+
     def get_default_password_and_username(self):
         if self.numero_documento:
             return self.numero_documento
@@ -56,7 +111,14 @@ class Firmante(models.Model):
     persona = models.ForeignKey(Persona, on_delete=models.PROTECT)
     ambito = models.CharField(max_length=25, choices=AMBITO_CHOICES)
     facultad = models.ForeignKey(Facultad, on_delete=models.PROTECT, blank=True, null=True)
-    firma = models.TextField()
+    firma = models.BinaryField(blank=True, null=True)
+    firma_hash = models.CharField(max_length=64, editable=False, blank=True, null=True)
 
     def __str__(self):
         return '{nombre_completo}'.format(nombre_completo=self.persona)
+
+    def save(self, *args, **kwargs):
+        # Con `firma` diferida no se vuelve a guardar el contenido, el hash sigue siendo válido
+        if 'firma' not in self.get_deferred_fields():
+            self.firma_hash = hashlib.sha256(bytes(self.firma)).hexdigest() if self.firma else None
+        super().save(*args, **kwargs)
@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from apps.persona.models import Persona
+
+
+@receiver(pre_save, sender=Persona)
+def completar_busqueda_fixture(sender, instance, raw, **kwargs):
+    # `loaddata` guarda sin pasar por Persona.save(), los seeders también deben quedar indexados
+    if raw:
+        instance.actualizar_busqueda()
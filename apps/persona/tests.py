@@ -1,3 +1,33 @@
 from django.test import TestCase
 
-# Create your tests here.
+from apps.common.constants import SEXO_FEMENINO, SEXO_MASCULINO
+from apps.persona.models import Persona, normalizar_busqueda
+
+
+class BuscarPersonaTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.maria = Persona.objects.create(numero_documento='40000001', sexo=SEXO_FEMENINO, nombres='María José',
+                                           apellido_paterno='Núñez', apellido_materno='Ríos')
+        cls.jose = Persona.objects.create(numero_documento='40000002', sexo=SEXO_MASCULINO, nombres='José',
+                                          apellido_paterno='Peña', apellido_materno='Ávila')
+
+    def test_normalizar_busqueda(self):
+        self.assertEqual(normalizar_busqueda(' Núñez ', None, 'María   José'), 'NUNEZ MARIA JOSE')
+
+    def test_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(list(Persona.objects.buscar('nunez rios maria')), [self.maria])
+        self.assertEqual(list(Persona.objects.buscar('jose').order_by('id')), [self.maria, self.jose])
+
+    def test_por_documento(self):
+        self.assertEqual(list(Persona.objects.buscar(' 40000002 ')), [self.jose])
+
+    def test_actualiza_la_busqueda_al_guardar_el_nombre(self):
+        self.jose.apellido_paterno = 'Peñaloza'
+        self.jose.save(update_fields=['apellido_paterno'])
+        self.assertEqual(list(Persona.objects.buscar('penaloza avila')), [self.jose])
+
+    def test_bulk_update(self):
+        self.maria.nombres = 'Ana'
+        Persona.objects.bulk_update([self.maria], ['nombres'])
+        self.assertEqual(list(Persona.objects.buscar('rios ana')), [self.maria])
@@ -3,8 +3,6 @@ import uuid
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Value, Q
-from django.db.models.functions import Concat
 from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
@@ -15,10 +13,10 @@ from rest_framework.status import HTTP_200_OK
 from rest_framework.views import APIView
 
 from apps.common.constants import DOCUMENT_TYPE_DNI, DOCUMENT_TYPE_CE
-from apps.common.datatables_pagination import datatable_page
+from apps.common.datatables_pagination import datatable_page, datatable_order, datatable_filter
 from apps.login.views import BaseLogin
 from apps.persona.forms import PersonaForm, FirmanteForm
-from apps.persona.models import Persona, Firmante
+from apps.persona.models import Persona, Firmante, normalizar_busqueda
 
 
 class PersonaCreateView(LoginRequiredMixin, BaseLogin, CreateView):
@@ -98,56 +96,39 @@ class BuscarPersonaAPIView(APIView):
 
 class ListaPersonaView(LoginRequiredMixin, BaseLogin, View):
     def get(self, request, *args, **kwargs):
-        search_param = self.request.GET.get('search[value]')
-        filtro = self.request.GET.get('filtro')
-        personas = Persona.objects.none()
-        if filtro:
-            ''
-        else:
-            personas = Persona.objects.filter(es_activo=True).order_by('-fecha_creacion')
+        search_param = self.request.GET.get('search[value]', '')
+        personas = Persona.objects.filter(es_activo=True)
         if len(search_param) > 3:
-            personas = personas.annotate(
-                search=Concat('apellido_paterno', Value(' '), 'apellido_materno', Value(' '), 'nombres')).filter(
-                Q(search__icontains=search_param) | Q(numero_documento=search_param))
+            personas = personas.buscar(search_param)
+        personas = datatable_filter(personas, request, {
+            'tipo_persona': ('tipo_persona', str),
+            'facultad': ('facultad_id', int),
+        })
+        personas = datatable_order(personas, request, {
+            1: 'numero_documento', 2: 'busqueda', 5: 'tipo_persona', 7: 'facultad__nombre'
+        }, '-fecha_creacion', '-id').select_related('facultad')
         draw, page = datatable_page(personas, request)
         lista_personas_data = []
-        cont = 0
         for a in page.object_list:
-            cont = cont + 1
-            lista_personas_data.append([
-                cont,
-                '{} {}'.format(a.get_tipo_documento_display(), a.numero_documento),
-                a.nombre_completo,
-                a.celular or '-',
-                a.email or '-',
-                a.get_tipo_persona_display(),
-                a.get_cargo_miembro_display() or '-',
-                '{}'.format(a.facultad if a.facultad else '-'),
-                self.get_boton_editar(a),
-                self.get_boton_eliminar(a),
-            ])
+            lista_personas_data.append({
+                'id': a.id,
+                'tipo_documento': a.get_tipo_documento_display(),
+                'numero_documento': a.numero_documento,
+                'nombre_completo': a.nombre_completo,
+                'celular': a.celular,
+                'email': a.email,
+                'tipo_persona': a.get_tipo_persona_display(),
+                'cargo': a.get_cargo_miembro_display(),
+                'facultad': a.facultad.nombre if a.facultad else None,
+            })
         data = {
             'draw': draw,
-            'recordsTotal': personas.count(),
-            'recordsFiltered': personas.count(),
+            'recordsTotal': page.paginator.count,
+            'recordsFiltered': page.paginator.count,
             'data': lista_personas_data
         }
         return JsonResponse(data)
 
-    def get_boton_eliminar(self, a):
-        boton_eliminar = '''<button class="btn btn-danger btn-sm eliminarc" data-id={0}>
-                      <i class="fa fa-trash"></i></button>'''
-        boton_eliminar = boton_eliminar.format(a.id)
-        boton = '{0}'.format(boton_eliminar)
-        return boton
-
-    def get_boton_editar(self, a):
-        link = reverse('persona:editar_persona', kwargs={'pk': a.id})
-        boton_editar = '<a class="btn btn-warning btn-sm" href="{0}"><i class="fa fa-edit"></i></a>'
-        boton_editar = boton_editar.format(link)
-        boton = '{0}'.format(boton_editar)
-        return boton
-
 
 class EliminarPersonaView(LoginRequiredMixin, APIView):
     def get(self, request, *args, **kwargs):
@@ -165,7 +146,7 @@ class FirmanteCreateView(LoginRequiredMixin, BaseLogin, CreateView):
     msg = None
 
     def form_valid(self, form):
-        archivo_64 = None
+        archivo = None
         if self.request.FILES:
             ruta = self.request.FILES['firma']
             if ruta.size > 70000:
@@ -176,9 +157,9 @@ class FirmanteCreateView(LoginRequiredMixin, BaseLogin, CreateView):
             if extension != 'png':
                 self.msg = 'El archivo seleccionado no es formato png'
                 return self.form_invalid(form)
-            archivo_64 = self.enconde_png(ruta)
+            archivo = ruta.read()
         firmante = form.save(commit=False)
-        firmante.firma = archivo_64
+        firmante.firma = archivo
         firmante.save()
         return HttpResponseRedirect(self.get_success_url())
 
@@ -189,15 +170,6 @@ class FirmanteCreateView(LoginRequiredMixin, BaseLogin, CreateView):
             messages.warning(self.request, 'Ha ocurrido un error al agregar al firmante')
         return super().form_invalid(form)
 
-    def enconde_png(self, firma):
-        base64_message = None
-        try:
-            enconde = base64.b64encode(firma.read())
-            base64_message = enconde.decode('utf-8')
-        except:  # noqa
-            pass
-        return base64_message
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({
@@ -217,7 +189,7 @@ class FirmanteUpdateView(LoginRequiredMixin, BaseLogin, UpdateView):
     msg = None
 
     def form_valid(self, form):
-        archivo_64 = None
+        archivo = None
         if self.request.FILES:
             ruta = self.request.FILES['firma']
             if ruta.size > 70000:
@@ -228,10 +200,10 @@ class FirmanteUpdateView(LoginRequiredMixin, BaseLogin, UpdateView):
             if extension != 'png':
                 self.msg = 'El archivo seleccionado no es formato png'
                 return self.form_invalid(form)
-            archivo_64 = self.enconde_png(ruta)
+            archivo = ruta.read()
         firmante = form.save(commit=False)
-        if archivo_64:
-            firmante.firma = archivo_64
+        if archivo:
+            firmante.firma = archivo
         firmante.save()
         return HttpResponseRedirect(self.get_success_url())
 
@@ -242,20 +214,11 @@ class FirmanteUpdateView(LoginRequiredMixin, BaseLogin, UpdateView):
             messages.warning(self.request, 'Ha ocurrido un error al actualizar al firmante')
         return super().form_invalid(form)
 
-    def enconde_png(self, firma):
-        base64_message = None
-        try:
-            enconde = base64.b64encode(firma.read())
-            base64_message = enconde.decode('utf-8')
-        except:  # noqa
-            pass
-        return base64_message
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({
             'ambito_firmante': self.object.ambito,
-            'firma64': self.object.firma
+            'firma64': base64.b64encode(self.object.firma).decode('utf-8') if self.object.firma else None
         })
         return context
 
@@ -266,53 +229,36 @@ class FirmanteUpdateView(LoginRequiredMixin, BaseLogin, UpdateView):
 
 class ListaFirmanteView(LoginRequiredMixin, BaseLogin, View):
     def get(self, request, *args, **kwargs):
-        search_param = self.request.GET.get('search[value]')
-        filtro = self.request.GET.get('filtro')
-        firmantes = Firmante.objects.none()
-        if filtro:
-            ''
-        else:
-            firmantes = Firmante.objects.all().order_by('-id')
+        search_param = self.request.GET.get('search[value]', '')
+        firmantes = Firmante.objects.all()
         if len(search_param) > 3:
-            firmantes = firmantes.annotate(search=Concat('persona__apellido_paterno', Value(' '),
-                                                         'persona__apellido_materno', Value(' '),
-                                                         'persona__nombres')).filter(search__icontains=search_param)
+            firmantes = firmantes.filter(persona__busqueda__contains=normalizar_busqueda(search_param))
+        firmantes = datatable_filter(firmantes, request, {
+            'ambito': ('ambito', str),
+            'facultad': ('facultad_id', int),
+        })
+        firmantes = datatable_order(firmantes, request, {
+            1: 'persona__numero_documento', 2: 'persona__busqueda', 3: 'ambito', 4: 'facultad__nombre'
+        }, '-id').select_related('persona', 'facultad').defer('firma')
         draw, page = datatable_page(firmantes, request)
         lista_firmantes_data = []
-        cont = 0
         for a in page.object_list:
-            cont = cont + 1
-            lista_firmantes_data.append([
-                cont,
-                '{} {}'.format(a.persona.get_tipo_documento_display(), a.persona.numero_documento),
-                a.persona.nombre_completo,
-                a.get_ambito_display(),
-                '{}'.format(a.facultad if a.facultad else '-'),
-                self.get_boton_editar(a),
-                self.get_boton_eliminar(a),
-            ])
+            lista_firmantes_data.append({
+                'id': a.id,
+                'tipo_documento': a.persona.get_tipo_documento_display(),
+                'numero_documento': a.persona.numero_documento,
+                'nombre_completo': a.persona.nombre_completo,
+                'ambito': a.get_ambito_display(),
+                'facultad': a.facultad.nombre if a.facultad else None,
+            })
         data = {
             'draw': draw,
-            'recordsTotal': firmantes.count(),
-            'recordsFiltered': firmantes.count(),
+            'recordsTotal': page.paginator.count,
+            'recordsFiltered': page.paginator.count,
             'data': lista_firmantes_data
         }
         return JsonResponse(data)
 
-    def get_boton_eliminar(self, a):
-        boton_eliminar = '''<button class="btn btn-danger btn-sm eliminarc" data-id={0}>
-                      <i class="fa fa-trash"></i></button>'''
-        boton_eliminar = boton_eliminar.format(a.id)
-        boton = '{0}'.format(boton_eliminar)
-        return boton
-
-    def get_boton_editar(self, a):
-        link = reverse('persona:editar_firmante', kwargs={'pk': a.id})
-        boton_editar = '<a class="btn btn-warning btn-sm" href="{0}"><i class="fa fa-edit"></i></a>'
-        boton_editar = boton_editar.format(link)
-        boton = '{0}'.format(boton_editar)
-        return boton
-
 
 class EliminarFirmanteView(LoginRequiredMixin, APIView):
     def get(self, request, *args, **kwargs):
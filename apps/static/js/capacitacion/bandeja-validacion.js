@@ -1,14 +1,134 @@
 $(document).ready(function () {
 
+  const OPCIONES_REVISION = [
+    ['por_validar', 'Por validar'],
+    ['validado', 'Validado'],
+    ['cancelado', 'Cancelado'],
+    ['culminado', 'Culminado'],
+    ['observado', 'Observado']
+  ];
+
+  function renderActas(data, type, row) {
+    var html = '';
+    var conActa = 0;
+    row.modulos.forEach(function(modulo) {
+      if (modulo.acta) {
+        conActa++;
+        html += `<button class="btn btn-success btn-xs v-acta" data-id="${modulo.acta}" capacitacion-id="${row.id}"
+                 style="margin-top:2px;margin-left:2px;"> Ver acta ${conActa}</button>`;
+      }
+    });
+    return html;
+  }
+
+  function renderEstado(data, type, row) {
+    if (row.estado === 'culminado') {
+      return `<label class="text-info"> ${row.estado_display}</label>`;
+    }
+    var opciones = OPCIONES_REVISION.map(function(opcion) {
+      return `<option value="${opcion[0]}" ${opcion[0] === row.estado ? 'selected' : ''}>${opcion[1]}</option>`;
+    }).join('');
+    return `<input type="hidden" value="${row.estado}" id="estado-${row.id}">
+            <select id="accion_revisar" class="${COLOR_ESTADO_PROYECTO[row.estado] || ''} form-control"
+             data-id="${row.id}">${opciones}</select><label id="msje1_${row.id}"></label>`;
+  }
+
+  function renderFirmantes(data, type, row) {
+    if (row.estado !== 'validado') {
+      return '';
+    }
+    var url = urlConId(urlAsignarFirmante, row.id);
+    if (row.tiene_firmantes) {
+      return `<a class="btn btn-success btn-sm" href="${url}"><i class="fa fa-eye"></i></a>`;
+    }
+    return `<a class="btn btn-warning btn-sm" href="${url}"><i class="fa fa-plus"></i></a>`;
+  }
+
+  function emiteUnico(row) {
+    return row.tipo_emision === 'certificado_unico' || row.tipo_emision === 'certificado_unico_y_modulos';
+  }
+
+  function emitePorModulo(row) {
+    return row.tipo_emision === 'certificado_por_modulo' || row.tipo_emision === 'certificado_unico_y_modulos';
+  }
+
+  function renderCertificados(data, type, row) {
+    if (row.estado !== 'culminado' || !row.tiene_firmantes) {
+      return '';
+    }
+    var html = '';
+    if (emiteUnico(row)) {
+      html += `<a class="btn btn-success btn-xs" href="${urlConId(urlGenerarCertificados, row.id)}"
+               style="margin-top:2px;margin-left:2px;"><i class="fa fa-print"></i> Único PDF</a>`;
+    }
+    if (emitePorModulo(row)) {
+      row.modulos.forEach(function(modulo, i) {
+        var url = urlConId(urlGenerarCertificadosPorMod, row.id).replace('888888888', modulo.id);
+        html += `<a class="btn btn-success btn-xs" href="${url}" style="margin-top:2px;margin-left:2px;">
+                 <i class="fa fa-print"> Modulo${i + 1} PDF</i></a>`;
+      });
+    }
+    return html;
+  }
+
+  function renderEnvioCorreo(data, type, row) {
+    if (row.estado !== 'culminado' || !row.tiene_firmantes) {
+      return '';
+    }
+    var html = '';
+    if (emiteUnico(row)) {
+      if (row.se_envio_correo) {
+        html += '<label class="text-success">Correo enviado</label>';
+      } else {
+        html += `<button class="btn btn-info btn-xs enviar-correo ev-${row.id}" data-id="${row.id}">
+                 <i class="fa fa-envelope"></i> Enviar</button>`;
+      }
+    }
+    if (emitePorModulo(row)) {
+      row.modulos.forEach(function(modulo, i) {
+        if (modulo.se_envio_correo) {
+          html += `<label class="text-success">mod${i + 1} enviado</label>`;
+        } else {
+          html += `<button class="btn btn-info btn-xs enviar-correo-mod evm-${modulo.id}" data-id="${row.id}"
+                   data-modulo="${modulo.id}" style="margin-top:2px;margin-left:2px;"><i class="fa fa-envelope">
+                   Enviar mod${i + 1}</i></button>`;
+        }
+      });
+    }
+    return html;
+  }
+
   var table_lista_capacitacion = $("#lista-capacitacion-validar").DataTable({
     language: {
       "url":  datatablesES
     },
-    ajax: urlListarCapacitacionValidar,
+    ajax: {
+      url: urlListarCapacitacionValidar,
+      data: datosFiltrosLista
+    },
     searching: true,
     processing: true,
     serverSide: true,
-    ordering: false,
+    order: [],
+    columns: [
+      {data: null, orderable: false, render: renderNumeroFila},
+      {data: null, render: renderTexto('facultad')},
+      {data: null, render: renderTexto('nombre')},
+      {data: null, render: function(data, type, row) {
+        return `<label style="font-size:12px;">${renderRangoFechas(data, type, row)}</label>`;
+      }},
+      {data: null, orderable: false, render: renderBotonPdf('Ver')},
+      {data: null, orderable: false, render: renderActas},
+      {data: null, orderable: false, render: renderTexto('observacion')},
+      {data: null, render: renderEstado},
+      {data: null, orderable: false, render: renderFirmantes},
+      {data: null, orderable: false, render: renderCertificados},
+      {data: null, orderable: false, render: renderEnvioCorreo}
+    ]
+  });
+
+  $("#filtros-lista").on('change', '.filtro-lista', function() {
+    table_lista_capacitacion.ajax.reload();
   });
 
   $("#lista-capacitacion-validar").on('click', '#ver_archivo_pdf', function() {
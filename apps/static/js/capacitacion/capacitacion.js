@@ -79,15 +79,60 @@ $(document).ready(function () {
     );
   });
 
+  function renderEstado(data, type, row) {
+    var boton = '';
+    if (row.estado === 'observado' || row.estado === 'registrado') {
+      boton = `<button class="btn btn-success btn-xs parevision" data-id="${row.id}">Enviar a revision</button>`;
+    }
+    return `<label class="${COLOR_ESTADO_PROYECTO[row.estado] || ''}">${row.estado_display}</label>${boton}`;
+  }
+
+  function renderActas(data, type, row) {
+    var html = '';
+    var conActa = 0;
+    var puedeCrear = row.estado === 'validado' || row.estado === 'observado';
+    row.modulos.forEach(function(modulo, i) {
+      if (modulo.acta) {
+        conActa++;
+        html += `<a class="btn btn-success btn-xs" style="margin-top:2px;margin-left:2px;"
+                 href="${urlConId(urlVerActaAsistencia, modulo.acta)}">Ver acta ${conActa}</a>`;
+      } else if (puedeCrear && i === conActa) {
+        html += `<a class="btn btn-primary btn-xs" style="margin-top:2px;margin-left:2px;"
+                 href="${urlConId(urlCrearActaAsistencia, modulo.id)}">Crear acta ${i + 1}</a>`;
+      }
+    });
+    return html;
+  }
+
   var table_lista_capacitacion = $("#lista-capacitacion").DataTable({
     language: {
       "url":  datatablesES
     },
-    ajax: urlListarCapacitacion,
+    ajax: {
+      url: urlListarCapacitacion,
+      data: datosFiltrosLista
+    },
     searching: true,
     processing: true,
     serverSide: true,
-    ordering: false,
+    order: [],
+    columns: [
+      {data: null, orderable: false, render: renderNumeroFila},
+      {data: null, render: renderTexto('nombre')},
+      {data: null, render: renderRangoFechas},
+      {data: null, orderable: false, render: function(data, type, row) { return row.modulos.length; }},
+      {data: null, orderable: false, render: renderTexto('observacion')},
+      {data: null, render: renderEstado},
+      {data: null, orderable: false, render: renderBotonPdf('Ver PDF')},
+      {data: null, orderable: false, render: renderActas},
+      {data: null, orderable: false, render: renderBotonEditar(urlEditarCapacitacion)},
+      {data: null, orderable: false,
+       render: renderBotonEliminar(function(row) { return row.estado === 'registrado'; })}
+    ]
+  });
+
+  $("#filtros-lista").on('change', '.filtro-lista', function() {
+    table_lista_capacitacion.ajax.reload();
   });
 
   $("#ver_pdf_cargado").on('click', function() {
@@ -47,7 +47,16 @@ $(document).ready(function () {
     searching: true,
     processing: true,
     serverSide: true,
-    ordering: false,
+    order: [],
+    columns: [
+      {data: null, orderable: false, render: renderNumeroFila},
+      {data: null, render: renderDocumento},
+      {data: null, render: renderTexto('nombre_completo')},
+      {data: null, render: renderTexto('ambito')},
+      {data: null, render: renderTexto('facultad')},
+      {data: null, orderable: false, render: renderBotonEditar(urlEditarFirmante)},
+      {data: null, orderable: false, render: renderBotonEliminar()}
+    ]
   });
 
   if(ambitoFirmante === "facultad"){
@@ -46,7 +46,19 @@ $(document).ready(function () {
     searching: true,
     processing: true,
     serverSide: true,
-    ordering: false,
+    order: [],
+    columns: [
+      {data: null, orderable: false, render: renderNumeroFila},
+      {data: null, render: renderDocumento},
+      {data: null, render: renderTexto('nombre_completo')},
+      {data: null, orderable: false, render: renderTexto('celular')},
+      {data: null, orderable: false, render: renderTexto('email')},
+      {data: null, render: renderTexto('tipo_persona')},
+      {data: null, orderable: false, render: renderTexto('cargo')},
+      {data: null, render: renderTexto('facultad')},
+      {data: null, orderable: false, render: renderBotonEditar(urlEditarPersona)},
+      {data: null, orderable: false, render: renderBotonEliminar()}
+    ]
   });
 
   if(tipPersona && (tipPersona === "consejo_facultad" || tipPersona === "consejo_unasam")){
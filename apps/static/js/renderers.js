@@ -0,0 +1,76 @@
+/**
+ * Renderizadores de filas para las tablas (DataTables) cuyo endpoint devuelve campos tipados.
+ */
+function escaparHtml(valor) {
+  if (valor === null || valor === undefined || valor === '') {
+    return '-';
+  }
+  return String(valor)
+    .replace(/&/g, '&amp;')
+    .replace(/</g, '&lt;')
+    .replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;')
+    .replace(/'/g, '&#39;');
+}
+
+function urlConId(url, id) {
+  return url.replace('999999999', id);
+}
+
+function renderNumeroFila(data, type, row, meta) {
+  return meta.row + 1;
+}
+
+function renderTexto(campo) {
+  return function(data, type, row) {
+    return escaparHtml(row[campo]);
+  };
+}
+
+function renderDocumento(data, type, row) {
+  return `${escaparHtml(row.tipo_documento)} ${escaparHtml(row.numero_documento)}`;
+}
+
+function renderRangoFechas(data, type, row) {
+  return `${row.fecha_inicio} al ${row.fecha_fin}`;
+}
+
+function renderBotonEditar(url) {
+  return function(data, type, row) {
+    return `<a class="btn btn-warning btn-sm" href="${urlConId(url, row.id)}"><i class="fa fa-edit"></i></a>`;
+  };
+}
+
+function renderBotonEliminar(mostrar) {
+  return function(data, type, row) {
+    if (mostrar && !mostrar(row)) {
+      return '';
+    }
+    return `<button class="btn btn-danger btn-sm eliminarc" data-id="${row.id}"><i class="fa fa-trash"></i></button>`;
+  };
+}
+
+function renderBotonPdf(texto) {
+  return function(data, type, row) {
+    if (!row.pdf) {
+      return '';
+    }
+    return `<button class="btn btn-info btn-xs" id="ver_archivo_pdf" data-archivo="${escaparHtml(row.pdf)}">${texto}</button>`;
+  };
+}
+
+const COLOR_ESTADO_PROYECTO = {
+  'validado': 'text-success',
+  'observado': 'text-warning',
+  'culminado': 'text-info',
+  'por_validar': 'text-warning',
+  'cancelado': 'text-danger'
+};
+
+function datosFiltrosLista(d) {
+  d.estado = $("#filtro-estado").val();
+  d.ambito = $("#filtro-ambito").val();
+  d.facultad = $("#filtro-facultad").val();
+  d.fecha_desde = $("#filtro-fecha-desde").val();
+  d.fecha_hasta = $("#filtro-fecha-hasta").val();
+}
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 
 import os
 import pathlib
+import sys
 
 import environ
 
@@ -99,6 +100,15 @@ DATABASES = {
 
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 
+# CACHES
+# -----------------------------------------------------------------------------
+# Caché compartida por todos los procesos web: las señales que la invalidan (contexto y verificación de
+# certificados) deben alcanzar a todos. Por defecto es una tabla de la base, que se crea con
+# `python manage.py createcachetable`; con memcached, p. ej. CACHE_URL=pymemcache://127.0.0.1:11211.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='dbcache://cache_capacitaciones'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -177,3 +187,42 @@ FIXTURE_DIRS = (
 )
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
+
+# CERTIFICADOS
+# -----------------------------------------------------------------------------
+# Prefijo del correlativo por tipo de certificado emitido (CertEmitido.tipo), p. ej.
+# {'certificado_por_modulo': 'M'}. Cada prefijo lleva su propia numeración anual y, como el correlativo tiene
+# hasta 15 caracteres, admite como máximo 5 (ver apps.capacitacion.services.reservar_correlativos).
+CERTIFICADO_CORRELATIVO_PREFIJOS = {}
+
+# Perfil de salida de los PDF: compresión de los contenidos y resolución (ppp) a la que se remuestrean logos y
+# firmas, recodificados como JPEG con la calidad indicada. Con CERTIFICADO_IMAGEN_PPP = 0 se embeben tal cual.
+CERTIFICADO_PDF_COMPRESION = env.bool('CERTIFICADO_PDF_COMPRESION', default=True)
+CERTIFICADO_IMAGEN_PPP = env.int('CERTIFICADO_IMAGEN_PPP', default=150)
+CERTIFICADO_JPEG_CALIDAD = env.int('CERTIFICADO_JPEG_CALIDAD', default=85)
+
+# Los correos de certificados llevan el PDF adjunto ('adjunto') o un enlace firmado para descargarlo ('enlace'),
+# que caduca a los CERTIFICADO_ENLACE_DIAS días.
+CERTIFICADO_CORREO_MODO = env.str('CERTIFICADO_CORREO_MODO', default='adjunto')
+CERTIFICADO_ENLACE_DIAS = env.int('CERTIFICADO_ENLACE_DIAS', default=30)
+
+# Dominio público (p. ej. https://capacitaciones.unasam.edu.pe) de la página de verificación a la que apunta el
+# código QR de cada certificado, y segundos que la verificación de un correlativo se sirve desde la caché. Sin
+# dominio los certificados salen sin QR; al configurarlo cambia su huella y se vuelven a dibujar con él.
+CERTIFICADO_VERIFICACION_URL = env.str('CERTIFICADO_VERIFICACION_URL', default='')
+CERTIFICADO_VERIFICACION_CACHE = env.int('CERTIFICADO_VERIFICACION_CACHE', default=60 * 60)
+
+# Segundos que se guarda en caché el contexto común a los certificados de cada curso y módulo (firmas, temarios,
+# fechas y horas). Las señales lo descartan al cambiar los datos; el plazo solo acota lo que no emite señales.
+CERTIFICADO_CONTEXTO_CACHE = env.int('CERTIFICADO_CONTEXTO_CACHE', default=24 * 60 * 60)
+
+# Procesos dedicados a dibujar los PDF de certificados, que cargan reportlab, fuentes y logos una sola vez; así los
+# procesos web no cargan nada de eso. Con 0 cada proceso web dibuja por su cuenta. El grupo es por proceso web
+# (ver apps.capacitacion.procesos): con W workers hay W x CERTIFICADO_PROCESOS procesos de dibujo, cada uno con su
+# django.setup(), su conexión a la base y su caché de firmas (que se llena con una consulta por firma). Con
+# varios workers conviene un valor bajo, p. ej. 1.
+CERTIFICADO_PROCESOS = env.int('CERTIFICADO_PROCESOS', default=0)
+
+# Python con que se lanza `manage.py prerenderizar_certificados` al culminar una capacitación. Bajo uWSGI
+# sys.executable no es el intérprete: indicarlo aquí.
+CERTIFICADO_PRERENDER_PYTHON = env.str('CERTIFICADO_PRERENDER_PYTHON', default=sys.executable)
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'prueba.settings')
 
 application = get_wsgi_application()
+
+# Los procesos de dibujo de certificados (si CERTIFICADO_PROCESOS > 0) arrancan con la aplicación
+from apps.capacitacion.procesos import iniciar_procesos_dibujo  # noqa: E402
+
+iniciar_procesos_dibujo()